@@ -0,0 +1,198 @@
+"""
+生成用于 benchmark 的合成仓库。所有生成器都只依赖 `git` 命令和一个固定的随机种子，因此结果是可复现的。
+"""
+
+import os
+import random
+import subprocess
+from typing import Optional
+from pathlib import Path
+
+# 固定提交者与时间，使相同参数生成的仓库拥有相同的 object id
+GIT_ENV = {
+    **os.environ,
+    "GIT_AUTHOR_NAME": "bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.com",
+    "GIT_AUTHOR_DATE": "1700000000 +0000",
+    "GIT_COMMITTER_NAME": "bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.com",
+    "GIT_COMMITTER_DATE": "1700000000 +0000",
+}
+
+
+def git(repo: Path, *args: str, input: Optional[bytes] = None) -> bytes:
+    return subprocess.run(["git", *args], cwd=repo, env=GIT_ENV, input=input, check=True, capture_output=True).stdout
+
+
+def init_repo(repo: Path) -> Path:
+    repo.mkdir(parents=True, exist_ok=True)
+    git(repo, "init", "-q", ".")
+    return repo
+
+
+def _content(rng: random.Random, size: int) -> bytes:
+    # 使用可打印字符，既能被 `cat-file -p` 输出，又有一定的可压缩性
+    return bytes(rng.choices(b"abcdefghijklmnopqrstuvwxyz0123456789 \n", k=size))
+
+
+def file_paths(n_files: int, depth: int, width: int) -> list[str]:
+    """
+    生成 n_files 个路径：每一层有 width 个子目录，共 depth 层，文件均匀分布在最深一层的目录中。
+    depth = 0 时所有文件都在根目录下。
+    """
+    dirs = [""]
+    for _ in range(depth):
+        dirs = [f"{d}d{i}/" for d in dirs for i in range(width)]
+    return [f"{dirs[i % len(dirs)]}f{i}.txt" for i in range(n_files)]
+
+
+def write_files(repo: Path, paths: list[str], blob_size: int, seed: int = 0):
+    rng = random.Random(seed)
+    for path in paths:
+        file = repo / path
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_bytes(_content(rng, blob_size))
+
+
+def commit_all(repo: Path, message: str = "bench"):
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", message)
+
+
+def make_repo(  # pylint: disable=too-many-arguments
+    repo: Path,
+    n_files: int,
+    *,
+    depth: int = 2,
+    width: int = 10,
+    blob_size: int = 100,
+    packed: bool = False,
+    seed: int = 0,
+) -> Path:
+    """
+    生成一个包含 n_files 个文件、提交过一次的仓库。packed 为 True 时，所有对象都会被打包并删除 loose object。
+    """
+    init_repo(repo)
+    write_files(repo, file_paths(n_files, depth, width), blob_size, seed)
+    commit_all(repo)
+    if packed:
+        pack_all(repo)
+    return repo
+
+
+def make_wide_repo(repo: Path, n_files: int, **kwargs) -> Path:
+    """所有文件都在根目录下，得到一个巨大的 tree 对象"""
+    return make_repo(repo, n_files, depth=0, **kwargs)
+
+
+def make_deep_repo(repo: Path, n_files: int, depth: int = 20, **kwargs) -> Path:
+    """每层只有一个子目录，得到一条很深的 tree 链"""
+    return make_repo(repo, n_files, depth=depth, width=1, **kwargs)
+
+
+def make_large_blob_repo(repo: Path, n_files: int = 4, blob_size: int = 16 << 20, **kwargs) -> Path:
+    return make_repo(repo, n_files, depth=0, blob_size=blob_size, **kwargs)
+
+
+def pack_all(repo: Path):
+    git(repo, "repack", "-a", "-d", "-q")
+    git(repo, "prune-packed")
+
+
+def make_multi_pack_repo(repo: Path, n_files: int, n_packs: int, **kwargs) -> Path:
+    """
+    与 make_repo 相同，但对象被均匀分到 n_packs 个 pack 中，模拟长期增量 fetch 而没有 gc 的仓库
+    """
+    make_repo(repo, n_files, **kwargs)
+    objects = list_objects(repo)
+    pack_dir = repo / ".git" / "objects" / "pack" / "pack"
+    for i in range(n_packs):
+        group = objects[i::n_packs]
+        if group:
+            git(repo, "pack-objects", "-q", str(pack_dir), input="\n".join(group).encode() + b"\n")
+    git(repo, "prune-packed")
+    return repo
+
+
+def make_sparse_repo(repo: Path, n_files: int, cone: tuple[str, ...] = ("d0/d0",), **kwargs) -> Path:
+    """
+    与 make_repo 相同，但用 `git sparse-checkout` 只保留 cone 中的目录并启用 sparse index，模拟只关心一小部分的 monorepo。
+    默认的 cone 包含 1% 的文件。
+    """
+    make_repo(repo, n_files, **kwargs)
+    git(repo, "sparse-checkout", "set", "--sparse-index", *cone)
+    return repo
+
+
+def make_snapshot_repo(repo: Path, n_files: int, depth: int = 3, width: int = 10) -> Path:
+    """
+    用 fast-import 生成两个提交：第一个包含 n_files 个文件，第二个只修改了其中一个文件。
+    对象直接写入 pack，不需要在工作区中生成文件，因此可以快速生成百万级文件的 tree。
+    """
+    init_repo(repo)
+    committer = f"committer {GIT_ENV['GIT_COMMITTER_NAME']} <{GIT_ENV['GIT_COMMITTER_EMAIL']}> 1700000000 +0000"
+    paths = file_paths(n_files, depth, width)
+
+    def commit(message: str, files: list[str], content: str) -> str:
+        lines = ["commit refs/heads/main", committer, f"data {len(message)}", message]
+        for path in files:
+            data = f"{path} {content}\n".encode()
+            lines += [f"M 100644 inline {path}", f"data {len(data)}", data.decode()]
+        return "\n".join(lines) + "\n"
+
+    stream = commit("base", paths, "v1") + commit("change", [paths[len(paths) // 2]], "v2")
+    git(repo, "fast-import", "--quiet", input=stream.encode())
+    git(repo, "symbolic-ref", "HEAD", "refs/heads/main")
+    return repo
+
+
+def make_history_repo(repo: Path, n_commits: int, merge_every: int = 10) -> Path:
+    """
+    用 fast-import 生成一段有 n_commits 个 commit 的历史：每 merge_every 个 commit 中，有一个从 5 个 commit 之前分出的
+    旁支 commit，以及一个把它合并回来的 merge commit。提交时间逐个递增。所有 commit 的 tree 都是空的。
+    """
+    init_repo(repo)
+    author = f"{GIT_ENV['GIT_COMMITTER_NAME']} <{GIT_ENV['GIT_COMMITTER_EMAIL']}>"
+    lines = []
+    for i in range(1, n_commits + 1):
+        message = f"commit {i}"
+        lines += [
+            "commit refs/heads/main",
+            f"mark :{i}",
+            f"committer {author} {1700000000 + i} +0000",
+            f"data {len(message)}",
+            message,
+        ]
+        if i > 1:
+            if i % merge_every == merge_every - 1 and i > 5:
+                # 旁支 commit：从 5 个 commit 之前分出
+                lines.append(f"from :{i - 5}")
+            elif i % merge_every == 0 and i > 5:
+                lines += [f"from :{i - 2}", f"merge :{i - 1}"]
+            else:
+                lines.append(f"from :{i - 1}")
+    git(repo, "fast-import", "--quiet", input=("\n".join(lines) + "\n").encode())
+    git(repo, "symbolic-ref", "HEAD", "refs/heads/main")
+    return repo
+
+
+def make_loose_files(directory: Path, n_files: int, blob_size: int = 20, seed: int = 0) -> list[Path]:
+    """在仓库之外生成 n_files 个小文件，用于测试 hash-object -w 的批量写入"""
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    files = []
+    for i in range(n_files):
+        file = directory / f"f{i}"
+        file.write_bytes(_content(rng, blob_size))
+        files.append(file)
+    return files
+
+
+def list_objects(repo: Path, obj_type: Optional[str] = None) -> list[str]:
+    output = git(repo, "cat-file", "--batch-all-objects", "--batch-check=%(objectname) %(objecttype)").decode()
+    result = []
+    for line in output.splitlines():
+        sha, type_ = line.split()
+        if obj_type is None or type_ == obj_type:
+            result.append(sha)
+    return result
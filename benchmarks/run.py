@@ -0,0 +1,165 @@
+"""
+运行 benchmark 并输出 JSON 结果，或与基线比较。
+
+    python -m benchmarks.run --scale small --output results.json
+    python -m benchmarks.run --baseline baseline.json --threshold 0.2
+    python -m benchmarks.run --compare-only results.json --baseline baseline.json
+
+与基线比较时，若某个用例的中位数耗时比基线慢了超过 threshold（默认 20%），则视为回归，以返回值 1 退出。
+"""
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+from typing import Optional
+from pathlib import Path
+
+from benchmarks import suite
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_benchmark(run: suite.Runner, repeat: int, warmup: int) -> dict:
+    prepare = run.prepare if isinstance(run, suite.Prepared) else None
+
+    for _ in range(warmup):
+        if prepare is not None:
+            prepare()
+        suite.reset_caches()
+        run()
+
+    times = []
+    for _ in range(repeat):
+        if prepare is not None:
+            prepare()
+        suite.reset_caches()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "repeat": repeat,
+    }
+
+
+def run_all(scale: str, repeat: int, warmup: int, keyword: Optional[str], keep: bool) -> dict:
+    params = suite.SCALES[scale]
+    workdir = suite.new_workdir()
+    fixtures: dict[str, Path] = {}
+    results: dict[str, dict] = {}
+
+    try:
+        for bench in suite.BENCHMARKS:
+            if keyword and keyword not in bench.name:
+                continue
+
+            if bench.fixture is None:
+                root = workdir / f"bench-{len(results)}"
+                root.mkdir()
+            else:
+                if bench.fixture not in fixtures:
+                    print(f"generating fixture {bench.fixture} ...", file=sys.stderr)
+                    fixtures[bench.fixture] = suite.make_fixture(bench.fixture, workdir, params)
+                root = fixtures[bench.fixture]
+
+            run = bench.setup(root, params)
+            results[bench.name] = time_benchmark(run, repeat, warmup)
+            print(f"{bench.name:<45} {results[bench.name]['median'] * 1000:>10.2f} ms", file=sys.stderr)
+    finally:
+        if keep:
+            print(f"fixtures kept in {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "scale": scale,
+            "params": params,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "revision": _git_revision(),
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """
+    返回所有回归的用例的描述。只比较两边都存在的用例，使用中位数。
+    """
+    if baseline["meta"].get("scale") != current["meta"].get("scale"):
+        print(
+            f"warning: comparing scale {current['meta'].get('scale')} against {baseline['meta'].get('scale')}",
+            file=sys.stderr,
+        )
+
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["median"] / base["median"] if base["median"] > 0 else float("inf")
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "  REGRESSION"
+            regressions.append(f"{name}: {base['median'] * 1000:.2f} ms -> {result['median'] * 1000:.2f} ms")
+        elif ratio < 1 - threshold:
+            mark = "  improved"
+        print(f"{name:<45} {ratio:>7.2f}x{mark}", file=sys.stderr)
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="xgit benchmarks")
+    parser.add_argument("--scale", choices=sorted(suite.SCALES), default="medium")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("-k", dest="keyword", help="只运行名字中包含该字符串的用例")
+    parser.add_argument("--output", type=Path, help="将结果以 JSON 写入该文件（默认输出到 stdout）")
+    parser.add_argument("--baseline", type=Path, help="与该 JSON 基线比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="超过基线多少比例视为回归")
+    parser.add_argument("--compare-only", type=Path, help="不运行，直接拿该 JSON 结果与基线比较")
+    parser.add_argument("--keep", action="store_true", help="保留生成的合成仓库")
+    args = parser.parse_args(argv)
+
+    if args.compare_only is not None:
+        if args.baseline is None:
+            parser.error("--compare-only requires --baseline")
+        current = json.loads(args.compare_only.read_text())
+    else:
+        current = run_all(args.scale, args.repeat, args.warmup, args.keyword, args.keep)
+        output = json.dumps(current, indent=2)
+        if args.output is not None:
+            args.output.write_text(output + "\n")
+        else:
+            print(output)
+
+    if args.baseline is not None:
+        regressions = compare(json.loads(args.baseline.read_text()), current, args.threshold)
+        if regressions:
+            print("\nregressions:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
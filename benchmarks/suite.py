@@ -0,0 +1,450 @@
+"""
+benchmark 用例。每个用例由 `@benchmark` 注册，接收所需的合成仓库（fixture）和规模参数，返回一个被计时的无参函数。
+
+命令通过 typer 的 CliRunner 在进程内调用，计时包含参数解析和输出，但不包含 Python 解释器的启动。
+每次计时之前都会清空 xgit 的进程内缓存，使每一次重复都相当于一次全新的命令调用。
+"""
+
+import os
+import random
+import shutil
+import asyncio
+import hashlib
+import tempfile
+import contextlib
+from typing import Callable, Optional
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from xgit.cli import app
+from xgit.types import pack, commit_graph, multi_pack_index
+from xgit.utils import object_name
+from xgit.utils.sha import extract_data
+from xgit.types.index import Index
+from xgit.types.types import Tree
+from xgit.utils.utils import check_exist
+from xgit.utils.constants import GIT_DIR
+from xgit.types.repository import ObjectStore
+
+from . import generators
+
+# 不同规模下的参数；small 用于快速冒烟，medium 为默认，large 接近真实的大仓库
+SCALES: dict[str, dict[str, int]] = {
+    "small": {
+        "n_files": 1_000,
+        "n_wide": 1_000,
+        "n_deep": 100,
+        "blob_mb": 1,
+        "n_ingest": 1_000,
+        "n_sample": 100,
+        "n_snapshot": 10_000,
+        "n_commits": 10_000,
+    },
+    "medium": {
+        "n_files": 20_000,
+        "n_wide": 10_000,
+        "n_deep": 1_000,
+        "blob_mb": 16,
+        "n_ingest": 10_000,
+        "n_sample": 500,
+        "n_snapshot": 100_000,
+        "n_commits": 100_000,
+    },
+    "large": {
+        "n_files": 200_000,
+        "n_wide": 100_000,
+        "n_deep": 10_000,
+        "blob_mb": 128,
+        "n_ingest": 100_000,
+        "n_sample": 2_000,
+        "n_snapshot": 1_000_000,
+        "n_commits": 1_000_000,
+    },
+}
+
+Runner = Callable[[], object]
+
+
+class Prepared:  # pylint: disable=too-few-public-methods
+    """
+    需要在每次计时前重置状态的用例：prepare 在计时开始前调用，不计入耗时
+    """
+
+    prepare: Callable[[], object]
+    run: Runner
+
+    def __init__(self, prepare: Callable[[], object], run: Runner):
+        self.prepare = prepare
+        self.run = run
+
+    def __call__(self):
+        return self.run()
+
+
+class Benchmark:  # pylint: disable=too-few-public-methods
+    name: str
+    fixture: Optional[str]
+    setup: Callable[..., Runner]
+
+    def __init__(self, name: str, fixture: Optional[str], setup: Callable[..., Runner]):
+        self.name = name
+        self.fixture = fixture
+        self.setup = setup
+
+
+BENCHMARKS: list[Benchmark] = []
+FIXTURES: dict[str, Callable[[Path, dict[str, int]], Path]] = {}
+
+# 每次计时前调用，用于清空进程内缓存
+CACHE_RESETS: list[Callable[[], None]] = [
+    pack.clear_cache,
+    pack.clear_delta_base_cache,
+    multi_pack_index.clear_cache,
+    commit_graph.clear_cache,
+    object_name.clear_cache,
+]
+
+# multi-pack-index 用例的 pack 数，与规模无关
+PACK_COUNTS = [1, 100, 500]
+
+
+def benchmark(name: str, fixture: Optional[str] = None):
+    def decorator(setup: Callable[..., Runner]) -> Callable[..., Runner]:
+        BENCHMARKS.append(Benchmark(name, fixture, setup))
+        return setup
+
+    return decorator
+
+
+def register_fixture(name: str):
+    def decorator(make: Callable[[Path, dict[str, int]], Path]):
+        FIXTURES[name] = make
+        return make
+
+    return decorator
+
+
+def reset_caches():
+    for reset in CACHE_RESETS:
+        reset()
+
+
+@contextlib.contextmanager
+def chdir(path: Path):
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def chdir_call(repo: Path, func: Callable):
+    with chdir(repo):
+        return func()
+
+
+_runner = CliRunner()
+
+
+def invoke(repo: Path, args: list[str]):
+    with chdir(repo):
+        result = _runner.invoke(app, args)
+    if result.exit_code != 0:
+        raise RuntimeError(f"xgit {' '.join(args)} exited with {result.exit_code}: {result.output[-500:]}")
+
+
+# ------------------------------------------------------------------ fixtures
+
+
+@register_fixture("loose")
+def _loose(root: Path, params: dict[str, int]) -> Path:
+    return generators.make_repo(root, params["n_files"])
+
+
+@register_fixture("packed")
+def _packed(root: Path, params: dict[str, int]) -> Path:
+    return generators.make_repo(root, params["n_files"], packed=True)
+
+
+@register_fixture("wide")
+def _wide(root: Path, params: dict[str, int]) -> Path:
+    return generators.make_wide_repo(root, params["n_wide"])
+
+
+@register_fixture("deep")
+def _deep(root: Path, params: dict[str, int]) -> Path:
+    return generators.make_deep_repo(root, params["n_deep"], depth=50)
+
+
+@register_fixture("large_blob")
+def _large_blob(root: Path, params: dict[str, int]) -> Path:
+    return generators.make_large_blob_repo(root, n_files=2, blob_size=params["blob_mb"] << 20)
+
+
+def _multi_pack(n_packs: int):
+    def make(root: Path, params: dict[str, int]) -> Path:
+        return generators.make_multi_pack_repo(root, params["n_files"], n_packs)
+
+    return make
+
+
+for _n_packs in PACK_COUNTS:
+    register_fixture(f"packs_{_n_packs}")(_multi_pack(_n_packs))
+
+
+@register_fixture("sparse")
+def _sparse(root: Path, params: dict[str, int]) -> Path:
+    return generators.make_sparse_repo(root, params["n_files"])
+
+
+@register_fixture("snapshots")
+def _snapshots(root: Path, params: dict[str, int]) -> Path:
+    return generators.make_snapshot_repo(root, params["n_snapshot"])
+
+
+@register_fixture("history")
+def _history(root: Path, params: dict[str, int]) -> Path:
+    return generators.make_history_repo(root, params["n_commits"])
+
+
+def _sample(repo: Path, params: dict[str, int], obj_type: Optional[str] = None) -> list[str]:
+    objects = generators.list_objects(repo, obj_type)
+    step = max(1, len(objects) // params["n_sample"])
+    return objects[::step][: params["n_sample"]]
+
+
+def _read_index(repo: Path) -> bytes:
+    return (repo / GIT_DIR / "index").read_bytes()
+
+
+# ------------------------------------------------------------------ commands
+
+
+@benchmark("cmd/hash-object", fixture="loose")
+def _hash_object(repo: Path, params: dict[str, int]) -> Runner:
+    files = [str(p) for p in sorted(repo.glob("d0/*/*.txt"))][: params["n_sample"]]
+    return lambda: invoke(repo, ["hash-object", *files])
+
+
+@benchmark("cmd/hash-object -w (ingest)")
+def _hash_object_write(root: Path, params: dict[str, int]) -> Runner:
+    files = [str(f) for f in generators.make_loose_files(root / "input", params["n_ingest"])]
+    target = root / "target"
+
+    def prepare():
+        shutil.rmtree(target, ignore_errors=True)
+        generators.init_repo(target)
+
+    return Prepared(prepare, lambda: invoke(target, ["hash-object", "-w", *files]))
+
+
+def _cat_file(repo: Path, params: dict[str, int], abbrev: int = 40) -> Runner:
+    shas = [sha[:abbrev] for sha in _sample(repo, params, "blob")]
+
+    def run():
+        for sha in shas:
+            invoke(repo, ["cat-file", "-p", sha])
+
+    return run
+
+
+@benchmark("cmd/cat-file -p (loose)", fixture="loose")
+def _cat_file_loose(repo: Path, params: dict[str, int]) -> Runner:
+    return _cat_file(repo, params)
+
+
+@benchmark("cmd/cat-file -p (packed)", fixture="packed")
+def _cat_file_packed(repo: Path, params: dict[str, int]) -> Runner:
+    return _cat_file(repo, params)
+
+
+@benchmark("cmd/cat-file -p (abbrev, packed)", fixture="packed")
+def _cat_file_abbrev(repo: Path, params: dict[str, int]) -> Runner:
+    return _cat_file(repo, params, abbrev=7)
+
+
+@benchmark("cmd/cat-file -s (large blob)", fixture="large_blob")
+def _cat_file_large(repo: Path, _params: dict[str, int]) -> Runner:
+    shas = generators.list_objects(repo, "blob")
+    return lambda: [invoke(repo, ["cat-file", "-s", sha]) for sha in shas]
+
+
+@benchmark("cmd/ls-files", fixture="loose")
+def _ls_files(repo: Path, _params: dict[str, int]) -> Runner:
+    return lambda: invoke(repo, ["ls-files"])
+
+
+@benchmark("cmd/ls-files (sparse index, in cone)", fixture="sparse")
+def _ls_files_sparse(repo: Path, _params: dict[str, int]) -> Runner:
+    return lambda: invoke(repo / "d0" / "d0", ["ls-files"])
+
+
+@benchmark("cmd/ls-files --sparse (sparse index)", fixture="sparse")
+def _ls_files_sparse_collapsed(repo: Path, _params: dict[str, int]) -> Runner:
+    return lambda: invoke(repo, ["ls-files", "--sparse"])
+
+
+@benchmark("cmd/show-index", fixture="loose")
+def _show_index(repo: Path, _params: dict[str, int]) -> Runner:
+    return lambda: invoke(repo, ["show-index"])
+
+
+def _snapshot_commits(repo: Path) -> list[str]:
+    return generators.git(repo, "rev-parse", "HEAD~1", "HEAD").decode().split()
+
+
+@benchmark("cmd/ls-tree -r", fixture="snapshots")
+def _ls_tree(repo: Path, _params: dict[str, int]) -> Runner:
+    commit = _snapshot_commits(repo)[1]
+    return lambda: invoke(repo, ["ls-tree", "-r", commit])
+
+
+@benchmark("cmd/diff-tree -r (one change)", fixture="snapshots")
+def _diff_tree(repo: Path, _params: dict[str, int]) -> Runner:
+    commits = _snapshot_commits(repo)
+    return lambda: invoke(repo, ["diff-tree", "-r", *commits])
+
+
+def _rev_list_count(repo: Path, _params: dict[str, int], graph: bool) -> Runner:
+    graph_path = repo / GIT_DIR / "objects" / "info" / commit_graph.COMMIT_GRAPH_NAME
+    if graph:
+        commit_graph.write_commit_graph(repo, [generators.git(repo, "rev-parse", "HEAD").decode().strip()])
+    else:
+        graph_path.unlink(missing_ok=True)
+    return lambda: invoke(repo, ["rev-list", "--count", "HEAD"])
+
+
+@benchmark("cmd/rev-list --count", fixture="history")
+def _rev_list(repo: Path, params: dict[str, int]) -> Runner:
+    return _rev_list_count(repo, params, graph=False)
+
+
+@benchmark("cmd/rev-list --count (commit-graph)", fixture="history")
+def _rev_list_graph(repo: Path, params: dict[str, int]) -> Runner:
+    return _rev_list_count(repo, params, graph=True)
+
+
+@benchmark("cmd/rev-list A..B (100 apart, commit-graph)", fixture="history")
+def _rev_list_range(repo: Path, _params: dict[str, int]) -> Runner:
+    commit_graph.write_commit_graph(repo, [generators.git(repo, "rev-parse", "HEAD").decode().strip()])
+    # 只需要遍历 A 和 B 之间的 commit，与整个历史的长度无关
+    base = generators.git(repo, "rev-parse", "HEAD~100").decode().strip()
+    return lambda: invoke(repo, ["rev-list", "--count", f"{base}..HEAD"])
+
+
+@benchmark("cmd/log -n 100", fixture="history")
+def _log(repo: Path, _params: dict[str, int]) -> Runner:
+    return lambda: invoke(repo, ["log", "-n", "100"])
+
+
+@benchmark("cmd/fsck (loose)", fixture="loose")
+def _fsck_loose(repo: Path, _params: dict[str, int]) -> Runner:
+    return lambda: invoke(repo, ["fsck"])
+
+
+@benchmark("cmd/fsck (packed)", fixture="packed")
+def _fsck_packed(repo: Path, _params: dict[str, int]) -> Runner:
+    return lambda: invoke(repo, ["fsck"])
+
+
+# ------------------------------------------------------------------ core functions
+
+
+@benchmark("core/Index.__init__", fixture="loose")
+def _index_init(repo: Path, _params: dict[str, int]) -> Runner:
+    data = _read_index(repo)
+    return lambda: chdir_call(repo, lambda: Index(data))
+
+
+@benchmark("core/Index.__init__ (sparse index)", fixture="sparse")
+def _index_init_sparse(repo: Path, _params: dict[str, int]) -> Runner:
+    data = _read_index(repo)
+    return lambda: chdir_call(repo, lambda: Index(data))
+
+
+@benchmark("core/Index.to_bytes", fixture="loose")
+def _index_to_bytes(repo: Path, _params: dict[str, int]) -> Runner:
+    data = _read_index(repo)
+    index = chdir_call(repo, lambda: Index(data))
+    return lambda: chdir_call(repo, index.to_bytes)
+
+
+@benchmark("core/index checksum", fixture="loose")
+def _index_checksum(repo: Path, _params: dict[str, int]) -> Runner:
+    data = _read_index(repo)
+    return lambda: hashlib.sha1(data[:-20]).digest()
+
+
+@benchmark("core/Tree.__init__ (wide)", fixture="wide")
+def _tree_wide(repo: Path, _params: dict[str, int]) -> Runner:
+    data = chdir_call(repo, lambda: extract_data(generators.git(repo, "rev-parse", "HEAD^{tree}").decode().strip()))
+    body = data.split(b"\x00", maxsplit=1)[1]
+    return lambda: Tree(body)
+
+
+@benchmark("core/Tree.__init__ (deep chain)", fixture="deep")
+def _tree_deep(repo: Path, _params: dict[str, int]) -> Runner:
+    bodies = [
+        chdir_call(repo, lambda sha=sha: extract_data(sha)).split(b"\x00", maxsplit=1)[1]
+        for sha in generators.list_objects(repo, "tree")
+    ]
+    return lambda: [Tree(body) for body in bodies]
+
+
+@benchmark("core/extract_data (loose)", fixture="loose")
+def _extract_loose(repo: Path, params: dict[str, int]) -> Runner:
+    shas = _sample(repo, params)
+    return lambda: chdir_call(repo, lambda: [extract_data(sha) for sha in shas])
+
+
+@benchmark("core/extract_data (packed)", fixture="packed")
+def _extract_packed(repo: Path, params: dict[str, int]) -> Runner:
+    shas = _sample(repo, params)
+    return lambda: chdir_call(repo, lambda: [extract_data(sha) for sha in shas])
+
+
+@benchmark("core/extract_data (large blob)", fixture="large_blob")
+def _extract_large(repo: Path, _params: dict[str, int]) -> Runner:
+    shas = generators.list_objects(repo, "blob")
+    return lambda: chdir_call(repo, lambda: [extract_data(sha) for sha in shas])
+
+
+def _lookup(repo: Path, params: dict[str, int], midx: bool) -> Runner:
+    midx_path = repo / GIT_DIR / "objects" / "pack" / "multi-pack-index"
+    if midx:
+        multi_pack_index.write_multi_pack_index(repo)
+    else:
+        midx_path.unlink(missing_ok=True)
+    shas = _sample(repo, params)
+    # 每次计时前缓存都会被清空，因此包含了打开 idx / multi-pack-index 的开销
+    return lambda: chdir_call(repo, lambda: [check_exist(sha) for sha in shas])
+
+
+for _n_packs in PACK_COUNTS:
+    for _midx in (False, True):
+        benchmark(f"core/object lookup ({_n_packs} packs{', midx' if _midx else ''})", fixture=f"packs_{_n_packs}")(
+            lambda repo, params, midx=_midx: _lookup(repo, params, midx)
+        )
+
+
+@benchmark("async/ObjectStore.read x10k (packed)", fixture="packed")
+def _object_store_read(repo: Path, params: dict[str, int]) -> Runner:
+    rng = random.Random(0)
+    shas = _sample(repo, params)
+    names = [rng.choice(shas) for _ in range(10_000)]
+
+    async def read_all():
+        async with ObjectStore(repo) as store:
+            await asyncio.gather(*(store.read(name) for name in names))
+
+    return lambda: asyncio.run(read_all())
+
+
+def make_fixture(name: str, workdir: Path, params: dict[str, int]) -> Path:
+    return FIXTURES[name](workdir / name, params)
+
+
+def new_workdir() -> Path:
+    return Path(tempfile.mkdtemp(prefix="xgit-bench-"))
@@ -1,15 +1,44 @@
 import typer
 
-from xgit.commands import init, cat_file, ls_files, show_index, hash_object
+from xgit.utils import trace
+from xgit.commands.log import log
+from xgit.commands.fsck import fsck
+from xgit.commands.init import init
+from xgit.commands.ls_tree import ls_tree
+from xgit.commands.cat_file import cat_file
+from xgit.commands.ls_files import ls_files
+from xgit.commands.rev_list import rev_list
+from xgit.commands.diff_tree import diff_tree
+from xgit.commands.show_index import show_index
+from xgit.commands.hash_object import hash_object
+from xgit.commands.commit_graph import commit_graph
+from xgit.commands.sparse_checkout import sparse_checkout
+from xgit.commands.multi_pack_index import multi_pack_index
 
 app = typer.Typer(add_completion=False, rich_markup_mode="markdown")
 
 
-app.command()(hash_object.hash_object)
-app.command()(init.init)
-app.command()(cat_file.cat_file)
-app.command()(ls_files.ls_files)
-app.command(hidden=True)(show_index.show_index)
+def command(func, hidden: bool = False):
+    """
+    注册一个命令；每个命令的执行都是 XGIT_TRACE_PERF 中的一个顶层 region
+    """
+    name = func.__name__.replace("_", "-")
+    app.command(name=name, hidden=hidden)(trace.traced(f"cmd/{name}")(func))
+
+
+command(hash_object)
+command(init)
+command(cat_file)
+command(ls_files)
+command(ls_tree)
+command(diff_tree)
+command(show_index, hidden=True)
+command(fsck)
+command(multi_pack_index)
+command(rev_list)
+command(log)
+command(commit_graph)
+command(sparse_checkout)
 
 
 def main():
@@ -5,9 +5,11 @@ import typer
 from typer import Option, Argument
 from typing_extensions import Annotated
 
+from xgit.utils import trace
 from xgit.utils.sha import extract_data
 from xgit.types.types import Factory
 from xgit.utils.utils import check_exist
+from xgit.utils.object_name import is_hex, resolve_object_name
 
 
 def cat_file(
@@ -49,15 +51,20 @@ def cat_file(
             typer.echo("fatal: <type> and <obj> are both required if no option is not used", err=True)
             sys.exit(1)
 
-    # `-e` 选项不打印内容，只返回 0 或者 1
-    if exists:
+    # `-e` 选项不打印内容，只返回 0 或者 1；与 git 一致，只有完整的 id 可以不存在
+    if exists and len(obj) == 40 and is_hex(obj.lower()):
         sys.exit(0 if check_exist(obj=obj) else 1)
 
-    if not check_exist(obj=obj):
+    # obj 可以是缩写的 id，需要先解析为完整的 id
+    object_id = resolve_object_name(obj)
+    if object_id is None:
         typer.echo(f"fatal: Not a valid obj name {obj}", err=True)
         sys.exit(128)
 
-    data = extract_data(object_id=obj)
+    if exists:
+        sys.exit(0)
+
+    data = extract_data(object_id=object_id)
 
     hdr, data = data.split(b"\x00", maxsplit=1)
     type_, size = hdr.split(b" ", maxsplit=1)
@@ -71,11 +78,14 @@ def cat_file(
         return
 
     if pretty:
-        Factory.get_obj(data=data, obj_type=type_).print()
+        parsed = Factory.get_obj(data=data, obj_type=type_)
+        with trace.region("output"):
+            parsed.print()
         return
 
     assert type is not None
     if type_.decode() != type:
         typer.echo(f"fatal: obj {obj} is of type {type_!r}, not {type!r}", err=True)
         sys.exit(128)
-    sys.stdout.buffer.write(data)
+    with trace.region("output"):
+        sys.stdout.buffer.write(data)
@@ -0,0 +1,48 @@
+import sys
+from enum import Enum
+
+import typer
+from typer import Option, Argument
+from typing_extensions import Annotated
+
+from xgit.utils.refs import list_refs
+from xgit.utils.utils import find_repo
+from xgit.utils.errors import ObjectTypeError, ObjectNotFoundError
+from xgit.types.commit_graph import write_commit_graph, verify_commit_graph
+
+
+class Subcommand(str, Enum):
+    WRITE = "write"
+    VERIFY = "verify"
+
+
+def commit_graph(
+    subcommand: Annotated[Subcommand, Argument(help="write: 生成；verify: 校验")],
+    reachable: Annotated[
+        bool, Option("--reachable", help="从所有引用出发，而不是从所有 pack 中的 commit 出发")
+    ] = False,
+):
+    """
+    生成或校验 `objects/info/commit-graph`。有了它，遍历历史时不需要解压 commit 对象，
+    而 generation number 可以让祖先查询提前结束。
+    """
+    repo_dir = find_repo()
+
+    if subcommand == Subcommand.WRITE:
+        try:
+            write_commit_graph(repo_dir, list_refs(repo_dir).values() if reachable else None)
+        except ObjectNotFoundError as e:
+            typer.echo(f"error: Could not read {e.name}", err=True)
+            typer.echo(f"fatal: unable to parse commit {e.name}", err=True)
+            sys.exit(128)
+        except ObjectTypeError as e:
+            typer.echo(f"error: {e}", err=True)
+            typer.echo(f"fatal: unable to parse commit {e.name}", err=True)
+            sys.exit(128)
+        return
+
+    errors = verify_commit_graph(repo_dir)
+    for error in errors:
+        typer.echo(error, err=True)
+    if errors:
+        sys.exit(1)
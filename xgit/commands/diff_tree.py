@@ -0,0 +1,71 @@
+import sys
+from typing import Optional
+
+import typer
+from typer import Option, Argument
+from typing_extensions import Annotated
+
+from xgit.utils import trace
+from xgit.utils.sha import extract_data
+from xgit.types.types import Commit
+from xgit.utils.errors import ObjectTypeError
+from xgit.types.tree_walk import TreeReader, diff_trees
+from xgit.utils.object_name import resolve_object_name
+
+
+def _first_parent(commit_id: str) -> Optional[str]:
+    header, content = extract_data(commit_id).split(b"\x00", maxsplit=1)
+    if not header.startswith(b"commit "):
+        typer.echo(f"fatal: {commit_id} is not a commit", err=True)
+        sys.exit(128)
+    parents = Commit(content).parents
+    return parents[0] if parents else None
+
+
+def diff_tree(
+    tree_ish: Annotated[list[str], Argument(help="要比较的两个 tree；只给出一个 commit 时与它的第一个父提交比较")],
+    recursive: Annotated[bool, Option("-r", help="递归进入子树")] = False,
+    show_trees: Annotated[bool, Option("-t", help="递归时也输出子树本身，隐含 -r")] = False,
+    name_only: Annotated[bool, Option("--name-only", help="只输出路径")] = False,
+    name_status: Annotated[bool, Option("--name-status", help="只输出状态和路径")] = False,
+):
+    """
+    比较两个 tree，以 raw 格式输出差异。id 相同的子树不会被读取。
+    """
+    if len(tree_ish) > 2:
+        typer.echo("fatal: at most two trees can be compared", err=True)
+        sys.exit(128)
+
+    object_ids = []
+    for name in tree_ish:
+        object_id = resolve_object_name(name)
+        if object_id is None:
+            typer.echo(f"fatal: Not a valid object name {name}", err=True)
+            sys.exit(128)
+        object_ids.append(object_id)
+
+    if len(object_ids) == 1:
+        # 与 git 一致：先输出 commit 的 id；没有父提交时不输出任何内容
+        parent = _first_parent(object_ids[0])
+        if parent is None:
+            return
+        typer.echo(object_ids[0])
+        object_ids.insert(0, parent)
+
+    reader = TreeReader()
+    try:
+        old_id, new_id = (reader.peel(object_id) for object_id in object_ids)
+    except ObjectTypeError:
+        typer.echo("fatal: not a tree object", err=True)
+        sys.exit(128)
+
+    out = sys.stdout
+    with trace.region("diff-tree/diff"):
+        for change in diff_trees(reader, old_id, new_id, recursive or show_trees, show_trees):
+            if name_only:
+                out.write(change.path + "\n")
+            elif name_status:
+                out.write(f"{change.status}\t{change.path}\n")
+            else:
+                out.write(f"{change}\n")
+    trace.count("trees.read", reader.reads)
@@ -0,0 +1,311 @@
+import os
+import sys
+import time
+import zlib
+import hashlib
+from typing import Callable, Optional
+from pathlib import Path
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+
+import typer
+from typer import Option
+from typing_extensions import Annotated
+
+from xgit.utils import trace
+from xgit.types.pack import Pack, get_packs
+from xgit.types.types import Tag, Tree, Commit, Factory
+from xgit.utils.utils import find_repo
+from xgit.utils.constants import GIT_DIR
+from xgit.utils.object_name import is_hex
+
+# 每个任务校验的对象数；太小会使进程间通信的开销占主导，太大会使进度更新不及时、负载不均衡
+CHUNK_SIZE = 1024
+# 对象数少于该值时不启动子进程
+PARALLEL_THRESHOLD = 4 * CHUNK_SIZE
+
+# 与 git fsck 一致的返回值，按位或
+ERROR_OBJECT = 1
+ERROR_REACHABLE = 2
+ERROR_PACK = 4
+
+# 引用以 `源 id (20) + 目标 id (20) + 目标类型 (1)` 的紧凑格式在进程间传递
+TYPE_CODES = [b"blob", b"tree", b"commit", b"tag"]
+REF_SIZE = 41
+
+# 单个任务的结果：(对象数, 字节数, 错误信息, 引用, 损坏的对象)
+ChunkResult = tuple[int, int, list[str], bytes, list[bytes]]
+
+
+def _references(object_id: bytes, obj) -> bytes:
+    """
+    提取对象引用的其他对象：tree 的各个 entry、commit 的 tree 和 parent、tag 指向的对象
+    """
+    refs = bytearray()
+
+    def add(target: str, target_type: bytes):
+        refs.extend(object_id + bytes.fromhex(target) + bytes([TYPE_CODES.index(target_type)]))
+
+    if isinstance(obj, Tree):
+        for entry in obj.entries:
+            # submodule 指向的是其他仓库的 commit，不检查
+            if entry.obj_type != "commit":
+                add(entry.sha, entry.obj_type.encode())
+    elif isinstance(obj, Commit):
+        add(obj.tree, b"tree")
+        for parent in obj.parents:
+            add(parent, b"commit")
+    elif isinstance(obj, Tag) and obj.type.encode() in TYPE_CODES:
+        add(obj.object, obj.type.encode())
+    return bytes(refs)
+
+
+def _check_object(object_id: bytes, obj_type: bytes, content: bytes) -> tuple[list[str], bytes]:
+    """
+    检查对象能否被解析，返回 (错误信息, 引用)
+    """
+    if obj_type not in TYPE_CODES:
+        return [f"error: {object_id.hex()}: unknown object type {obj_type.decode(errors='replace')}"], b""
+    try:
+        obj = Factory.TYPE_TO_CLASS[obj_type](content)
+        return [], _references(object_id, obj)
+    except Exception:  # pylint: disable=broad-except
+        return [f"error: {object_id.hex()}: object could not be parsed as {obj_type.decode()}"], b""
+
+
+def _verify_loose(objects_dir: str, object_ids: list[str]) -> ChunkResult:  # pylint: disable=too-many-locals
+    errors: list[str] = []
+    refs = bytearray()
+    bad: list[bytes] = []
+    total_bytes = 0
+
+    for object_id in object_ids:
+        path = os.path.join(objects_dir, object_id[:2], object_id[2:])
+        rel_path = os.path.join(GIT_DIR, "objects", object_id[:2], object_id[2:])
+        try:
+            with open(path, "rb") as f:
+                raw = zlib.decompress(f.read())
+            header, content = raw.split(b"\x00", maxsplit=1)
+            obj_type, size = header.split(b" ", maxsplit=1)
+            size_ok = int(size) == len(content)
+        except (OSError, zlib.error, ValueError):
+            errors.append(f"error: object file {rel_path} is corrupt")
+            bad.append(bytes.fromhex(object_id))
+            continue
+
+        total_bytes += len(raw)
+        actual = hashlib.sha1(raw).hexdigest()
+        if actual != object_id:
+            errors.append(f"error: {actual}: hash-path mismatch, found at: {rel_path}")
+            bad.append(bytes.fromhex(object_id))
+            continue
+        if not size_ok:
+            errors.append(f"error: {object_id}: object size mismatch, found at: {rel_path}")
+            bad.append(bytes.fromhex(object_id))
+            continue
+
+        object_errors, object_refs = _check_object(bytes.fromhex(object_id), obj_type, content)
+        errors.extend(object_errors)
+        refs += object_refs
+
+    return len(object_ids), total_bytes, errors, bytes(refs), bad
+
+
+def _verify_packed(idx_path: str, entries: list[tuple[int, bytes]]) -> ChunkResult:
+    pack = Pack(Path(idx_path))
+    errors: list[str] = []
+    refs = bytearray()
+    bad: list[bytes] = []
+    total_bytes = 0
+
+    for offset, sha in entries:
+        try:
+            obj_type, content = pack.read_at(offset)
+        except Exception:  # pylint: disable=broad-except
+            errors.append(f"error: {sha.hex()}: object corrupt or missing in {pack.path.name} at offset {offset}")
+            bad.append(sha)
+            continue
+
+        total_bytes += len(content)
+        actual = hashlib.sha1(obj_type + b" " + str(len(content)).encode() + b"\x00" + content).digest()
+        if actual != sha:
+            errors.append(f"error: {sha.hex()}: hash mismatch in {pack.path.name}, found {actual.hex()}")
+            bad.append(sha)
+            continue
+
+        object_errors, object_refs = _check_object(sha, obj_type, content)
+        errors.extend(object_errors)
+        refs += object_refs
+
+    return len(entries), total_bytes, errors, bytes(refs), bad
+
+
+def _verify_pack_checksum(idx_path: str) -> ChunkResult:
+    """
+    pack 文件的最后 20 字节是之前所有内容的 SHA-1，idx 文件的最后 40 字节是 pack 的校验和与 idx 自身的校验和
+    """
+    idx = Path(idx_path)
+    pack = idx.with_suffix(".pack")
+    errors = []
+
+    digest = hashlib.sha1()
+    size = pack.stat().st_size
+    with pack.open("rb") as f:
+        remaining = size - 20
+        while remaining > 0:
+            chunk = f.read(min(1 << 20, remaining))
+            digest.update(chunk)
+            remaining -= len(chunk)
+        trailer = f.read(20)
+    if digest.digest() != trailer:
+        errors.append(f"error: {pack.name} SHA1 checksum mismatch")
+
+    idx_data = idx.read_bytes()
+    if idx_data[-40:-20] != trailer:
+        errors.append(f"error: {idx.name} does not match {pack.name}")
+    if hashlib.sha1(idx_data[:-20]).digest() != idx_data[-20:]:
+        errors.append(f"error: {idx.name} SHA1 checksum mismatch")
+
+    return 0, size, errors, b"", []
+
+
+def _enumerate(repo_dir: Path) -> tuple[list[tuple], set[bytes], int, list[str]]:
+    """
+    列出所有对象，返回 (任务列表, 所有对象的 id, 对象总数, fanout 目录中不是对象的文件)。每个任务是 (函数, 参数, 对象数)。
+    与 git 一致，写入对象时遗留的 `tmp_obj_*` 临时文件不算在内。
+    """
+    objects_dir = repo_dir / GIT_DIR / "objects"
+    tasks: list[tuple] = []
+    existing: set[bytes] = set()
+
+    loose: list[str] = []
+    garbage: list[str] = []
+    with os.scandir(objects_dir) as it:
+        for entry in it:
+            if len(entry.name) != 2 or not is_hex(entry.name) or not entry.is_dir():
+                continue
+            for name in os.listdir(entry.path):
+                if len(name) == 38 and is_hex(name):
+                    loose.append(entry.name + name)
+                elif not name.startswith("tmp_obj_"):
+                    garbage.append(os.path.join(GIT_DIR, "objects", entry.name, name))
+    for i in range(0, len(loose), CHUNK_SIZE):
+        object_ids = loose[i : i + CHUNK_SIZE]
+        tasks.append((_verify_loose, (str(objects_dir), object_ids), len(object_ids)))
+    existing.update(bytes.fromhex(object_id) for object_id in loose)
+
+    total = len(loose)
+    for pack in get_packs(repo_dir):
+        total += pack.index.count
+        tasks.append((_verify_pack_checksum, (str(pack.idx_path),), 0))
+        # 按偏移排序，使同一条 delta 链上的对象尽量落在同一个任务中
+        entries = pack.index.sorted_offsets()
+        for i in range(0, len(entries), CHUNK_SIZE):
+            chunk = entries[i : i + CHUNK_SIZE]
+            tasks.append((_verify_packed, (str(pack.idx_path), chunk), len(chunk)))
+        existing.update(sha for _, sha in entries)
+
+    return tasks, existing, total, sorted(garbage)
+
+
+class _Progress:
+    def __init__(self, total: int, enabled: bool):
+        self.total = total
+        self.enabled = enabled
+        self.done = 0
+        self.start = time.perf_counter()
+        self._last = 0.0
+
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.start
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def update(self, n: int):
+        self.done += n
+        now = time.perf_counter()
+        if self.enabled and now - self._last > 0.1:
+            self._last = now
+            self._print("\r")
+
+    def finish(self):
+        if self.enabled:
+            self._print("\r")
+            typer.echo(", done.", err=True)
+
+    def _print(self, prefix: str):
+        percent = self.done * 100 // self.total if self.total else 100
+        typer.echo(
+            f"{prefix}Checking objects: {percent:3d}% ({self.done}/{self.total}), {self.rate():.0f} objects/s",
+            err=True,
+            nl=False,
+        )
+
+
+def fsck(  # pylint: disable=too-many-locals
+    jobs: Annotated[int, Option("-j", "--jobs", help="并行校验的进程数，默认为 CPU 核数")] = 0,
+    progress: Annotated[Optional[bool], Option("--progress/--no-progress", help="在 stderr 中显示进度")] = None,
+):
+    """
+    校验对象数据库：检查所有 loose object 和 pack 中对象的 SHA-1、大小以及能否被解析，
+    并检查 tree、commit、tag 引用的对象是否存在。
+    """
+    repo_dir = find_repo()
+    jobs = jobs or os.cpu_count() or 1
+    if progress is None:
+        progress = sys.stderr.isatty()
+
+    with trace.region("fsck/enumerate"):
+        tasks, existing, total, garbage = _enumerate(repo_dir)
+    trace.count("fsck.objects", total)
+    # 与 git 一致，只报告而不影响返回值
+    for path in garbage:
+        typer.echo(f"bad sha1 file: {path}", err=True)
+
+    status = 0
+    refs = bytearray()
+    meter = _Progress(total, progress)
+    total_bytes = 0
+
+    def collect(func, result: ChunkResult):
+        nonlocal status, total_bytes
+        count, nbytes, errors, chunk_refs, bad = result
+        # 损坏的对象视为不存在
+        existing.difference_update(bad)
+        for error in errors:
+            typer.echo(error, err=True)
+        if errors:
+            status |= ERROR_PACK if func is _verify_pack_checksum else ERROR_OBJECT
+        refs.extend(chunk_refs)
+        total_bytes += nbytes
+        meter.update(count)
+
+    with trace.region("fsck/verify"):
+        if jobs == 1 or total < PARALLEL_THRESHOLD:
+            for func, args, _ in tasks:
+                collect(func, func(*args))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                futures: dict[Future, Callable] = {executor.submit(func, *args): func for func, args, _ in tasks}
+                for future in as_completed(futures):
+                    collect(futures[future], future.result())
+        meter.finish()
+    trace.count("fsck.bytes", total_bytes)
+
+    with trace.region("fsck/connectivity"):
+        missing: dict[bytes, bytes] = {}
+        view = memoryview(refs)
+        for i in range(0, len(view), REF_SIZE):
+            target = bytes(view[i + 20 : i + 40])
+            if target not in existing:
+                missing[target] = TYPE_CODES[view[i + 40]]
+        for target, target_type in sorted(missing.items()):
+            typer.echo(f"missing {target_type.decode()} {target.hex()}")
+        if missing:
+            status |= ERROR_REACHABLE
+
+    if progress:
+        elapsed = time.perf_counter() - meter.start
+        mib = total_bytes / (1 << 20)
+        typer.echo(f"Checked {total} objects ({mib:.1f} MiB) in {elapsed:.2f}s, {meter.rate():.0f} objects/s", err=True)
+
+    if status:
+        sys.exit(status)
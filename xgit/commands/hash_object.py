@@ -6,6 +6,7 @@ from typer import Option, Argument
 from typing_extensions import Annotated
 
 from xgit.utils.sha import hash_file, do_hash_object
+from xgit.utils.object_writer import ObjectWriter
 
 
 def hash_object(
@@ -17,14 +18,18 @@ def hash_object(
     """
     计算对象的哈希值；如果指定了 -w，则将内容写入到对象数据库中。
     """
-    if stdin:
-        data = sys.stdin.read().encode()
-        object_id = do_hash_object(data, obj_type, write)
-        typer.echo(object_id)
+    # 所有对象共用一个 writer；不写入时不需要 repo
+    writer = ObjectWriter() if write else None
 
-    if not files:
-        return
+    try:
+        if stdin:
+            data = sys.stdin.read().encode()
+            object_id = do_hash_object(data, obj_type, write, writer=writer)
+            typer.echo(object_id)
 
-    for file in files:
-        object_id = hash_file(file, write)
-        typer.echo(object_id)
+        for file in files or []:
+            object_id = hash_file(file, write, writer=writer)
+            typer.echo(object_id)
+    finally:
+        if writer is not None:
+            writer.flush()
@@ -0,0 +1,62 @@
+import sys
+import datetime
+from typing import Optional
+
+from typer import Option, Argument
+from typing_extensions import Annotated
+
+from xgit.utils import trace
+from xgit.types.types import Commit
+from xgit.commands.rev_list import walk
+from xgit.types.commit_walk import CommitReader
+from xgit.utils.object_name import abbreviate
+
+
+def format_date(ident: str) -> str:
+    """
+    把 `Name <email> 1700000000 +0800` 中的时间格式化为 git 默认的 `Wed Nov 15 06:13:20 2023 +0800`
+    """
+    timestamp, tz = ident.rsplit(" ", 2)[1:]
+    minutes = int(tz[1:3]) * 60 + int(tz[3:5])
+    offset = datetime.timedelta(minutes=-minutes if tz[0] == "-" else minutes)
+    dt = datetime.datetime.fromtimestamp(int(timestamp), datetime.timezone(offset))
+    return f"{dt:%a %b} {dt.day} {dt:%H:%M:%S %Y} {tz}"
+
+
+def _format_medium(object_id: str, commit: Commit) -> str:
+    lines = [f"commit {object_id}"]
+    if len(commit.parents) > 1:
+        lines.append("Merge: " + " ".join(abbreviate(parent) for parent in commit.parents))
+    author = commit.author
+    lines.append(f"Author: {author.rsplit(' ', 2)[0]}")
+    lines.append(f"Date:   {format_date(author)}")
+    lines.append("")
+    lines.extend(f"    {line}" for line in commit.message.rstrip("\n").split("\n"))
+    return "\n".join(lines) + "\n"
+
+
+def log(
+    revisions: Annotated[Optional[list[str]], Argument(help="要遍历的 commit，默认为 HEAD")] = None,
+    max_count: Annotated[Optional[int], Option("-n", "--max-count", help="最多输出的 commit 数")] = None,
+    oneline: Annotated[bool, Option("--oneline", help="每个 commit 只输出缩写的 id 和标题")] = False,
+    first_parent: Annotated[bool, Option("--first-parent", help="只沿第一个 parent 遍历")] = False,
+    reverse: Annotated[bool, Option("--reverse", help="按相反的顺序输出")] = False,
+):
+    """
+    输出提交历史。遍历顺序与 rev-list 相同，只有被输出的 commit 才会被解压。
+    """
+    reader = CommitReader()
+    out = sys.stdout
+    with trace.region("log/walk"):
+        first = True
+        for node in walk(reader, revisions or ["HEAD"], first_parent, max_count, reverse):
+            object_id = reader.object_id(node)
+            commit = reader.commit(node)
+            if oneline:
+                out.write(f"{abbreviate(object_id)} {commit.message.split(chr(10), 1)[0]}\n")
+                continue
+            if not first:
+                out.write("\n")
+            first = False
+            out.write(_format_medium(object_id, commit))
+    trace.count("commits.parsed", reader.parsed)
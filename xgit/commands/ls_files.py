@@ -10,17 +10,19 @@ from xgit.utils.utils import find_repo
 
 def ls_files(
     full_name: Annotated[bool, Option("--full-name", help="输出相对于项目根目录，而非当前目录")] = False,
+    sparse: Annotated[bool, Option("--sparse", help="sparse index 中范围之外的目录只输出目录本身，不展开")] = False,
 ):
     """
     输出 index 中在当前目录下的所有文件
     """
     index = get_index()
-    for entry in index.entries:
-        f = find_repo() / entry.file_name
-        cwd = Path.cwd()
+    cwd = Path.cwd().resolve().relative_to(find_repo().resolve()).as_posix()
+    prefix = "" if cwd == "." else cwd + "/"
+
+    # 只展开与当前目录有关的 sparse directory
+    if not sparse:
+        index.expand(prefix)
 
-        if f.is_relative_to(cwd):
-            if full_name:
-                typer.echo(entry.file_name)
-            else:
-                typer.echo(f.relative_to(cwd))
+    for entry in index.entries:
+        if entry.file_name.startswith(prefix):
+            typer.echo(entry.file_name if full_name else entry.file_name[len(prefix) :])
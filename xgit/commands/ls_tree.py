@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+import typer
+from typer import Option, Argument
+from typing_extensions import Annotated
+
+from xgit.utils import trace
+from xgit.utils.utils import find_repo
+from xgit.utils.errors import ObjectTypeError
+from xgit.types.tree_walk import TreeReader, walk_tree
+from xgit.utils.object_name import resolve_object_name
+
+
+def ls_tree(
+    tree_ish: Annotated[str, Argument(help="要列出的 tree，也可以是 commit 或 tag")],
+    recursive: Annotated[bool, Option("-r", help="递归进入子树")] = False,
+    show_trees: Annotated[bool, Option("-t", help="递归时也输出子树本身")] = False,
+    trees_only: Annotated[bool, Option("-d", help="只输出子树")] = False,
+    name_only: Annotated[bool, Option("--name-only", help="只输出路径")] = False,
+    full_name: Annotated[bool, Option("--full-name", help="输出相对于项目根目录，而非当前目录的路径")] = False,
+    full_tree: Annotated[bool, Option("--full-tree", help="列出整个 tree，而不只是当前目录")] = False,
+):
+    """
+    列出 tree 中的 entry。与 git 一致，在子目录中执行时只列出当前目录对应的子树。
+    """
+    object_id = resolve_object_name(tree_ish)
+    if object_id is None:
+        typer.echo(f"fatal: Not a valid object name {tree_ish}", err=True)
+        sys.exit(128)
+
+    reader = TreeReader()
+    try:
+        tree_id = reader.peel(object_id)
+    except ObjectTypeError:
+        typer.echo("fatal: not a tree object", err=True)
+        sys.exit(128)
+
+    cwd = Path.cwd().resolve().relative_to(find_repo().resolve()).as_posix()
+    prefix = ""
+    if not full_tree and cwd != ".":
+        entry = reader.find(tree_id, cwd)
+        if entry is None or not entry.is_tree:
+            return
+        tree_id = entry.sha
+        if full_name:
+            prefix = cwd + "/"
+
+    out = sys.stdout
+    with trace.region("ls-tree/walk"):
+        for path, entry in walk_tree(reader, tree_id, recursive, show_trees, trees_only, prefix):
+            if name_only:
+                out.write(path + "\n")
+            else:
+                out.write(f"{entry.filemode} {entry.obj_type} {entry.sha}\t{path}\n")
+    trace.count("trees.read", reader.reads)
@@ -0,0 +1,31 @@
+import sys
+from enum import Enum
+
+import typer
+from typer import Argument
+from typing_extensions import Annotated
+
+from xgit.utils.utils import find_repo
+from xgit.types.multi_pack_index import write_multi_pack_index, verify_multi_pack_index
+
+
+class Subcommand(str, Enum):
+    WRITE = "write"
+    VERIFY = "verify"
+
+
+def multi_pack_index(subcommand: Annotated[Subcommand, Argument(help="write: 生成；verify: 校验")]):
+    """
+    生成或校验 `objects/pack/multi-pack-index`。有了它，在任意多个 pack 中查找对象都只需要一次二分查找。
+    """
+    repo_dir = find_repo()
+
+    if subcommand == Subcommand.WRITE:
+        write_multi_pack_index(repo_dir)
+        return
+
+    errors = verify_multi_pack_index(repo_dir)
+    for error in errors:
+        typer.echo(error, err=True)
+    if errors:
+        sys.exit(1)
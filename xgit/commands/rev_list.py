@@ -0,0 +1,89 @@
+import sys
+import itertools
+from typing import Iterator, Optional
+
+import typer
+from typer import Option, Argument
+from typing_extensions import Annotated
+
+from xgit.types import commit_walk
+from xgit.utils import trace
+from xgit.utils.errors import ObjectTypeError
+from xgit.types.commit_walk import Node, CommitReader
+from xgit.utils.object_name import resolve_object_name
+
+
+def _resolve(reader: CommitReader, name: str) -> str:
+    object_id = resolve_object_name(name)
+    if object_id is None:
+        typer.echo(f"fatal: bad revision '{name}'", err=True)
+        sys.exit(128)
+    try:
+        return reader.peel(object_id)
+    except ObjectTypeError as e:
+        typer.echo(f"fatal: {e}", err=True)
+        sys.exit(128)
+
+
+def parse_revisions(reader: CommitReader, revisions: list[str]) -> tuple[list[str], list[str]]:
+    """
+    把 `A`、`^A`、`A..B` 形式的参数解析为 (包含的 commit, 排除的 commit)
+    """
+    include: list[str] = []
+    exclude: list[str] = []
+    for revision in revisions:
+        if revision.startswith("^"):
+            exclude.append(_resolve(reader, revision[1:]))
+        elif ".." in revision:
+            left, _, right = revision.partition("..")
+            exclude.append(_resolve(reader, left or "HEAD"))
+            include.append(_resolve(reader, right or "HEAD"))
+        else:
+            include.append(_resolve(reader, revision))
+    return include, exclude
+
+
+def walk(
+    reader: CommitReader,
+    revisions: list[str],
+    first_parent: bool = False,
+    max_count: Optional[int] = None,
+    reverse: bool = False,
+) -> Iterator[Node]:
+    """
+    解析参数，按 rev-list 的顺序产出 commit 节点；log 也使用它
+    """
+    include, exclude = parse_revisions(reader, revisions)
+    nodes = commit_walk.rev_list(reader, include, exclude, first_parent=first_parent)
+    if max_count is not None:
+        nodes = itertools.islice(nodes, max_count)
+    if reverse:
+        nodes = reversed(list(nodes))
+    return nodes
+
+
+def rev_list(
+    revisions: Annotated[list[str], Argument(help="要遍历的 commit；`^A` 和 `A..B` 表示排除从 A 可达的 commit")],
+    count: Annotated[bool, Option("--count", help="只输出 commit 的数量")] = False,
+    max_count: Annotated[Optional[int], Option("-n", "--max-count", help="最多输出的 commit 数")] = None,
+    parents: Annotated[bool, Option("--parents", help="同时输出每个 commit 的 parent")] = False,
+    first_parent: Annotated[bool, Option("--first-parent", help="只沿第一个 parent 遍历")] = False,
+    reverse: Annotated[bool, Option("--reverse", help="按相反的顺序输出")] = False,
+):
+    """
+    按提交时间从新到旧列出 commit。存在 `objects/info/commit-graph` 时，parent 和提交时间直接从中读取，不需要解压 commit 对象。
+    """
+    reader = CommitReader()
+    out = sys.stdout
+    with trace.region("rev-list/walk"):
+        nodes = walk(reader, revisions, first_parent, max_count, reverse)
+        if count:
+            typer.echo(sum(1 for _ in nodes))
+        else:
+            for node in nodes:
+                line = reader.object_id(node)
+                if parents:
+                    node_parents = reader.parents(node)
+                    line = " ".join([line, *map(reader.object_id, node_parents[:1] if first_parent else node_parents)])
+                out.write(line + "\n")
+    trace.count("commits.parsed", reader.parsed)
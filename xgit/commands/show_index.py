@@ -16,19 +16,23 @@ def show_index(
     """
     以可读的方式输出 index。只打印当前目录和子目录下在的 index 中的 entry，不打印父目录中的其他 entry。
     这并非 git 本身支持的功能，只是为了方便调试和展示结果。
+    sparse index 中范围之外的目录以一个 entry 展示，只有指定的文件所在的目录会被展开。
     """
     index = get_index()
 
-    cwd = Path.cwd().resolve()
     repo = find_repo().resolve()
+    cwd = Path.cwd().resolve().relative_to(repo).as_posix()
+    prefix = "" if cwd == "." else cwd + "/"
 
     # 如果指定了 files，则只打印这些文件的 entry
     if files:
-        file_paths = [Path(cwd / f).resolve() for f in files]
-        index.entries = [e for e in index.entries if repo / e.file_name in file_paths]
+        names = {(Path.cwd() / f).resolve().relative_to(repo).as_posix() for f in files}
+        for name in names:
+            index.expand(name)
+        index.entries = [e for e in index.entries if e.file_name in names]
 
     # 只打印当前目录和子目录下在的 index 中的 entry
-    index.entries = [e for e in index.entries if Path(repo / e.file_name).is_relative_to(cwd)]
+    index.entries = [e for e in index.entries if e.file_name.startswith(prefix)]
 
     if verbose:
         for entry in index.entries:
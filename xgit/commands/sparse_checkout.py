@@ -0,0 +1,134 @@
+import os
+import sys
+from enum import Enum
+from typing import Optional
+from pathlib import Path
+
+import typer
+from typer import Option, Argument
+from typing_extensions import Annotated
+
+from xgit.utils import trace
+from xgit.utils.sha import hash_file, extract_data, do_hash_object
+from xgit.types.index import Index, IndexEntry, get_index, write_index
+from xgit.utils.utils import find_repo, get_config, set_config, is_config_true
+from xgit.types.sparse_checkout import ConePatterns, read_sparse_checkout, write_sparse_checkout
+
+
+class Subcommand(str, Enum):
+    LIST = "list"
+    SET = "set"
+
+
+def _checkout_file(repo_dir: Path, entry: IndexEntry) -> bool:
+    """
+    把进入范围的文件写入工作区；工作区中已经有同名文件时保留它，返回是否写入
+    """
+    path = repo_dir / entry.file_name
+    if os.path.lexists(path):
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = extract_data(entry.sha, repo_dir=repo_dir).split(b"\x00", maxsplit=1)[1]
+    if entry.metadata.mode == 0o120000:
+        os.symlink(content, path)
+    else:
+        with open(path, "wb") as f:
+            f.write(content)
+        if entry.metadata.mode == 0o100755:
+            os.chmod(path, 0o755)
+    entry.refresh(os.lstat(path))
+    return True
+
+
+def _hash_worktree_file(path: Path) -> str:
+    if path.is_symlink():
+        return do_hash_object(os.readlink(path).encode(), "blob", write=False)
+    return hash_file(str(path))
+
+
+def _remove_file(repo_dir: Path, entry: IndexEntry) -> bool:
+    """
+    删除离开范围的文件。文件被修改过时保留它，返回 False，与 git 一样它不会被标记为 skip-worktree
+    """
+    path = repo_dir / entry.file_name
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return True
+    if not entry.stat_matches(st) and _hash_worktree_file(path) != entry.sha:
+        return False
+    os.unlink(path)
+
+    # 删除因此变空的目录
+    parent = path.parent
+    while parent != repo_dir:
+        try:
+            parent.rmdir()
+        except OSError:
+            break
+        parent = parent.parent
+    return True
+
+
+def update_worktree(index: Index, cone: ConePatterns) -> list[str]:
+    """
+    按照新的范围更新工作区和 index 中的 skip-worktree 标记，index 必须已经完全展开。
+    返回因为被修改过而没有被删除的文件。
+    """
+    repo_dir = index.repo_dir if index.repo_dir is not None else find_repo()
+    kept = []
+    with trace.region("sparse-checkout/update-worktree"):
+        for entry in index.entries:
+            # 冲突的文件和 submodule 保持原样
+            if entry.flags.stage != 0 or entry.metadata.mode == 0o160000:
+                continue
+            included = cone.includes(entry.file_name)
+            if included and entry.skip_worktree:
+                _checkout_file(repo_dir, entry)
+                entry.skip_worktree = False
+            elif not included and not entry.skip_worktree:
+                if _remove_file(repo_dir, entry):
+                    entry.skip_worktree = True
+                else:
+                    kept.append(entry.file_name)
+    return kept
+
+
+def sparse_checkout(
+    subcommand: Annotated[Subcommand, Argument(help="list: 列出包含的目录；set: 设置包含的目录并更新工作区")],
+    directories: Annotated[Optional[list[str]], Argument(help="set 时要包含的目录")] = None,
+    sparse_index: Annotated[
+        Optional[bool],
+        Option("--sparse-index/--no-sparse-index", help="是否把范围之外的目录折叠为 sparse index 中的一个 entry"),
+    ] = None,
+):
+    """
+    cone 模式的 sparse-checkout：工作区中只保留根目录下的文件和指定目录中的内容。
+    启用 sparse index 后，范围之外的目录在 index 中也只占一个 entry，读取 index 的开销只与范围内的文件数有关。
+    """
+    repo_dir = find_repo()
+
+    if subcommand == Subcommand.LIST:
+        cone = read_sparse_checkout(repo_dir)
+        if cone is None or not is_config_true(get_config("core", "sparseCheckout", repo_dir)):
+            typer.echo("fatal: this worktree is not sparse", err=True)
+            sys.exit(128)
+        for directory in cone.dirs():
+            typer.echo(directory)
+        return
+
+    cone = ConePatterns(directories or [])
+    set_config("extensions", "worktreeConfig", "true", repo_dir)
+    set_config("core", "sparseCheckout", "true", repo_dir, "config.worktree")
+    set_config("core", "sparseCheckoutCone", "true", repo_dir, "config.worktree")
+    if sparse_index is not None:
+        set_config("index", "sparse", "true" if sparse_index else "false", repo_dir, "config.worktree")
+    write_sparse_checkout(repo_dir, cone)
+
+    index = get_index()
+    index.expand()
+    for path in update_worktree(index, cone):
+        typer.echo(f"warning: {path} is not up to date and was left despite sparse patterns", err=True)
+    if is_config_true(get_config("index", "sparse", repo_dir)):
+        index.collapse(cone)
+    write_index(index)
@@ -1,9 +1,12 @@
+import os
+import hashlib
 import subprocess
 from pathlib import Path
 
 from typer.testing import CliRunner
 
 from xgit.test.test_utils import gen_random_sha, check_same_output, gen_random_string, temp_git_workspace
+from xgit.utils.object_name import resolve_object_id
 
 runner = CliRunner()
 
@@ -44,3 +47,83 @@ def test_cat_blob():
         random_sha = gen_random_sha()
         for i in to_test:
             assert check_same_output(["cat-file", i, random_sha])
+
+
+def _all_objects() -> list[tuple[str, str]]:
+    output = subprocess.run(
+        ["git", "cat-file", "--batch-all-objects", "--batch-check=%(objectname) %(objecttype)"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return [tuple(line.split()) for line in output.splitlines()]  # type: ignore
+
+
+def test_cat_abbrev():
+    with temp_git_workspace() as dir:
+        for i in range(600):
+            with open(Path(dir) / f"f{i}", "w", encoding="utf-8") as f:
+                f.write(f"{i}\n")
+
+        subprocess.run(["git", "add", "."], check=True)
+        subprocess.run(["git", "commit", "-m", "test"], check=True)
+
+        objs = [sha for sha, obj_type in _all_objects() if obj_type == "blob"]
+        for sha in objs[:50]:
+            for length in (4, 7, 12, 40):
+                for i in ["-t", "-e", "-p"]:
+                    assert check_same_output(["cat-file", i, sha[:length]])
+
+        # 600 个对象中一定有共享前 2 位的，它们的前 3 位不是合法的缩写，前 4 位有可能有歧义
+        prefixes = [sha[:4] for sha in objs]
+        ambiguous = [p for p in prefixes if prefixes.count(p) > 1]
+        for prefix in ambiguous[:5] + [objs[0][:3], "zzzz"]:
+            for i in ["-t", "-e"]:
+                assert check_same_output(["cat-file", i, prefix])
+
+        assert resolve_object_id(objs[0].upper()) == objs[0]
+
+        # 在缩写索引建立之后、同一个 mtime 内写入的对象也能被解析
+        assert resolve_object_id(objs[0][:7]) == objs[0]
+        loose_dir = Path(dir) / ".git" / "objects" / objs[0][:2]
+        st = loose_dir.stat()
+        i = 0
+        while hashlib.sha1(f"blob {len(str(i))}\0{i}".encode()).hexdigest()[:2] != objs[0][:2]:
+            i += 1
+        new_obj = subprocess.run(
+            ["git", "hash-object", "-w", "--stdin"], input=str(i), check=True, capture_output=True, text=True
+        ).stdout.strip()
+        os.utime(loose_dir, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert resolve_object_id(new_obj[:7]) == new_obj
+
+
+def test_cat_packed():
+    with temp_git_workspace() as dir:
+        # 多次修改同一个文件，使 pack 中出现 delta
+        content = gen_random_string(5000)
+        for i in range(20):
+            content = content[: 100 * i] + gen_random_string(50) + content[100 * i + 50 :]
+            with open(Path(dir) / "file", "w", encoding="utf-8") as f:
+                f.write(content)
+            subprocess.run(["git", "add", "."], check=True)
+            subprocess.run(["git", "commit", "-m", f"test {i}"], check=True)
+
+        subprocess.run(["git", "tag", "-a", "v1", "-m", "test tag"], check=True)
+        subprocess.run(["git", "gc", "--aggressive", "-q"], check=True)
+        subprocess.run(["git", "prune-packed"], check=True)
+
+        for sha, obj_type in _all_objects():
+            for i in ["-s", "-t", "-e"]:
+                assert check_same_output(["cat-file", i, sha])
+            if obj_type != "tree":
+                assert check_same_output(["cat-file", "-p", sha[:10]])
+                assert check_same_output(["cat-file", obj_type, sha[:10]])
+
+        for name in ["HEAD", "v1", "master"]:
+            assert check_same_output(["cat-file", "-t", name])
+
+        # .git 下的其他文件和内容损坏的引用都不是合法的名字
+        (Path(dir) / ".git" / "refs" / "heads" / "broken").write_text("junk\n", encoding="utf-8")
+        for name in ["config", "description", "index", "objects", "broken", "refs/heads/broken"]:
+            assert check_same_output(["cat-file", "-t", name])
+            assert check_same_output(["rev-list", name])
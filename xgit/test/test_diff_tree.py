@@ -0,0 +1,67 @@
+import os
+import subprocess
+from pathlib import Path
+
+from xgit.test.test_utils import check_same_output, temp_git_workspace
+from xgit.types.tree_walk import TreeReader, diff_trees
+
+
+def _commit() -> str:
+    subprocess.run(["git", "add", "-A"], check=True)
+    subprocess.run(["git", "commit", "-q", "-m", "test"], check=True)
+    return subprocess.run(["git", "rev-parse", "HEAD"], check=True, capture_output=True, text=True).stdout.strip()
+
+
+def test_diff_tree():
+    with temp_git_workspace() as dir:
+        root = Path(dir)
+        for path in ["a.txt", "b.txt", "c.txt", "x/y/z.txt", "x/w.txt", "q/r.txt"]:
+            file = root / path
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_text(path, encoding="utf-8")
+        first = _commit()
+
+        (root / "a.txt").write_text("changed", encoding="utf-8")
+        os.chmod(root / "b.txt", 0o755)
+        (root / "c.txt").unlink()
+        os.symlink("a.txt", root / "c.txt")
+        (root / "x" / "y" / "z.txt").unlink()
+        (root / "x" / "y" / "new.txt").write_text("new", encoding="utf-8")
+        (root / "q" / "r.txt").unlink()
+        (root / "q").rmdir()
+        (root / "q").write_text("q is a file now", encoding="utf-8")
+        second = _commit()
+
+        for args in [[], ["-r"], ["-t"], ["--name-only", "-r"], ["--name-status", "-r"]]:
+            assert check_same_output(["diff-tree", *args, first, second])
+            assert check_same_output(["diff-tree", *args, second, first])
+        assert check_same_output(["diff-tree", second])
+        assert check_same_output(["diff-tree", "-r", second[:7]])
+        assert check_same_output(["diff-tree", first])
+
+
+def test_diff_tree_short_circuit():
+    with temp_git_workspace() as dir:
+        root = Path(dir)
+        depth = 4
+        paths = [
+            f"d{i}/d{j}/d{k}/d{m}/f{n}.txt"
+            for i in range(3)
+            for j in range(3)
+            for k in range(3)
+            for m in range(3)
+            for n in range(3)
+        ]
+        for path in paths:
+            file = root / path
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_text(path, encoding="utf-8")
+        first = _commit()
+        (root / paths[-1]).write_text("changed", encoding="utf-8")
+        second = _commit()
+
+        reader = TreeReader()
+        changes = list(diff_trees(reader, reader.peel(first), reader.peel(second), recursive=True))
+        assert [change.path for change in changes] == [paths[-1]]
+        # 两边各读取从根到被修改文件路径上的 tree，其余子树都因 id 相同而被跳过
+        assert reader.reads == 2 * (depth + 1)
@@ -0,0 +1,95 @@
+import os
+import zlib
+import subprocess
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from xgit.cli import app
+from xgit.commands import fsck
+from xgit.test.test_utils import gen_random_string, temp_git_workspace
+
+runner = CliRunner(mix_stderr=False)
+
+
+def _make_history(dir: str):
+    for i in range(5):
+        for j in range(20):
+            file = Path(dir) / f"d{j % 3}" / f"f{j}"
+            file.parent.mkdir(exist_ok=True)
+            file.write_text(gen_random_string(200) if i in (0, j) else file.read_text(), encoding="utf-8")
+        subprocess.run(["git", "add", "."], check=True)
+        subprocess.run(["git", "commit", "-m", f"test {i}"], check=True)
+
+
+def _git_fsck() -> subprocess.CompletedProcess:
+    return subprocess.run(["git", "fsck", "--no-dangling"], capture_output=True, text=True, check=False)
+
+
+def test_fsck_ok(monkeypatch):
+    with temp_git_workspace() as dir:
+        _make_history(dir)
+        assert runner.invoke(app, ["fsck"]).exit_code == 0
+
+        subprocess.run(["git", "gc", "-q"], check=True)
+        result = runner.invoke(app, ["fsck"])
+        assert result.exit_code == 0
+        assert result.stdout == ""
+
+        # 强制使用多进程
+        monkeypatch.setattr(fsck, "PARALLEL_THRESHOLD", 0)
+        monkeypatch.setattr(fsck, "CHUNK_SIZE", 8)
+        assert runner.invoke(app, ["fsck", "-j", "2"]).exit_code == 0
+
+
+def test_fsck_broken(monkeypatch):
+    with temp_git_workspace() as dir:
+        _make_history(dir)
+
+        blobs = subprocess.run(
+            ["git", "ls-tree", "-r", "--object-only", "HEAD"], check=True, capture_output=True, text=True
+        ).stdout.split()
+
+        # 删除一个对象
+        missing = Path(dir) / ".git" / "objects" / blobs[0][:2] / blobs[0][2:]
+        missing.unlink()
+
+        # 用另一个对象的内容替换一个对象
+        corrupt = Path(dir) / ".git" / "objects" / blobs[1][:2] / blobs[1][2:]
+        os.chmod(corrupt, 0o644)
+        corrupt.write_bytes(zlib.compress(b"blob 3\x00abc"))
+
+        expected = _git_fsck()
+        for jobs in ["1", "2"]:
+            monkeypatch.setattr(fsck, "PARALLEL_THRESHOLD", 0 if jobs == "2" else fsck.PARALLEL_THRESHOLD)
+            result = runner.invoke(app, ["fsck", "-j", jobs])
+            assert result.exit_code == expected.returncode
+            # git 按遍历顺序输出，xgit 按 id 排序输出
+            assert sorted(result.stdout.splitlines()) == sorted(expected.stdout.splitlines())
+            assert "hash-path mismatch" in result.stderr
+
+
+def test_fsck_pack_and_garbage():
+    with temp_git_workspace() as dir:
+        _make_history(dir)
+        subprocess.run(["git", "gc", "-q"], check=True)
+
+        # fanout 目录中不是对象的文件只报告，不影响返回值；写入对象时的临时文件不报告
+        fanout = Path(dir) / ".git" / "objects" / "ab"
+        fanout.mkdir()
+        (fanout / ("z" * 38)).write_text("x", encoding="utf-8")
+        (fanout / "tmp_obj_123").write_text("x", encoding="utf-8")
+        result = runner.invoke(app, ["fsck"])
+        assert result.exit_code == 0
+        assert result.stderr == f"bad sha1 file: .git/objects/ab/{'z' * 38}\n"
+
+        # pack 的校验和不对时，与 git 一样返回 ERROR_PACK
+        pack = next((Path(dir) / ".git" / "objects" / "pack").glob("*.pack"))
+        os.chmod(pack, 0o644)
+        data = bytearray(pack.read_bytes())
+        data[-1] ^= 1
+        pack.write_bytes(bytes(data))
+        result = runner.invoke(app, ["fsck"])
+        assert result.exit_code == fsck.ERROR_PACK
+        assert _git_fsck().returncode & fsck.ERROR_PACK
+        assert f"error: {pack.name} SHA1 checksum mismatch" in result.stderr
@@ -1,12 +1,13 @@
 import tempfile
 import subprocess
+from pathlib import Path
 
 from typer.testing import CliRunner
 
 from xgit.cli import app
 from xgit.test.test_utils import gen_random_string, temp_xgit_workspace
 
-runner = CliRunner()
+runner = CliRunner(mix_stderr=False)
 
 
 def test_hash_value():
@@ -45,3 +46,37 @@ def test_hash_object_write():
             ).stdout
 
             assert content == read_by_git
+
+
+def test_hash_object_write_many():
+    with temp_xgit_workspace() as dir:
+        objects_dir = Path(dir) / ".git" / "objects"
+
+        # writeout-only 没有对应的方式，使用 fsync；无法识别的值与 git 一样被忽略
+        for method in ["none", "fsync", "batch", "writeout-only", "unknown"]:
+            # 每种方式使用不同的内容，否则对象已经存在，不会被再次写入
+            contents = [gen_random_string(100) for _ in range(50)]
+            files = []
+            for i, content in enumerate(contents + contents[:10]):
+                file = Path(dir) / f"{method}-{i}"
+                file.write_text(content, encoding="utf-8")
+                files.append(str(file))
+
+            subprocess.run(["git", "config", "core.fsyncMethod", method], check=True)
+            result = runner.invoke(app, ["hash-object", "-w"] + files)
+            assert result.exit_code == 0
+
+            expected = subprocess.run(["git", "hash-object"] + files, check=True, capture_output=True, text=True).stdout
+            assert result.stdout == expected
+            assert ("warning: ignoring unknown core.fsyncMethod" in result.stderr) == (method == "unknown")
+
+            for object_id, content in zip(result.stdout.split(), contents):
+                # 对象确实以 loose object 的形式被写入
+                assert (objects_dir / object_id[:2] / object_id[2:]).is_file()
+                read_by_git = subprocess.run(
+                    ["git", "cat-file", "blob", object_id], check=True, capture_output=True, text=True
+                ).stdout
+                assert content == read_by_git
+
+            # 不应残留临时文件
+            assert not list(objects_dir.glob("tmp_obj_*"))
@@ -0,0 +1,27 @@
+import os
+import subprocess
+from pathlib import Path
+
+from xgit.test.test_utils import check_same_output, temp_git_workspace
+
+
+def test_ls_tree():
+    with temp_git_workspace() as dir:
+        for path in ["a.txt", "a/b.txt", "a/c/d.txt", "a-b/e.txt", "z.txt"]:
+            file = Path(dir) / path
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_text(path, encoding="utf-8")
+        subprocess.run(["git", "add", "."], check=True)
+        subprocess.run(["git", "commit", "-m", "test"], check=True)
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], check=True, capture_output=True, text=True).stdout.strip()
+
+        for args in [[], ["-r"], ["-r", "-t"], ["-d"], ["-r", "-d"], ["--name-only", "-r"]]:
+            assert check_same_output(["ls-tree", *args, commit])
+            assert check_same_output(["ls-tree", *args, commit[:7]])
+
+        os.chdir("a")
+        for args in [[], ["-r"], ["--full-name"], ["--full-tree"], ["-r", "--full-name"]]:
+            assert check_same_output(["ls-tree", *args, commit])
+
+        blob = subprocess.run(["git", "rev-parse", "HEAD:a.txt"], check=True, capture_output=True, text=True)
+        assert check_same_output(["ls-tree", blob.stdout.strip()])
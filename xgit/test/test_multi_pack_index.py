@@ -0,0 +1,63 @@
+import subprocess
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from xgit.cli import app
+from xgit.test.test_utils import check_same_output, temp_git_workspace
+from xgit.types.multi_pack_index import MultiPackIndex
+
+runner = CliRunner()
+
+
+def _make_packs(dir: str, n_packs: int):
+    for i in range(n_packs):
+        for j in range(20):
+            (Path(dir) / f"f{j}").write_text(f"{i} {j}\n", encoding="utf-8")
+        subprocess.run(["git", "add", "."], check=True)
+        subprocess.run(["git", "commit", "-m", f"test {i}"], check=True)
+        subprocess.run(["git", "repack", "-q"], check=True)
+
+
+def _all_objects() -> list[str]:
+    return subprocess.run(
+        ["git", "cat-file", "--batch-all-objects", "--batch-check=%(objectname)"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+
+
+def test_multi_pack_index():
+    with temp_git_workspace() as dir:
+        _make_packs(dir, 8)
+        midx_path = Path(dir) / ".git" / "objects" / "pack" / "multi-pack-index"
+
+        assert runner.invoke(app, ["multi-pack-index", "write"]).exit_code == 0
+        subprocess.run(["git", "multi-pack-index", "verify"], check=True)
+        assert runner.invoke(app, ["multi-pack-index", "verify"]).exit_code == 0
+
+        # 与 git 生成的文件完全一致
+        written = midx_path.read_bytes()
+        midx_path.unlink()
+        subprocess.run(["git", "multi-pack-index", "write"], check=True)
+        assert midx_path.read_bytes() == written
+
+        midx = MultiPackIndex(midx_path)
+        objects = _all_objects()
+        assert midx.count == len(objects)
+        assert len(midx.pack_names) == 8
+
+        for sha in objects:
+            for i in ["-t", "-s"]:
+                assert check_same_output(["cat-file", i, sha[:8]])
+
+        # 新增一个没有被 multi-pack-index 覆盖的 pack
+        _make_packs(dir, 1)
+        for sha in _all_objects():
+            assert check_same_output(["cat-file", "-t", sha])
+
+        # repack 后 multi-pack-index 引用了不存在的 pack，应当被忽略
+        subprocess.run(["git", "repack", "-a", "-d", "-q", "--no-write-bitmap-index"], check=True)
+        for sha in _all_objects():
+            assert check_same_output(["cat-file", "-t", sha])
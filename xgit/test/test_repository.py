@@ -0,0 +1,125 @@
+import os
+import time
+import random
+import asyncio
+import tempfile
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from xgit.utils.errors import NotARepositoryError, ObjectNotFoundError, AmbiguousObjectError
+from xgit.test.test_utils import gen_random_sha, gen_random_string, temp_git_workspace
+from xgit.types.repository import Repository, ObjectStore
+
+
+def _git_objects() -> dict[str, tuple[str, bytes]]:
+    output = subprocess.run(
+        ["git", "cat-file", "--batch-all-objects", "--batch-check=%(objectname) %(objecttype)"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    objects = {}
+    for line in output.splitlines():
+        sha, obj_type = line.split()
+        data = subprocess.run(["git", "cat-file", obj_type, sha], check=True, capture_output=True).stdout
+        objects[sha] = (obj_type, data)
+    return objects
+
+
+def test_repository():
+    with temp_git_workspace() as dir:
+        for i in range(300):
+            (Path(dir) / f"f{i}").write_text(f"{i}\n", encoding="utf-8")
+        subprocess.run(["git", "add", "."], check=True)
+        subprocess.run(["git", "commit", "-m", "test"], check=True)
+        subprocess.run(["git", "gc", "-q"], check=True)
+        objects = _git_objects()
+
+        repo = Repository(dir)
+        content = gen_random_string().encode()
+        object_id = repo.write(content)
+        expected = subprocess.run(["git", "cat-file", "blob", object_id], check=True, capture_output=True).stdout
+        assert expected == content
+
+        with tempfile.TemporaryDirectory() as not_repo:
+            # Repository 只依赖构造时的路径，与当前工作目录无关
+            os.chdir(not_repo)
+            with pytest.raises(NotARepositoryError):
+                Repository()
+
+            for sha, (obj_type, data) in objects.items():
+                assert repo.read(sha) == (obj_type, data)
+                assert repo.read_header(sha[:10]) == (obj_type, len(data))
+
+            assert repo.read(object_id) == ("blob", content)
+            assert repo.read(object_id[:6]) == ("blob", content)
+            assert repo.read_header(object_id) == ("blob", len(content))
+            assert repo.exists(object_id)
+            assert not repo.exists(gen_random_sha())
+            # 40 个字符但不是 id 的名字不会被当作路径
+            assert not repo.exists(".." + "./" * 16 + "config")
+
+            with pytest.raises(ObjectNotFoundError):
+                repo.read(gen_random_sha())
+            os.chdir(dir)
+
+
+def test_ambiguous():
+    with temp_git_workspace() as dir:
+        repo = Repository(dir)
+        ids = [repo.write(f"{i}\n".encode()) for i in range(600)]
+        prefixes = [object_id[:4] for object_id in ids]
+        ambiguous = next(p for p in prefixes if prefixes.count(p) > 1)
+        with pytest.raises(AmbiguousObjectError) as e:
+            repo.read(ambiguous)
+        assert len(e.value.candidates) == prefixes.count(ambiguous)
+        assert not repo.exists(ambiguous)
+
+
+def test_object_store_load():
+    with temp_git_workspace() as dir:
+        for i in range(200):
+            (Path(dir) / f"f{i}").write_text(gen_random_string(200), encoding="utf-8")
+        subprocess.run(["git", "add", "."], check=True)
+        subprocess.run(["git", "commit", "-m", "test"], check=True)
+        subprocess.run(["git", "repack", "-q"], check=True)
+        objects = _git_objects()
+        ids = list(objects)
+
+        async def load_test():
+            async with ObjectStore(dir, max_workers=4) as store:
+                names = [random.choice(ids) for _ in range(10000)]
+                results = await asyncio.gather(*(store.read(name) for name in names))
+                for name, result in zip(names, results):
+                    assert result == objects[name]
+
+                headers = await asyncio.gather(*(store.read_header(name[:8]) for name in ids))
+                for name, header in zip(ids, headers):
+                    assert header == (objects[name][0], len(objects[name][1]))
+
+                # 缩写和完整的 id 的并发请求按同一个对象合并；读取变慢，保证它们确实是并发的
+                reads = []
+                read = store.repo.read
+
+                def slow_read(name: str):
+                    reads.append(name)
+                    time.sleep(0.2)
+                    return read(name)
+
+                store.repo.read = slow_read  # type: ignore
+                results = await asyncio.gather(store.read(ids[0]), store.read(ids[0][:8]), store.read(ids[0].upper()))
+                store.repo.read = read  # type: ignore
+                assert reads == [ids[0]] and results == [objects[ids[0]]] * 3
+
+                missing = await asyncio.gather(store.read(gen_random_sha()), return_exceptions=True)
+                assert isinstance(missing[0], ObjectNotFoundError)
+
+                object_id = await store.write(b"hello")
+                assert await store.exists(object_id)
+                return store.coalesced
+
+        coalesced = asyncio.run(load_test())
+        # 10000 个请求只涉及 200 多个对象，大部分请求都应该被合并
+        assert coalesced > 5000
@@ -0,0 +1,128 @@
+import os
+import subprocess
+from typing import Optional
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from xgit.cli import app
+from xgit.test.test_utils import check_same_output, temp_git_workspace
+from xgit.types.repository import Repository
+from xgit.types.commit_walk import CommitReader, rev_list, is_ancestor
+
+runner = CliRunner()
+
+
+def _git(*args: str, env: Optional[dict[str, str]] = None) -> str:
+    return subprocess.run(["git", *args], check=True, capture_output=True, text=True, env=env).stdout.strip()
+
+
+def _commit(dir: str, name: str, date: int):
+    (Path(dir) / name).write_text(name, encoding="utf-8")
+    _git("add", ".")
+    env = {**os.environ, "GIT_AUTHOR_DATE": f"{date} +0800", "GIT_COMMITTER_DATE": f"{date} -0130"}
+    _git("commit", "-q", "-m", f"{name}\n\nbody of {name}\n\n  indented", env=env)
+
+
+def _make_history(dir: str):
+    """
+    master 上有 10 个 commit，两个分支从中间分出后被一起 octopus merge 回 master；部分 commit 的提交时间相同或倒序
+    """
+    for i in range(10):
+        _commit(dir, f"m{i}", 1700000000 + i * 100)
+    _git("checkout", "-q", "-b", "a", "HEAD~5")
+    for i in range(3):
+        _commit(dir, f"a{i}", 1700000000 + 950 - i)
+    _git("checkout", "-q", "-b", "b", "master~2")
+    for i in range(3):
+        _commit(dir, f"b{i}", 1700000000 + 950)
+    _git("checkout", "-q", "master")
+    _git("merge", "-q", "--no-edit", "a", "b")
+    _git("tag", "-a", "v1", "-m", "tag", "a")
+
+
+def _check_history():
+    for args in [
+        ["rev-list", "HEAD"],
+        ["rev-list", "--count", "HEAD"],
+        ["rev-list", "--parents", "HEAD"],
+        ["rev-list", "--first-parent", "HEAD"],
+        ["rev-list", "--reverse", "-n", "5", "HEAD"],
+        ["rev-list", "master", "^a"],
+        ["rev-list", "a..b"],
+        ["rev-list", "v1"],
+        ["rev-list", "a", "b"],
+        ["log"],
+        ["log", "--oneline"],
+        ["log", "-n", "3", "b"],
+        ["log", "--first-parent", "--oneline"],
+    ]:
+        assert check_same_output(args)
+
+
+def test_rev_list():
+    with temp_git_workspace() as dir:
+        _make_history(dir)
+        _check_history()
+
+        graph = Path(dir) / ".git" / "objects" / "info" / "commit-graph"
+        assert runner.invoke(app, ["commit-graph", "write", "--reachable"]).exit_code == 0
+        _git("commit-graph", "verify")
+        assert runner.invoke(app, ["commit-graph", "verify"]).exit_code == 0
+        _check_history()
+
+        # 与 git 生成的文件完全一致
+        written = graph.read_bytes()
+        graph.unlink()
+        _git("commit-graph", "write", "--reachable")
+        assert graph.read_bytes() == written
+
+        # graph 过期：新的 commit 不在其中
+        _commit(dir, "new", 1700002000)
+        _check_history()
+
+        reader = CommitReader()
+        assert reader.graph is not None
+        head = _git("rev-parse", "HEAD")
+        assert is_ancestor(reader, _git("rev-parse", "a~2"), head)
+        assert not is_ancestor(reader, head, _git("rev-parse", "a"))
+        assert not is_ancestor(reader, _git("rev-parse", "a"), _git("rev-parse", "b"))
+        # 只有新 commit 需要被解压
+        assert reader.parsed == 1
+        assert Repository(dir).is_ancestor("a", "HEAD")
+
+        # 修改 core.commitGraph 后立即生效
+        _git("config", "core.commitGraph", "false")
+        assert CommitReader().graph is None
+        _git("config", "core.commitGraph", "true")
+        assert CommitReader().graph is not None
+
+
+def test_commit_graph_missing_parent():
+    with temp_git_workspace() as dir:
+        for i in range(3):
+            _commit(dir, f"m{i}", 1700000000 + i * 100)
+        parent = _git("rev-parse", "HEAD~1")
+        (Path(dir) / ".git" / "objects" / parent[:2] / parent[2:]).unlink()
+
+        # 与 git 一样报错退出，不写入 commit-graph
+        expected = subprocess.run(
+            ["git", "commit-graph", "write", "--reachable"], capture_output=True, text=True, check=False
+        )
+        result = runner.invoke(app, ["commit-graph", "write", "--reachable"])
+        assert result.exit_code == expected.returncode == 128
+        assert result.output.splitlines()[-1] == expected.stderr.splitlines()[-1]
+        assert not (Path(dir) / ".git" / "objects" / "info" / "commit-graph").exists()
+
+
+def test_rev_list_range_is_limited():
+    with temp_git_workspace() as dir:
+        for i in range(50):
+            _commit(dir, f"m{i}", 1700000000 + i * 100)
+        base, head = _git("rev-parse", "HEAD~3"), _git("rev-parse", "HEAD")
+        assert check_same_output(["rev-list", f"{base}..{head}"])
+
+        # 只需要读取 A..B 之间以及紧邻 A 的少数 commit，而不是 A 的全部历史
+        reader = CommitReader(use_graph=False)
+        assert len(list(rev_list(reader, [head], [base]))) == 3
+        assert reader.parsed < 10
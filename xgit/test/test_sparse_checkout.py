@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import subprocess
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from xgit.cli import app
+from xgit.types.index import get_index
+from xgit.test.test_utils import check_same_output, temp_git_workspace
+from xgit.types.sparse_checkout import ConePatterns
+
+runner = CliRunner()
+
+FILES = ["r1", "a/1", "a/x/2", "b/3", "b/c/4", "b/c/d/5", "b/e/6", "f/7"]
+
+
+def _git(*args: str, cwd=None) -> str:
+    return subprocess.run(["git", *args], check=True, capture_output=True, text=True, cwd=cwd).stdout
+
+
+def _make_repo(dir: str):
+    for name in FILES:
+        path = Path(dir) / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(name, encoding="utf-8")
+    _git("add", ".")
+    _git("-c", "user.name=xgit", "-c", "user.email=xgit@example.com", "commit", "-q", "-m", "init")
+
+
+def _state(dir: str) -> tuple[str, str, str, str]:
+    files = sorted(str(p.relative_to(dir)) for p in Path(dir).rglob("*") if ".git" not in p.parts)
+    return (
+        _git("ls-files", "--sparse", "-s", "-t", cwd=dir),
+        _git("status", "--porcelain", cwd=dir),
+        (Path(dir) / ".git" / "info" / "sparse-checkout").read_text(encoding="utf-8"),
+        "\n".join(files),
+    )
+
+
+def test_cone_patterns():
+    cone = ConePatterns(["b/c", "a/", "a/x"])
+    assert cone.to_text() == "/*\n!/*/\n/b/\n!/b/*/\n/a/\n/b/c/\n"
+    assert ConePatterns.parse(cone.to_text()).dirs() == ["a", "b/c"]
+    assert cone.includes("r1") and cone.includes("a/x/2") and cone.includes("b/3")
+    assert not cone.includes("b/e/6") and not cone.includes("f/7")
+    assert cone.collapse_point("b/e/f/6") == "b/e/"
+    assert cone.collapse_point("b/c/d/") is None
+
+
+def test_sparse_index_ls_files():
+    with temp_git_workspace() as dir:
+        _make_repo(dir)
+        _git("sparse-checkout", "set", "b/c", "--sparse-index")
+
+        # index 中只有范围内的文件和折叠后的目录
+        index = get_index()
+        assert index.sparse
+        assert [e.file_name for e in index.entries if e.is_sparse_dir] == ["a/", "b/e/", "f/"]
+        # 只展开与 b/ 有关的目录
+        index.expand("b/")
+        assert [e.file_name for e in index.entries if e.is_sparse_dir] == ["a/", "f/"]
+        assert index.expand() == 1 and not index.sparse
+        assert [e.file_name for e in index.entries] == sorted(FILES)
+
+        for args in [["ls-files"], ["ls-files", "--sparse"], ["sparse-checkout", "list"]]:
+            assert check_same_output(args)
+
+        cwd = os.getcwd()
+        try:
+            os.chdir("b")
+            for args in [["ls-files"], ["ls-files", "--sparse"], ["ls-files", "--full-name"]]:
+                assert check_same_output(args)
+        finally:
+            os.chdir(cwd)
+
+
+def test_sparse_checkout_set():
+    with temp_git_workspace() as dir, tempfile.TemporaryDirectory() as other:
+        _make_repo(dir)
+        expected = str(Path(other) / "repo")
+        shutil.copytree(dir, expected, symlinks=True)
+        # 复制后文件的 inode 改变了，需要先刷新 index 中的文件状态，否则 git 会认为所有文件都被修改过
+        _git("update-index", "-q", "--refresh", cwd=expected)
+        assert check_same_output(["sparse-checkout", "list"])
+
+        for args in [
+            ["b/c", "--sparse-index"],
+            ["b", "a/x"],
+            ["f", "--no-sparse-index"],
+            [],
+            ["a", "--sparse-index"],
+        ]:
+            _git("sparse-checkout", "set", *args, cwd=expected)
+            result = runner.invoke(app, ["sparse-checkout", "set", *args])
+            assert result.exit_code == 0, result.output
+            # index、工作区、pattern 文件都与 git 的结果一致，且工作区是干净的
+            assert _state(dir) == _state(expected)
+            assert _git("status", "--porcelain") == ""
+            assert check_same_output(["sparse-checkout", "list"])
+
+        # 被修改过的文件不会被删除，它所在的目录也不会被折叠，但其中的子目录仍然会被折叠
+        for repo in (dir, expected):
+            with (Path(repo) / "a" / "1").open("a", encoding="utf-8") as f:
+                f.write("modified")
+        _git("sparse-checkout", "set", "f", cwd=expected)
+        assert runner.invoke(app, ["sparse-checkout", "set", "f"]).exit_code == 0
+        assert _state(dir) == _state(expected)
+        assert "S a/x/" in _git("ls-files", "--sparse", "-t")
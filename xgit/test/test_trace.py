@@ -0,0 +1,90 @@
+import json
+import tempfile
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from typer.testing import CliRunner
+
+from xgit.cli import app
+from xgit.utils import trace
+from xgit.test.test_utils import gen_random_string, temp_git_workspace
+
+runner = CliRunner()
+
+
+def _read_events(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_trace_perf():
+    with temp_git_workspace() as dir:
+        file = Path(dir) / "test"
+        file.write_text(gen_random_string(), encoding="utf-8")
+        subprocess.run(["git", "add", "."], check=True)
+
+        with tempfile.TemporaryDirectory() as trace_dir:
+            trace_file = Path(trace_dir) / "trace.json"
+            trace.configure(str(trace_file))
+            try:
+                object_id = runner.invoke(app, ["hash-object", "-w", str(file)]).stdout.strip()
+                runner.invoke(app, ["cat-file", "-p", object_id[:7]])
+                runner.invoke(app, ["ls-files"])
+            finally:
+                trace.configure("0")
+
+            events = _read_events(trace_file)
+
+        regions = {e["name"]: e for e in events if e["event"] == "region"}
+        for name in ["cmd/hash-object", "cmd/cat-file", "cmd/ls-files", "index/read", "index/parse", "output"]:
+            assert name in regions
+
+        assert regions["index/parse"]["parent"] == "index/read"
+        assert regions["index/read"]["parent"] == "cmd/ls-files"
+        assert regions["cmd/ls-files"]["depth"] == 0
+        assert regions["cmd/ls-files"]["data"]["index.entries"] == 1
+
+        # 子 region 的计数会累加到父 region
+        assert regions["cmd/cat-file"]["data"]["extract_data.calls"] >= 1
+        assert regions["cmd/cat-file"]["data"]["bytes.inflated"] > 1000
+        # `git add` 已经写入了该对象
+        assert regions["cmd/hash-object"]["data"]["objects.skipped"] == 1
+
+
+def test_trace_disabled():
+    with tempfile.TemporaryDirectory() as trace_dir:
+        trace_file = Path(trace_dir) / "trace.json"
+        trace.configure("0")
+        with trace.region("test"):
+            trace.count("test")
+        assert not trace.enabled()
+        assert not trace_file.exists()
+
+
+def test_trace_threads():
+    with tempfile.TemporaryDirectory() as trace_dir:
+        trace_file = Path(trace_dir) / "trace.json"
+        trace.configure(str(trace_file))
+        try:
+
+            def work(i: int):
+                with trace.region(f"worker-{i}"):
+                    for _ in range(1000):
+                        trace.count("worker.items")
+
+            with trace.region("main"):
+                with ThreadPoolExecutor(max_workers=8) as pool:
+                    list(pool.map(work, range(8)))
+                trace.count("main.items")
+        finally:
+            trace.configure("0")
+
+        events = _read_events(trace_file)
+
+    regions = {e["name"]: e for e in events if e["event"] == "region"}
+    # 每个线程有自己的 region 栈，工作线程中的 region 不会嵌套在主线程的 region 中
+    for i in range(8):
+        assert regions[f"worker-{i}"]["depth"] == 0
+        assert regions[f"worker-{i}"]["parent"] is None
+        assert regions[f"worker-{i}"]["data"] == {"worker.items": 1000}
+    assert regions["main"]["data"] == {"main.items": 1}
@@ -0,0 +1,381 @@
+import os
+import mmap
+import struct
+import hashlib
+import tempfile
+from typing import Iterable, Optional
+from pathlib import Path
+
+from xgit.utils import trace
+from xgit.utils.sha import extract_data
+from xgit.types.pack import get_packs
+from xgit.types.types import Tag, Commit
+from xgit.utils.utils import get_config
+from xgit.utils.errors import ObjectTypeError
+from xgit.utils.constants import GIT_DIR
+
+COMMIT_GRAPH_NAME = "commit-graph"
+
+CHUNK_OID_FANOUT = b"OIDF"
+CHUNK_OID_LOOKUP = b"OIDL"
+CHUNK_COMMIT_DATA = b"CDAT"
+CHUNK_GENERATION_DATA = b"GDA2"
+CHUNK_GENERATION_DATA_OVERFLOW = b"GDO2"
+CHUNK_EXTRA_EDGES = b"EDGE"
+
+HEADER_SIZE = 8
+CHUNK_ENTRY_SIZE = 12
+COMMIT_DATA_SIZE = 36
+
+PARENT_NONE = 0x70000000
+PARENT_OCTOPUS = 0x80000000
+EDGE_LAST = 0x80000000
+GENERATION_V1_MAX = 0x3FFFFFFF
+GENERATION_V2_OFFSET_MAX = 0x7FFFFFFF
+GENERATION_OVERFLOW = 0x80000000
+
+_COMMIT_DATA = struct.Struct(">IIII")
+
+
+class CommitGraph:  # pylint: disable=too-many-instance-attributes
+    """
+    `objects/info/commit-graph`，参见 https://git-scm.com/docs/gitformat-commit-graph 。
+
+    - 8 字节的头部：`CGPH`、版本 (1)、哈希版本 (1 = SHA-1)、chunk 数、base 文件数 (0)
+    - chunk 表：与 multi-pack-index 相同
+    - OIDF / OIDL：fanout 表和有序的 commit id；commit 在其中的下标即为它在 graph 中的位置
+    - CDAT：每个 commit 36 字节：tree id、两个 parent 的位置、30 位的拓扑层级（generation number v1）和 34 位的提交时间。
+      没有 parent 时为 0x70000000；多于两个 parent 时，第二个 parent 的最高位为 1，其余位是 EDGE 中的下标
+    - GDA2 / GDO2：可选的 corrected commit date 与提交时间的差（generation number v2）及其溢出表
+    - EDGE：octopus merge 的第二个及之后的 parent 的位置，最后一个的最高位为 1
+    - 最后是以上所有内容的 SHA-1
+
+    遍历历史时，parent、提交时间和 generation number 都可以直接从这里读出，不需要解压 commit 对象。
+    """
+
+    path: Path
+    count: int
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        signature, version, oid_version, num_chunks, num_base = struct.unpack_from(">4sBBBB", self._data, 0)
+        assert signature == b"CGPH", f"bad commit-graph signature in {path}"
+        assert version == 1, f"unsupported commit-graph version {version}"
+        assert oid_version == 1, f"unsupported commit-graph hash version {oid_version}"
+        assert num_base == 0, "split commit-graph is not supported"
+
+        chunks: dict[bytes, int] = {}
+        for i in range(num_chunks):
+            chunk_id, start = struct.unpack_from(">4sQ", self._data, HEADER_SIZE + CHUNK_ENTRY_SIZE * i)
+            chunks[chunk_id] = start
+
+        self.fanout = struct.unpack_from(">256I", self._data, chunks[CHUNK_OID_FANOUT])
+        self.count = self.fanout[255]
+        self._oid_offset = chunks[CHUNK_OID_LOOKUP]
+        self._commit_offset = chunks[CHUNK_COMMIT_DATA]
+        self._generation_offset = chunks.get(CHUNK_GENERATION_DATA)
+        self._overflow_offset = chunks.get(CHUNK_GENERATION_DATA_OVERFLOW)
+        self._edge_offset = chunks.get(CHUNK_EXTRA_EDGES)
+
+    def oid_at(self, pos: int) -> bytes:
+        start = self._oid_offset + 20 * pos
+        return self._data[start : start + 20]
+
+    def find(self, sha: bytes) -> Optional[int]:
+        """
+        返回 commit 在 graph 中的位置，不存在时返回 None
+        """
+        lo = self.fanout[sha[0] - 1] if sha[0] > 0 else 0
+        hi = self.fanout[sha[0]]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cur = self.oid_at(mid)
+            if cur < sha:
+                lo = mid + 1
+            elif cur > sha:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def tree_at(self, pos: int) -> bytes:
+        start = self._commit_offset + COMMIT_DATA_SIZE * pos
+        return self._data[start : start + 20]
+
+    def commit_at(self, pos: int) -> tuple[list[int], int, int]:
+        """
+        返回 (parent 的位置, 提交时间, 拓扑层级)
+        """
+        parent1, parent2, high, low = _COMMIT_DATA.unpack_from(
+            self._data, self._commit_offset + COMMIT_DATA_SIZE * pos + 20
+        )
+        commit_time = ((high & 3) << 32) | low
+        level = high >> 2
+        if parent1 == PARENT_NONE:
+            return [], commit_time, level
+        if parent2 == PARENT_NONE:
+            return [parent1], commit_time, level
+        if not parent2 & PARENT_OCTOPUS:
+            return [parent1, parent2], commit_time, level
+
+        assert self._edge_offset is not None, f"missing extra edges chunk in {self.path}"
+        parents = [parent1]
+        i = parent2 & ~PARENT_OCTOPUS
+        while True:
+            (edge,) = struct.unpack_from(">I", self._data, self._edge_offset + 4 * i)
+            parents.append(edge & ~EDGE_LAST)
+            if edge & EDGE_LAST:
+                return parents, commit_time, level
+            i += 1
+
+    def generation_at(self, pos: int) -> int:
+        """
+        generation number：有 GDA2 时为 corrected commit date，否则为拓扑层级。
+        两者都满足 commit 的 generation 大于它所有 parent 的 generation。
+        """
+        _, commit_time, level = self.commit_at(pos)
+        if self._generation_offset is None:
+            return level
+        (offset,) = struct.unpack_from(">I", self._data, self._generation_offset + 4 * pos)
+        if offset & GENERATION_OVERFLOW:
+            assert self._overflow_offset is not None, f"missing generation data overflow chunk in {self.path}"
+            (value,) = struct.unpack_from(">Q", self._data, self._overflow_offset + 8 * (offset & ~GENERATION_OVERFLOW))
+            return commit_time + value
+        return commit_time + offset
+
+    def checksum_ok(self) -> bool:
+        return hashlib.sha1(self._data[:-20]).digest() == self._data[-20:]
+
+
+def _pack_commits(repo_dir: Path) -> list[bytes]:
+    """
+    所有 pack 中的 commit，与不带参数的 `git commit-graph write` 一致
+    """
+    commits = []
+    for pack in get_packs(repo_dir):
+        for offset, sha in pack.index.sorted_offsets():
+            if pack.read_header_at(offset)[0] == b"commit":
+                commits.append(sha)
+    return commits
+
+
+# sha -> (tree, parents, 提交时间)
+CommitInfo = dict[bytes, tuple[bytes, list[bytes], int]]
+
+
+def _read_commits(repo_dir: Path, tips: Optional[Iterable[str]]) -> CommitInfo:
+    commits: CommitInfo = {}
+    # (sha, 是否是 parent)：tips 可以是 tag、tree 等，会被剥离或跳过，而 parent 必须是 commit
+    shas = [bytes.fromhex(tip) for tip in tips] if tips is not None else _pack_commits(repo_dir)
+    stack = [(sha, False) for sha in shas]
+    while stack:
+        sha, is_parent = stack.pop()
+        if sha in commits:
+            continue
+        data = extract_data(sha.hex(), repo_dir=repo_dir)
+        header, content = data.split(b"\x00", maxsplit=1)
+        obj_type = header.split(b" ", maxsplit=1)[0].decode()
+        if obj_type != "commit":
+            if is_parent:
+                raise ObjectTypeError(sha.hex(), "commit", obj_type)
+            if obj_type == "tag":
+                stack.append((bytes.fromhex(Tag(content).object), False))
+            continue
+        commit = Commit(content)
+        parents = [bytes.fromhex(parent) for parent in commit.parents]
+        commits[sha] = (bytes.fromhex(commit.tree), parents, commit.commit_time)
+        stack.extend((parent, True) for parent in parents if parent not in commits)
+    return commits
+
+
+def _generations(commits: CommitInfo, oids: list[bytes]) -> tuple[dict[bytes, int], dict[bytes, int]]:
+    """
+    返回 (拓扑层级, corrected commit date)。两者都依赖于所有 parent，用后序遍历计算，避免递归过深
+    """
+    levels: dict[bytes, int] = {}
+    corrected: dict[bytes, int] = {}
+    for root in oids:
+        if root in levels:
+            continue
+        work = [root]
+        while work:
+            sha = work[-1]
+            _, parents, commit_time = commits[sha]
+            pending = [parent for parent in parents if parent not in levels]
+            if pending:
+                work.extend(pending)
+                continue
+            work.pop()
+            if sha in levels:
+                continue
+            levels[sha] = min(max((levels[p] for p in parents), default=0) + 1, GENERATION_V1_MAX)
+            corrected[sha] = max([commit_time] + [corrected[p] + 1 for p in parents])
+    return levels, corrected
+
+
+def _chunks(commits: CommitInfo, oids: list[bytes]) -> list[tuple[bytes, bytes]]:  # pylint: disable=too-many-locals
+    position = {sha: pos for pos, sha in enumerate(oids)}
+    with trace.region("commit-graph/generation"):
+        levels, corrected = _generations(commits, oids)
+
+    fanout = [0] * 256
+    for sha in oids:
+        fanout[sha[0]] += 1
+    for i in range(1, 256):
+        fanout[i] += fanout[i - 1]
+
+    commit_data = bytearray()
+    generation_data = bytearray()
+    overflow = bytearray()
+    edges = bytearray()
+    for sha in oids:
+        tree, parents, commit_time = commits[sha]
+        positions = [position[parent] for parent in parents]
+        parent1 = positions[0] if positions else PARENT_NONE
+        if len(positions) <= 2:
+            parent2 = positions[1] if len(positions) == 2 else PARENT_NONE
+        else:
+            parent2 = PARENT_OCTOPUS | (len(edges) // 4)
+            for i, pos in enumerate(positions[1:], start=2):
+                edges += struct.pack(">I", pos | (EDGE_LAST if i == len(positions) else 0))
+        high = (levels[sha] << 2) | ((commit_time >> 32) & 3)
+        commit_data += tree + _COMMIT_DATA.pack(parent1, parent2, high, commit_time & 0xFFFFFFFF)
+
+        offset = corrected[sha] - commit_time
+        if offset > GENERATION_V2_OFFSET_MAX:
+            generation_data += struct.pack(">I", GENERATION_OVERFLOW | (len(overflow) // 8))
+            overflow += struct.pack(">Q", offset)
+        else:
+            generation_data += struct.pack(">I", offset)
+
+    chunks = [
+        (CHUNK_OID_FANOUT, struct.pack(">256I", *fanout)),
+        (CHUNK_OID_LOOKUP, b"".join(oids)),
+        (CHUNK_COMMIT_DATA, bytes(commit_data)),
+        (CHUNK_GENERATION_DATA, bytes(generation_data)),
+    ]
+    if overflow:
+        chunks.append((CHUNK_GENERATION_DATA_OVERFLOW, bytes(overflow)))
+    if edges:
+        chunks.append((CHUNK_EXTRA_EDGES, bytes(edges)))
+    return chunks
+
+
+def write_commit_graph(repo_dir: Path, tips: Optional[Iterable[str]] = None) -> Path:
+    """
+    为从 tips（默认为所有 pack 中的 commit）可达的所有 commit 生成 commit-graph，与 git 默认的配置一样写入 GDA2。
+    写入时先写临时文件再 rename。某个 parent 不存在时抛出 ObjectNotFoundError，不是 commit 时抛出 ObjectTypeError，
+    此时不会写入任何文件。
+    """
+    info_dir = repo_dir / GIT_DIR / "objects" / "info"
+    info_dir.mkdir(parents=True, exist_ok=True)
+
+    with trace.region("commit-graph/read"):
+        commits = _read_commits(repo_dir, tips)
+    trace.count("commit-graph.commits", len(commits))
+    chunks = _chunks(commits, sorted(commits))
+
+    output = bytearray(struct.pack(">4sBBBB", b"CGPH", 1, 1, len(chunks), 0))
+    offset = HEADER_SIZE + CHUNK_ENTRY_SIZE * (len(chunks) + 1)
+    for chunk_id, chunk in chunks:
+        output += struct.pack(">4sQ", chunk_id, offset)
+        offset += len(chunk)
+    output += struct.pack(">4sQ", b"\x00" * 4, offset)
+    for _, chunk in chunks:
+        output += chunk
+    output += hashlib.sha1(output).digest()
+
+    target = info_dir / COMMIT_GRAPH_NAME
+    fd, tmp = tempfile.mkstemp(prefix="tmp_graph_", dir=info_dir)
+    try:
+        with open(fd, "wb") as f:
+            f.write(output)
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, target)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return target
+
+
+def verify_commit_graph(repo_dir: Path) -> list[str]:
+    """
+    检查 commit-graph 的校验和、顺序，以及其中每个 commit 的 tree、parent、提交时间和 generation number
+    是否与 commit 对象一致，返回错误信息
+    """
+    path = repo_dir / GIT_DIR / "objects" / "info" / COMMIT_GRAPH_NAME
+    if not path.exists():
+        return []
+
+    graph = CommitGraph(path)
+    errors = []
+    if not graph.checksum_ok():
+        errors.append("error: the commit-graph file has incorrect checksum and is likely corrupt")
+
+    previous = b""
+    for pos in range(graph.count):
+        sha = graph.oid_at(pos)
+        if sha <= previous:
+            errors.append(f"error: commit-graph has incorrect OID order: {previous.hex()} then {sha.hex()}")
+        previous = sha
+
+        try:
+            data = extract_data(sha.hex(), repo_dir=repo_dir)
+        except Exception:  # pylint: disable=broad-except
+            errors.append(f"error: failed to parse commit {sha.hex()} from object database for commit-graph")
+            continue
+        commit = Commit(data.split(b"\x00", maxsplit=1)[1])
+
+        parents, commit_time, level = graph.commit_at(pos)
+        if graph.tree_at(pos).hex() != commit.tree:
+            errors.append(f"error: root tree OID for commit {sha.hex()} in commit-graph is {graph.tree_at(pos).hex()}")
+        if [graph.oid_at(parent).hex() for parent in parents] != commit.parents:
+            errors.append(f"error: commit-graph parent list for commit {sha.hex()} is wrong")
+        if commit_time != commit.commit_time:
+            errors.append(f"error: commit date for commit {sha.hex()} in commit-graph is {commit_time}")
+        for parent in parents:
+            parent_level = graph.commit_at(parent)[2]
+            if parent_level >= level and level != GENERATION_V1_MAX:
+                errors.append(f"error: commit-graph generation for commit {sha.hex()} is {level} <= {parent_level}")
+            if graph.generation_at(parent) >= graph.generation_at(pos):
+                errors.append(f"error: commit-graph generation data for commit {sha.hex()} is not increasing")
+    return errors
+
+
+_commit_graph_cache: dict[Path, tuple[tuple[tuple[int, int, int], ...], Optional[CommitGraph]]] = {}
+
+
+def clear_cache():
+    _commit_graph_cache.clear()
+
+
+def _stat_key(path: Path) -> tuple[int, int, int]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return (0, 0, 0)
+    return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+
+def get_commit_graph(repo_dir: Path) -> Optional[CommitGraph]:
+    """
+    返回 repo 的 CommitGraph，不存在或被 `core.commitGraph = false` 禁用时返回 None。
+    结果连同读取的配置一起在进程内缓存，commit-graph 文件或配置文件变化时才重新读取。
+    """
+    git_dir = repo_dir / GIT_DIR
+    path = git_dir / "objects" / "info" / COMMIT_GRAPH_NAME
+    key = (_stat_key(path), _stat_key(git_dir / "config"), _stat_key(git_dir / "config.worktree"))
+
+    cached = _commit_graph_cache.get(repo_dir)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    graph = None
+    if key[0] != (0, 0, 0):
+        if (get_config("core", "commitGraph", repo_dir) or "true").lower() not in ("false", "no", "off", "0"):
+            graph = CommitGraph(path)
+    _commit_graph_cache[repo_dir] = (key, graph)
+    return graph
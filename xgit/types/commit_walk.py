@@ -0,0 +1,290 @@
+"""
+遍历提交历史。
+
+commit 在遍历中用 "节点" 表示：在 commit-graph 中的 commit 是它在 graph 中的位置（int），其余的是它的 id（str）。
+这样对于 graph 覆盖到的部分，整个遍历只涉及整数运算，不需要解压任何 commit 对象，也不需要在 id 和位置之间来回转换；
+graph 过期（有新的 commit 没有写入）时，新的 commit 会被解压，它们的 parent 再回到 graph 中。
+"""
+
+import heapq
+from typing import Union, Iterator, Optional, Sequence
+from pathlib import Path
+
+from xgit.utils import trace
+from xgit.utils.sha import extract_data
+from xgit.types.types import Tag, Commit
+from xgit.utils.utils import find_repo
+from xgit.utils.errors import ObjectTypeError
+from xgit.types.commit_graph import CommitGraph, get_commit_graph
+
+Node = Union[int, str]
+
+# 不在 commit-graph 中的 commit 的 generation number，与 git 的 GENERATION_NUMBER_INFINITY 含义相同
+GENERATION_INFINITY = float("inf")
+
+
+class CommitReader:
+    """
+    读取 commit 的 parent、提交时间和 generation number，优先使用 commit-graph
+    """
+
+    repo_dir: Path
+    graph: Optional[CommitGraph]
+
+    def __init__(self, repo_dir: Optional[Path] = None, use_graph: bool = True):
+        self.repo_dir = repo_dir if repo_dir is not None else find_repo()
+        self.graph = get_commit_graph(self.repo_dir) if use_graph else None
+        self._commits: dict[str, Commit] = {}
+
+        # 被解压、解析的 commit 数
+        self.parsed = 0
+
+    def _read(self, object_id: str) -> tuple[str, bytes]:
+        header, content = extract_data(object_id, repo_dir=self.repo_dir).split(b"\x00", maxsplit=1)
+        return header.split(b" ", maxsplit=1)[0].decode(), content
+
+    def peel(self, object_id: str) -> str:
+        """
+        返回 commit-ish（commit 或指向 commit 的 tag）对应的 commit 的 id
+        """
+        if self.graph is not None and self.graph.find(bytes.fromhex(object_id)) is not None:
+            return object_id
+        obj_type, content = self._read(object_id)
+        while obj_type == "tag":
+            object_id = Tag(content).object
+            obj_type, content = self._read(object_id)
+        if obj_type != "commit":
+            raise ObjectTypeError(object_id, "commit", obj_type)
+        if object_id not in self._commits:
+            self._commits[object_id] = Commit(content)
+            self.parsed += 1
+        return object_id
+
+    def node(self, object_id: str) -> Node:
+        if self.graph is not None:
+            pos = self.graph.find(bytes.fromhex(object_id))
+            if pos is not None:
+                trace.count("commit_graph.hit")
+                return pos
+            trace.count("commit_graph.miss")
+        return object_id
+
+    def object_id(self, node: Node) -> str:
+        if isinstance(node, int):
+            assert self.graph is not None
+            return self.graph.oid_at(node).hex()
+        return node
+
+    def commit(self, node: Node) -> Commit:
+        """
+        解析完整的 commit 对象，在需要输出作者、提交信息等内容时使用
+        """
+        object_id = self.object_id(node)
+        commit = self._commits.get(object_id)
+        if commit is None:
+            obj_type, content = self._read(object_id)
+            if obj_type != "commit":
+                raise ObjectTypeError(object_id, "commit", obj_type)
+            commit = self._commits[object_id] = Commit(content)
+            self.parsed += 1
+        return commit
+
+    def parents(self, node: Node) -> Sequence[Node]:
+        if isinstance(node, int):
+            assert self.graph is not None
+            return self.graph.commit_at(node)[0]
+        return [self.node(parent) for parent in self.commit(node).parents]
+
+    def commit_time(self, node: Node) -> int:
+        if isinstance(node, int):
+            assert self.graph is not None
+            return self.graph.commit_at(node)[1]
+        return self.commit(node).commit_time
+
+    def generation(self, node: Node) -> float:
+        if isinstance(node, int):
+            assert self.graph is not None
+            return self.graph.generation_at(node)
+        return GENERATION_INFINITY
+
+
+# 与 git 的 SLOP 一致：只剩下不感兴趣的 commit 之后，再多走几步，以容忍提交时间不单调的历史
+SLOP = 5
+
+
+def rev_list(
+    reader: CommitReader,
+    include: list[str],
+    exclude: Optional[list[str]] = None,
+    first_parent: bool = False,
+) -> Iterator[Node]:
+    """
+    与 `git rev-list` 的默认顺序一致，按提交时间从新到旧产出从 include 可达、从 exclude 不可达的 commit；
+    提交时间相同时先进入队列的先产出。
+    """
+    if exclude:
+        yield from _limited_rev_list(reader, include, exclude, first_parent)
+        return
+
+    graph = reader.graph
+    commit_at = graph.commit_at if graph is not None else None
+    queue: list[tuple[int, int, Node]] = []
+    seen: set[Node] = set()
+    counter = 0
+    for name in include:
+        node = reader.node(reader.peel(name))
+        if node not in seen:
+            seen.add(node)
+            queue.append((-reader.commit_time(node), counter, node))
+            counter += 1
+    heapq.heapify(queue)
+
+    while queue:
+        _, _, node = heapq.heappop(queue)
+        yield node
+
+        if commit_at is not None and isinstance(node, int):
+            # 热路径：graph 中的 commit，parent 也一定在 graph 中
+            graph_parents = commit_at(node)[0]
+            if first_parent:
+                graph_parents = graph_parents[:1]
+            for graph_parent in graph_parents:
+                if graph_parent not in seen:
+                    seen.add(graph_parent)
+                    heapq.heappush(queue, (-commit_at(graph_parent)[1], counter, graph_parent))
+                    counter += 1
+            continue
+
+        parents = reader.parents(node)
+        if first_parent:
+            parents = parents[:1]
+        for parent in parents:
+            if parent not in seen:
+                seen.add(parent)
+                heapq.heappush(queue, (-reader.commit_time(parent), counter, parent))
+                counter += 1
+
+
+class _LimitedWalk:
+    """
+    与 git 的 limit_list 一致：感兴趣和不感兴趣的 commit 在同一个按提交时间排序的队列中遍历，不感兴趣的标记沿 parent 传播；
+    队列中只剩下不感兴趣的 commit 时即可停止，因此 `A..B` 的开销只与 A、B 之间的距离有关，而不是整个历史。
+    感兴趣的 commit 之后仍可能被标记为不感兴趣，所以需要先走完再过滤。
+    """
+
+    def __init__(self, reader: CommitReader):
+        self.reader = reader
+        self.queue: list[tuple[int, int, Node]] = []
+        self.seen: set[Node] = set()
+        self.uninteresting: set[Node] = set()
+        self.queued: set[Node] = set()
+        # 队列中感兴趣的 commit 数
+        self.interesting_queued = 0
+        self.counter = 0
+
+    def push(self, node: Node):
+        self.seen.add(node)
+        self.queued.add(node)
+        if node not in self.uninteresting:
+            self.interesting_queued += 1
+        heapq.heappush(self.queue, (-self.reader.commit_time(node), self.counter, node))
+        self.counter += 1
+
+    def _mark(self, node: Node) -> bool:
+        if node in self.uninteresting:
+            return False
+        self.uninteresting.add(node)
+        if node in self.queued:
+            self.interesting_queued -= 1
+        return True
+
+    def mark_uninteresting(self, node: Node):
+        """
+        标记 node 及其 parent。与 git 一样，只有已经读到的 commit 才继续向下传播，其余的在被读到时自然会带上标记
+        """
+        self._mark(node)
+        stack = list(self.reader.parents(node))
+        while stack:
+            node = stack.pop()
+            if self._mark(node) and node in self.seen:
+                stack.extend(self.reader.parents(node))
+
+    def _pop(self, first_parent: bool) -> tuple[Node, bool]:
+        """
+        取出队列中最新的 commit 并把它的 parent 放入队列，返回 (commit, 是否不感兴趣)
+        """
+        _, _, node = heapq.heappop(self.queue)
+        self.queued.discard(node)
+        is_uninteresting = node in self.uninteresting
+        if not is_uninteresting:
+            self.interesting_queued -= 1
+
+        parents = self.reader.parents(node)
+        if is_uninteresting:
+            # 不感兴趣的一侧总是沿所有 parent 遍历
+            for parent in parents:
+                self.mark_uninteresting(parent)
+                if parent not in self.seen:
+                    self.push(parent)
+        else:
+            for parent in parents[:1] if first_parent else parents:
+                if parent not in self.seen:
+                    self.push(parent)
+        return node, is_uninteresting
+
+    def run(self, first_parent: bool) -> list[Node]:
+        result: list[Node] = []
+        date = float("inf")
+        slop = SLOP
+        while self.queue:
+            node, is_uninteresting = self._pop(first_parent)
+            if not is_uninteresting:
+                date = self.reader.commit_time(node)
+                result.append(node)
+                continue
+            if not self.queue:
+                break
+            if date <= -self.queue[0][0] or self.interesting_queued > 0:
+                slop = SLOP
+            else:
+                slop -= 1
+                if slop == 0:
+                    break
+
+        trace.count("rev_list.limited_walk", self.counter)
+        return [node for node in result if node not in self.uninteresting]
+
+
+def _limited_rev_list(reader: CommitReader, include: list[str], exclude: list[str], first_parent: bool) -> list[Node]:
+    walk = _LimitedWalk(reader)
+    # 与 `A..B` 在命令行中的顺序一致，先放入不感兴趣的一侧
+    for names, is_uninteresting in ((exclude, True), (include, False)):
+        for name in names:
+            node = reader.node(reader.peel(name))
+            if is_uninteresting:
+                walk.mark_uninteresting(node)
+            if node not in walk.seen:
+                walk.push(node)
+    return walk.run(first_parent)
+
+
+def is_ancestor(reader: CommitReader, ancestor: str, descendant: str) -> bool:
+    """
+    ancestor 是否可以从 descendant 到达。generation number 小于 ancestor 的 commit 不可能到达 ancestor，
+    因此不会继续向下遍历它们；有 commit-graph 时，通常只需要访问两者之间的很少一部分 commit。
+    """
+    target = reader.node(reader.peel(ancestor))
+    start = reader.node(reader.peel(descendant))
+    min_generation = reader.generation(target)
+
+    seen = {start}
+    stack = [start]
+    while stack:
+        node = stack.pop()
+        if node == target:
+            return True
+        for parent in reader.parents(node):
+            if parent not in seen and reader.generation(parent) >= min_generation:
+                seen.add(parent)
+                stack.append(parent)
+    return False
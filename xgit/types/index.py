@@ -1,9 +1,24 @@
+import os
+import struct
 import hashlib
 from typing import Optional
+from pathlib import Path
 
+from xgit.utils import trace
 from xgit.utils.utils import find_repo, get_repo_file, timestamp_to_str
 from xgit.types.metadata import Metadata
+from xgit.types.tree_walk import TreeReader, walk_tree
 from xgit.utils.constants import GIT_DIR
+from xgit.types.sparse_checkout import ConePatterns
+
+ENTRY_STAT = struct.Struct(">10I")
+
+# 扩展 flag 中的 skip-worktree 位：该文件不在 sparse-checkout 的范围内，工作区中没有它
+SKIP_WORKTREE = 0x4000
+SPARSE_DIR_MODE = 0o040000
+
+EXT_CACHE_TREE = b"TREE"
+EXT_SPARSE_DIRECTORIES = b"sdir"
 
 
 def print_bytes(data, group_size=4, group_each_line=6):
@@ -88,10 +103,11 @@ class IndexEntry:
         flags,
         extended_flags,
         file_name,
+        repo_dir: Optional[Path] = None,
     ):
-        self.metadata = Metadata(
-            get_repo_file(file_name), ctime_s, ctime_ns, mtime_s, mtime_ns, dev, inode, mode, uid, gid, file_size
-        )
+        # 解析整个 index 时由调用者传入 repo_dir，避免每个 entry 都查找一次 repo
+        path = repo_dir / file_name if repo_dir is not None else get_repo_file(file_name)
+        self.metadata = Metadata(path, ctime_s, ctime_ns, mtime_s, mtime_ns, dev, inode, mode, uid, gid, file_size)
         self.sha = sha
         self.flags = flags
         self.extended_flags = extended_flags
@@ -99,39 +115,37 @@ class IndexEntry:
 
     @staticmethod
     def parse(data: bytes) -> tuple["IndexEntry", bytes]:
-        ctime_s = int.from_bytes(data[:4], "big")
-        ctime_ns = int.from_bytes(data[4:8], "big")
-        mtime_s = int.from_bytes(data[8:12], "big")
-        mtime_ns = int.from_bytes(data[12:16], "big")
-        dev = int.from_bytes(data[16:20], "big")
-        inode = int.from_bytes(data[20:24], "big")
-        mode = int.from_bytes(data[24:28], "big")
-        uid = int.from_bytes(data[28:32], "big")
-        gid = int.from_bytes(data[32:36], "big")
-        file_size = int.from_bytes(data[36:40], "big")
-        sha = data[40:60].hex()
-        flags = IndexEntry.Flag.from_bytes(data[60:62])
+        entry, end = IndexEntry.parse_at(data, 0)
+        return entry, data[end:]
+
+    @staticmethod
+    def parse_at(data: bytes, pos: int, repo_dir: Optional[Path] = None) -> tuple["IndexEntry", int]:
+        """
+        从 data[pos:] 中解析一个 entry，返回 (entry, 下一个 entry 的位置)，避免每次都复制剩余的数据
+        """
+        ctime_s, ctime_ns, mtime_s, mtime_ns, dev, inode, mode, uid, gid, file_size = ENTRY_STAT.unpack_from(data, pos)
+        sha = data[pos + 40 : pos + 60].hex()
+        flags = IndexEntry.Flag.from_bytes(data[pos + 60 : pos + 62])
 
         entry_len = 62
 
         # if flags.extended == True, then there is a 16-bit extended flag
         if flags.extended:
-            extended_flags = data[62:64]
+            extended_flags = data[pos + 62 : pos + 64]
             entry_len += 2
         else:
             extended_flags = None
 
+        name_start = pos + entry_len
         if flags.name_length < 0xFFF:
-            file_name = data[entry_len : entry_len + flags.name_length]
-            assert data[entry_len + flags.name_length] == 0
-            entry_len += flags.name_length + 1
+            name_end = name_start + flags.name_length
+            assert data[name_end] == 0
         else:
             # if name_length >= 0xFFF, then find `\x00` to get the file name
-            file_name, _ = data[entry_len:].split(b"\x00", maxsplit=1)
-            entry_len += len(file_name) + 1
+            name_end = data.index(b"\x00", name_start)
+        entry_len += name_end - name_start + 1
 
         entry_len = (entry_len + 7) // 8 * 8  # aligned to 8 bytes
-        rest = data[entry_len:]  # remove padding
 
         return (
             IndexEntry(
@@ -148,9 +162,64 @@ class IndexEntry:
                 sha,
                 flags,
                 extended_flags,
-                file_name.decode(),
+                data[name_start:name_end].decode(),
+                repo_dir,
             ),
-            rest,
+            pos + entry_len,
+        )
+
+    @staticmethod
+    def from_tree_entry(path: str, filemode: str, sha: str, repo_dir: Optional[Path] = None) -> "IndexEntry":
+        """
+        由 tree 中的 entry 构造一个没有文件状态信息、设置了 skip-worktree 的 entry，用于展开 sparse directory。
+        path 以 `/` 结尾、filemode 为 040000 时，得到的就是一个 sparse directory entry。
+        """
+        flags = IndexEntry.Flag(False, True, 0, min(len(path.encode()), 0xFFF))
+        return IndexEntry(
+            0, 0, 0, 0, 0, 0, int(filemode, 8), 0, 0, 0, sha, flags, SKIP_WORKTREE.to_bytes(2, "big"), path, repo_dir
+        )
+
+    @property
+    def skip_worktree(self) -> bool:
+        return self.extended_flags is not None and int.from_bytes(self.extended_flags, "big") & SKIP_WORKTREE != 0
+
+    @skip_worktree.setter
+    def skip_worktree(self, value: bool):
+        bits = int.from_bytes(self.extended_flags, "big") if self.extended_flags is not None else 0
+        bits = bits | SKIP_WORKTREE if value else bits & ~SKIP_WORKTREE
+        self.extended_flags = bits.to_bytes(2, "big") if bits else None
+        self.flags.extended = bits != 0
+
+    @property
+    def is_sparse_dir(self) -> bool:
+        """
+        sparse index 中代表整个目录的 entry：mode 为 040000，路径以 `/` 结尾，sha 为该目录的 tree
+        """
+        return self.metadata.mode == SPARSE_DIR_MODE and self.file_name.endswith("/")
+
+    def refresh(self, st: os.stat_result):
+        """
+        用工作区中文件的状态更新 entry；mode 保持不变。与 git 一致，各字段只保留低 32 位。
+        """
+        metadata = self.metadata
+        metadata.ctime_s, metadata.ctime_ns = int(st.st_ctime), st.st_ctime_ns % 1_000_000_000
+        metadata.mtime_s, metadata.mtime_ns = int(st.st_mtime), st.st_mtime_ns % 1_000_000_000
+        metadata.dev = st.st_dev & 0xFFFFFFFF
+        metadata.inode = st.st_ino & 0xFFFFFFFF
+        metadata.uid = st.st_uid & 0xFFFFFFFF
+        metadata.gid = st.st_gid & 0xFFFFFFFF
+        metadata.file_size = st.st_size & 0xFFFFFFFF
+
+    def stat_matches(self, st: os.stat_result) -> bool:
+        """
+        工作区中的文件是否与 index 中记录的状态一致，一致时可以认为文件没有被修改
+        """
+        metadata = self.metadata
+        return (
+            metadata.mtime_s == int(st.st_mtime)
+            and metadata.mtime_ns == st.st_mtime_ns % 1_000_000_000
+            and metadata.inode == st.st_ino & 0xFFFFFFFF
+            and metadata.file_size == st.st_size & 0xFFFFFFFF
         )
 
     def to_bytes(self) -> bytes:
@@ -196,28 +265,242 @@ class IndexEntry:
 
 
 class Index:
+    """
+    `.git/index`。
+
+    启用 sparse index 时（参见 xgit.types.sparse_checkout），sparse-checkout 范围之外的整个目录只对应一个
+    sparse directory entry（mode 040000，路径以 `/` 结尾，sha 为该目录的 tree），并通过 `sdir` 扩展标记。
+    Index 总是以这种折叠的形式读入，解析的开销只与范围内的文件数有关；只有确实需要某个目录中的文件时，
+    才通过 `expand` 展开对应的目录。
+    """
+
     version: int
     entry_count: int
     entries: list[IndexEntry]
     extensions: bytes
+    repo_dir: Optional[Path]
 
-    def __init__(self, data: Optional[bytes] = None):
+    @trace.traced("index/parse")
+    def __init__(self, data: Optional[bytes] = None, repo_dir: Optional[Path] = None):
+        self.repo_dir = repo_dir
         if data is None:
             self.version = 2
             self.entry_count = 0
             self.entries = []
             self.extensions = b""
         else:
+            if self.repo_dir is None:
+                self.repo_dir = find_repo()
             self.version = int.from_bytes(data[4:8], "big")
             self.entry_count = int.from_bytes(data[8:12], "big")
             self.entries = []
-            data = data[12:]
+            pos = 12
             for _ in range(self.entry_count):
-                entry, data = IndexEntry.parse(data)
+                entry, pos = IndexEntry.parse_at(data, pos, self.repo_dir)
                 self.entries.append(entry)
-            self.extensions = data[:-20]
+            self.extensions = data[pos:-20]
+            trace.count("index.entries", self.entry_count)
+
+    def extension_list(self) -> list[tuple[bytes, bytes]]:
+        """
+        返回 [(signature, data), ...]；每个扩展为 4 字节的 signature、4 字节的长度和数据
+        """
+        result = []
+        pos = 0
+        while pos + 8 <= len(self.extensions):
+            signature = self.extensions[pos : pos + 4]
+            size = int.from_bytes(self.extensions[pos + 4 : pos + 8], "big")
+            result.append((signature, self.extensions[pos + 8 : pos + 8 + size]))
+            pos += 8 + size
+        return result
+
+    def _set_extension(self, signature: bytes, data: Optional[bytes]):
+        """
+        替换或（data 为 None 时）删除一个扩展，其他扩展的顺序不变
+        """
+        extensions = self.extension_list()
+        pos = next((i for i, (sig, _) in enumerate(extensions) if sig == signature), None)
+        if pos is not None:
+            del extensions[pos]
+        if data is not None:
+            extensions.insert(len(extensions) if pos is None else pos, (signature, data))
+        self.extensions = b"".join(sig + len(ext).to_bytes(4, "big") + ext for sig, ext in extensions)
+
+    @property
+    def sparse(self) -> bool:
+        return any(signature == EXT_SPARSE_DIRECTORIES for signature, _ in self.extension_list())
+
+    def cache_tree(self) -> dict[str, str]:
+        """
+        解析 TREE 扩展，返回 {目录: tree 的 id}，根目录为 ""，已失效的目录不在其中。
+        每一项为 `名字\0entry 数 子目录数\n` 加上 20 字节的 tree id（entry 数为 -1 时表示失效，没有 id），按先序排列。
+        """
+        data = next((ext for signature, ext in self.extension_list() if signature == EXT_CACHE_TREE), None)
+        trees: dict[str, str] = {}
+        if data is None:
+            return trees
+
+        pos = 0
+        # (目录, 尚未读取的子目录数)
+        stack: list[tuple[str, int]] = []
+        while pos < len(data):
+            nul = data.index(b"\x00", pos)
+            newline = data.index(b"\n", nul)
+            count, subtrees = map(int, data[nul + 1 : newline].split(b" "))
+            name = data[pos:nul].decode()
+            pos = newline + 1
+
+            while stack and stack[-1][1] == 0:
+                stack.pop()
+            if stack:
+                parent, remaining = stack.pop()
+                stack.append((parent, remaining - 1))
+                path = f"{parent}/{name}" if parent else name
+            else:
+                path = name
+
+            if count >= 0:
+                trees[path] = data[pos : pos + 20].hex()
+                pos += 20
+            stack.append((path, subtrees))
+        return trees
+
+    def expand(self, prefix: str = "") -> int:
+        """
+        展开与 prefix 有重叠（在 prefix 之下，或包含 prefix）的 sparse directory entry，返回增加的 entry 数。
+        prefix 为空时展开全部；全部展开后移除 sdir 扩展。
+        """
+        if not self.sparse:
+            return 0
+
+        reader = TreeReader(self.repo_dir)
+        trees = self.cache_tree()
+        entries: list[IndexEntry] = []
+        with trace.region("index/expand"):
+            for entry in self.entries:
+                name = entry.file_name
+                if not (entry.is_sparse_dir and (name.startswith(prefix) or prefix.startswith(name))):
+                    entries.append(entry)
+                    continue
+                trees[name[:-1]] = entry.sha
+                for path, tree_entry in walk_tree(reader, entry.sha, recursive=True, show_trees=True, prefix=name):
+                    if tree_entry.is_tree:
+                        trees[path] = tree_entry.sha
+                    else:
+                        entries.append(
+                            IndexEntry.from_tree_entry(path, tree_entry.filemode, tree_entry.sha, self.repo_dir)
+                        )
+
+        added = len(entries) - len(self.entries)
+        trace.count("index.expanded", added)
+        self._reshape(entries, trees)
+        return added
+
+    def collapse(self, cone: ConePatterns) -> int:
+        """
+        把 cone 之外的目录折叠为 sparse directory entry，返回减少的 entry 数。
+        只有目录中所有 entry 都设置了 skip-worktree 且没有冲突时才会折叠，否则与 git 一样尝试折叠它的子目录；
+        目录的 tree 来自 cache-tree，cache-tree 中没有或已失效的目录不会被折叠。
+        """
+        trees = self.cache_tree()
+        entries: list[IndexEntry] = []
+        i, n = 0, len(self.entries)
+        with trace.region("index/collapse"):
+            while i < n:
+                entry = self.entries[i]
+                directory = cone.collapse_point(entry.file_name)
+                if directory is None:
+                    entries.append(entry)
+                    i += 1
+                    continue
+
+                j = i
+                while j < n and self.entries[j].file_name.startswith(directory):
+                    j += 1
+                entries.extend(self._collapse_dir(self.entries[i:j], directory, trees))
+                i = j
+
+        removed = len(self.entries) - len(entries)
+        self._reshape(entries, trees)
+        return removed
+
+    def _collapse_dir(self, group: list[IndexEntry], directory: str, trees: dict[str, str]) -> list[IndexEntry]:
+        """
+        折叠 directory 下的 entry（group）；无法折叠时保留直接位于其中的 entry，并逐个尝试折叠它的子目录
+        """
+        if len(group) == 1 and group[0].file_name == directory:
+            return group
+        sha = trees.get(directory[:-1])
+        if sha is not None and all(e.skip_worktree and e.flags.stage == 0 for e in group):
+            return [IndexEntry.from_tree_entry(directory, "040000", sha, self.repo_dir)]
+
+        result: list[IndexEntry] = []
+        i = 0
+        while i < len(group):
+            name = group[i].file_name
+            slash = name.find("/", len(directory))
+            if slash == -1 or group[i].is_sparse_dir and slash == len(name) - 1:
+                result.append(group[i])
+                i += 1
+                continue
+            subdirectory = name[: slash + 1]
+            j = i
+            while j < len(group) and group[j].file_name.startswith(subdirectory):
+                j += 1
+            result.extend(self._collapse_dir(group[i:j], subdirectory, trees))
+            i = j
+        return result
+
+    def _reshape(self, entries: list[IndexEntry], trees: dict[str, str]):
+        """
+        展开或折叠之后更新 entry、sdir 扩展和 cache-tree。
+        git 会按 cache-tree 中记录的 entry 数跳过 index 中的一段 entry，因此 index 的形状改变后必须重新生成 cache-tree：
+        sparse directory entry 在其中是一个没有子目录、entry 数为 1 的目录。
+        """
+        self.entries = entries
+        self.entry_count = len(entries)
+        sparse = any(entry.is_sparse_dir for entry in entries)
+        self._set_extension(EXT_SPARSE_DIRECTORIES, b"" if sparse else None)
+        if any(signature == EXT_CACHE_TREE for signature, _ in self.extension_list()):
+            self._set_extension(EXT_CACHE_TREE, self._build_cache_tree(trees))
+
+    def _build_cache_tree(self, trees: dict[str, str]) -> bytes:
+        """
+        按当前的 entry 生成 TREE 扩展，trees 为已知的 {目录: tree 的 id}；不在其中的目录以及它们的上级目录都是失效的。
+        与 git 一致，子目录按名字的长度、再按名字排序。
+        """
+        counts: dict[str, int] = {"": 0}
+        children: dict[str, set[str]] = {"": set()}
+        for entry in self.entries:
+            name = entry.file_name
+            parts = name[:-1].split("/") if entry.is_sparse_dir else name.split("/")[:-1]
+            counts[""] += 1
+            path = ""
+            for part in parts:
+                children[path].add(part)
+                path = f"{path}/{part}" if path else part
+                counts[path] = counts.get(path, 0) + 1
+                children.setdefault(path, set())
+
+        def build(path: str, name: str) -> tuple[bytes, bool]:
+            subtrees = sorted(children[path], key=lambda n: (len(n.encode()), n.encode()))
+            valid = path in trees
+            body = b""
+            for child in subtrees:
+                data, child_valid = build(f"{path}/{child}" if path else child, child)
+                body += data
+                valid = valid and child_valid
+            header = name.encode() + b"\x00" + f"{counts[path] if valid else -1} {len(subtrees)}\n".encode()
+            if valid:
+                header += bytes.fromhex(trees[path])
+            return header + body, valid
+
+        return build("", "")[0]
 
     def to_bytes(self) -> bytes:
+        # 有扩展 flag 的 entry 只能出现在 version 3 及以上的 index 中
+        if self.version < 3 and any(entry.flags.extended for entry in self.entries):
+            self.version = 3
         index = b"DIRC"
         index += self.version.to_bytes(4, "big")
         index += self.entry_count.to_bytes(4, "big")
@@ -233,15 +516,37 @@ class Index:
         yield "extensions", self.extensions
 
 
+@trace.traced("index/read")
 def get_index() -> Index:
     """
     如果 repo 不存在，报错退出
     如果 index 不存在，返回没有 entry 的 Index 对象
     """
-    index_path = find_repo() / GIT_DIR / "index"
+    repo_dir = find_repo()
+    index_path = repo_dir / GIT_DIR / "index"
     if not index_path.exists():
-        return Index()
+        return Index(repo_dir=repo_dir)
     with index_path.open("rb") as f:
         data = f.read()
+    trace.count("index.bytes", len(data))
+    with trace.region("index/checksum"):
         assert data[-20:] == hashlib.sha1(data[:-20]).digest()
-        return Index(data)
+    return Index(data, repo_dir)
+
+
+@trace.traced("index/write")
+def write_index(index: Index):
+    """
+    与 git 一样先写入 `index.lock`，再 rename 为 `index`；`index.lock` 已存在说明有其他进程正在修改 index
+    """
+    repo_dir = index.repo_dir if index.repo_dir is not None else find_repo()
+    index_path = repo_dir / GIT_DIR / "index"
+    lock_path = index_path.with_name("index.lock")
+    fd = os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        with open(fd, "wb") as f:
+            f.write(index.to_bytes())
+        os.replace(lock_path, index_path)
+    except BaseException:
+        os.unlink(lock_path)
+        raise
@@ -0,0 +1,296 @@
+import os
+import mmap
+import struct
+import hashlib
+import tempfile
+from typing import Optional
+from pathlib import Path
+
+from xgit.utils import trace
+from xgit.types.pack import Pack, get_packs
+from xgit.utils.constants import GIT_DIR
+
+MIDX_NAME = "multi-pack-index"
+
+CHUNK_PACK_NAMES = b"PNAM"
+CHUNK_OID_FANOUT = b"OIDF"
+CHUNK_OID_LOOKUP = b"OIDL"
+CHUNK_OBJECT_OFFSETS = b"OOFF"
+CHUNK_LARGE_OFFSETS = b"LOFF"
+
+HEADER_SIZE = 12
+CHUNK_ENTRY_SIZE = 12
+LARGE_OFFSET_FLAG = 0x80000000
+
+
+class MultiPackIndex:
+    """
+    `objects/pack/multi-pack-index`，把多个 pack 的索引合并为一个，参见
+    https://git-scm.com/docs/gitformat-pack#_multi_pack_index_midx_files_have_the_following_format 。
+
+    - 12 字节的头部：`MIDX`、版本 (1)、哈希版本 (1 = SHA-1)、chunk 数、base 文件数 (0)、pack 数
+    - chunk 表：每项为 4 字节的 chunk id 和 8 字节的偏移，最后一项的 id 为 0，偏移为所有 chunk 的结尾
+    - PNAM：按字典序排列、以 `\\0` 结尾的 `.idx` 文件名；pack 在其中的序号即为 pack-int-id
+    - OIDF / OIDL：与 `.idx` 相同的 fanout 表和有序的 SHA 表
+    - OOFF：每个对象 8 字节，(pack-int-id, 偏移)；偏移的最高位为 1 时，其余位是 LOFF 中的下标
+    - LOFF：可选的 8 字节大偏移表
+    - 最后是以上所有内容的 SHA-1
+
+    这样，无论有多少个 pack，查找一个对象都只需要一次 fanout 加一次二分查找。
+    """
+
+    path: Path
+    pack_names: list[str]
+    count: int
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        signature, version, oid_version, num_chunks, num_base, num_packs = struct.unpack_from(">4sBBBBI", self._data, 0)
+        assert signature == b"MIDX", f"bad multi-pack-index signature in {path}"
+        assert version == 1, f"unsupported multi-pack-index version {version}"
+        assert oid_version == 1, f"unsupported multi-pack-index hash version {oid_version}"
+        assert num_base == 0, "incremental multi-pack-index is not supported"
+
+        chunks: dict[bytes, tuple[int, int]] = {}
+        table = [
+            struct.unpack_from(">4sQ", self._data, HEADER_SIZE + CHUNK_ENTRY_SIZE * i) for i in range(num_chunks + 1)
+        ]
+        for (chunk_id, start), (_, end) in zip(table, table[1:]):
+            chunks[chunk_id] = (start, end)
+
+        start, end = chunks[CHUNK_PACK_NAMES]
+        self.pack_names = [name.decode() for name in self._data[start:end].split(b"\x00") if name][:num_packs]
+
+        self.fanout = struct.unpack_from(">256I", self._data, chunks[CHUNK_OID_FANOUT][0])
+        self.count = self.fanout[255]
+        self._oid_offset = chunks[CHUNK_OID_LOOKUP][0]
+        self._object_offset = chunks[CHUNK_OBJECT_OFFSETS][0]
+        self._large_offset = chunks[CHUNK_LARGE_OFFSETS][0] if CHUNK_LARGE_OFFSETS in chunks else None
+
+    def sha_at(self, i: int) -> bytes:
+        start = self._oid_offset + 20 * i
+        return self._data[start : start + 20]
+
+    def object_at(self, i: int) -> tuple[int, int]:
+        """
+        返回第 i 个对象的 (pack-int-id, 在该 pack 中的偏移)
+        """
+        pack_id, offset = struct.unpack_from(">II", self._data, self._object_offset + 8 * i)
+        if offset & LARGE_OFFSET_FLAG:
+            assert self._large_offset is not None, f"missing large offsets chunk in {self.path}"
+            (offset,) = struct.unpack_from(">Q", self._data, self._large_offset + 8 * (offset & ~LARGE_OFFSET_FLAG))
+        return pack_id, offset
+
+    def bucket_range(self, first_byte: int) -> tuple[int, int]:
+        lo = self.fanout[first_byte - 1] if first_byte > 0 else 0
+        return lo, self.fanout[first_byte]
+
+    def bucket(self, first_byte: int) -> list[bytes]:
+        lo, hi = self.bucket_range(first_byte)
+        data = self._data[self._oid_offset + 20 * lo : self._oid_offset + 20 * hi]
+        return [data[i : i + 20] for i in range(0, len(data), 20)]
+
+    def find(self, sha: bytes) -> Optional[tuple[int, int]]:
+        lo, hi = self.bucket_range(sha[0])
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cur = self.sha_at(mid)
+            if cur < sha:
+                lo = mid + 1
+            elif cur > sha:
+                hi = mid
+            else:
+                return self.object_at(mid)
+        return None
+
+    def checksum_ok(self) -> bool:
+        return hashlib.sha1(self._data[:-20]).digest() == self._data[-20:]
+
+
+def write_multi_pack_index(repo_dir: Path) -> Path:
+    """
+    为 repo 中所有的 pack 生成 multi-pack-index。同一个对象出现在多个 pack 中时，与 git 一样选择 mtime 最新的 pack。
+
+    逐个 fanout 桶地合并各个 pack 的 SHA 表，因此内存占用只与单个桶的大小有关。
+    写入时先写临时文件再 rename，读者不会看到写了一半的文件。
+    """
+    pack_dir = repo_dir / GIT_DIR / "objects" / "pack"
+    packs = sorted(get_packs(repo_dir), key=lambda pack: pack.idx_path.name)
+
+    # 按 mtime 从新到旧排名，名次小的优先
+    by_mtime = sorted(range(len(packs)), key=lambda i: -packs[i].path.stat().st_mtime_ns)
+    rank = {pack_id: r for r, pack_id in enumerate(by_mtime)}
+
+    fanout = []
+    oids = bytearray()
+    offsets = bytearray()
+    large_offsets = bytearray()
+    with trace.region("midx/merge"):
+        for first_byte in range(256):
+            candidates = []
+            for pack_id, pack in enumerate(packs):
+                lo, hi = pack.index.bucket_range(first_byte)
+                for i in range(lo, hi):
+                    candidates.append((pack.index.sha_at(i), rank[pack_id], pack_id, i))
+            candidates.sort()
+
+            last = None
+            for sha, _, pack_id, i in candidates:
+                if sha == last:
+                    continue
+                last = sha
+                oids += sha
+                offset = packs[pack_id].index.offset_at(i)
+                if offset >= LARGE_OFFSET_FLAG:
+                    offsets += struct.pack(">II", pack_id, LARGE_OFFSET_FLAG | (len(large_offsets) // 8))
+                    large_offsets += struct.pack(">Q", offset)
+                else:
+                    offsets += struct.pack(">II", pack_id, offset)
+            fanout.append(len(oids) // 20)
+    trace.count("midx.objects", len(oids) // 20)
+
+    names = b"".join(pack.idx_path.name.encode() + b"\x00" for pack in packs)
+    names += b"\x00" * (-len(names) % 4)
+
+    chunks = [
+        (CHUNK_PACK_NAMES, names),
+        (CHUNK_OID_FANOUT, struct.pack(">256I", *fanout)),
+        (CHUNK_OID_LOOKUP, bytes(oids)),
+        (CHUNK_OBJECT_OFFSETS, bytes(offsets)),
+    ]
+    if large_offsets:
+        chunks.append((CHUNK_LARGE_OFFSETS, bytes(large_offsets)))
+
+    data = bytearray(struct.pack(">4sBBBBI", b"MIDX", 1, 1, len(chunks), 0, len(packs)))
+    offset = HEADER_SIZE + CHUNK_ENTRY_SIZE * (len(chunks) + 1)
+    for chunk_id, chunk in chunks:
+        data += struct.pack(">4sQ", chunk_id, offset)
+        offset += len(chunk)
+    data += struct.pack(">4sQ", b"\x00" * 4, offset)
+    for _, chunk in chunks:
+        data += chunk
+    data += hashlib.sha1(data).digest()
+
+    target = pack_dir / MIDX_NAME
+    fd, tmp = tempfile.mkstemp(prefix="tmp_midx_", dir=pack_dir)
+    try:
+        with open(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, target)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return target
+
+
+def verify_multi_pack_index(repo_dir: Path) -> list[str]:
+    """
+    检查 multi-pack-index 的校验和，以及其中每个对象的偏移是否与对应 pack 的 `.idx` 一致，返回错误信息
+    """
+    path = repo_dir / GIT_DIR / "objects" / "pack" / MIDX_NAME
+    if not path.exists():
+        return []
+
+    midx = MultiPackIndex(path)
+    errors = []
+    if not midx.checksum_ok():
+        errors.append("error: incorrect checksum in multi-pack-index")
+
+    packs = {pack.idx_path.name: pack for pack in get_packs(repo_dir)}
+    missing = [name for name in midx.pack_names if name not in packs]
+    for name in missing:
+        errors.append(f"error: multi-pack-index refers to missing pack {name}")
+    if missing:
+        return errors
+
+    previous = b""
+    for i in range(midx.count):
+        sha = midx.sha_at(i)
+        if sha <= previous:
+            errors.append(f"error: oid lookup out of order: oid[{i - 1}] = {previous.hex()} >= {sha.hex()}")
+        previous = sha
+
+        pack_id, offset = midx.object_at(i)
+        pack = packs[midx.pack_names[pack_id]]
+        j = pack.index.find(sha)
+        if j is None or pack.index.offset_at(j) != offset:
+            errors.append(f"error: incorrect object offset for oid[{i}] = {sha.hex()}: {offset}")
+    return errors
+
+
+class PackedObjects:
+    """
+    查找 pack 中对象的统一入口。存在 multi-pack-index 时，先在其中查找，再依次查找它没有覆盖到的 pack；
+    否则依次查找每个 pack 的 `.idx`。multi-pack-index 引用了不存在的 pack 时（例如 repack 之后），忽略它。
+    """
+
+    packs: list[Pack]
+    midx: Optional[MultiPackIndex]
+
+    def __init__(self, packs: list[Pack], midx: Optional[MultiPackIndex]):
+        self.packs = packs
+        by_name = {pack.idx_path.name: pack for pack in packs}
+        if midx is not None and not all(name in by_name for name in midx.pack_names):
+            midx = None
+        self.midx = midx
+
+        covered = set(midx.pack_names) if midx is not None else set()
+        self._midx_packs = [by_name[name] for name in midx.pack_names] if midx is not None else []
+        self._uncovered = [pack for pack in packs if pack.idx_path.name not in covered]
+
+    def find(self, sha: bytes) -> Optional[tuple[Pack, int]]:
+        """
+        返回 (包含该对象的 pack, 偏移)，不存在时返回 None
+        """
+        if self.midx is not None:
+            found = self.midx.find(sha)
+            if found is not None:
+                pack_id, offset = found
+                return self._midx_packs[pack_id], offset
+        for pack in self._uncovered:
+            i = pack.index.find(sha)
+            if i is not None:
+                return pack, pack.index.offset_at(i)
+        return None
+
+    def bucket(self, first_byte: int) -> list[bytes]:
+        """
+        返回所有 pack 中首字节为 first_byte 的 SHA（可能有重复）
+        """
+        result = self.midx.bucket(first_byte) if self.midx is not None else []
+        for pack in self._uncovered:
+            result.extend(pack.index.bucket(first_byte))
+        return result
+
+
+_packed_objects_cache: dict[Path, tuple[tuple[int, int], PackedObjects]] = {}
+
+
+def clear_cache():
+    _packed_objects_cache.clear()
+
+
+def get_packed_objects(repo_dir: Path) -> PackedObjects:
+    """
+    返回 repo 的 PackedObjects，在进程内缓存，并在 pack 列表或 multi-pack-index 变化时重新加载
+    """
+    packs = get_packs(repo_dir)
+    midx_path = repo_dir / GIT_DIR / "objects" / "pack" / MIDX_NAME
+    try:
+        midx_stat = midx_path.stat()
+        key = (midx_stat.st_mtime_ns, midx_stat.st_ino)
+    except FileNotFoundError:
+        key = (0, 0)
+
+    cached = _packed_objects_cache.get(repo_dir)
+    if cached is not None and cached[0] == key and cached[1].packs is packs:
+        return cached[1]
+
+    midx = MultiPackIndex(midx_path) if key != (0, 0) else None
+    packed = PackedObjects(packs, midx)
+    _packed_objects_cache[repo_dir] = (key, packed)
+    return packed
@@ -0,0 +1,383 @@
+import mmap
+import zlib
+import struct
+import threading
+from typing import Optional
+from pathlib import Path
+from collections import OrderedDict
+
+from xgit.utils import trace
+from xgit.utils.constants import GIT_DIR
+
+# pack 中对象类型的编号，参见 https://git-scm.com/docs/pack-format
+OBJ_COMMIT = 1
+OBJ_TREE = 2
+OBJ_BLOB = 3
+OBJ_TAG = 4
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+
+PACK_TYPE_TO_NAME = {
+    OBJ_COMMIT: b"commit",
+    OBJ_TREE: b"tree",
+    OBJ_BLOB: b"blob",
+    OBJ_TAG: b"tag",
+}
+
+
+class PackIndex:
+    """
+    pack 的索引文件 (`.idx`)，只支持 version 2。其格式为：
+
+    - 4 字节的魔数 `\\377tOc` 和 4 字节的版本号
+    - 256 项的 fanout 表，第 i 项为首字节 <= i 的对象个数
+    - N 个按字典序排列的 20 字节 SHA
+    - N 个 CRC32
+    - N 个 4 字节偏移；如果最高位为 1，则其余位是 8 字节大偏移表中的下标
+    - 8 字节大偏移表、pack 的校验和、idx 的校验和
+
+    文件通过 mmap 访问，不会一次性读入内存。
+    """
+
+    MAGIC = b"\xfftOc"
+    FANOUT_OFFSET = 8
+    SHA_OFFSET = FANOUT_OFFSET + 256 * 4
+
+    path: Path
+    count: int
+    fanout: tuple[int, ...]
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        assert self._data[:4] == self.MAGIC, f"unsupported pack index {path}"
+        version = int.from_bytes(self._data[4:8], "big")
+        assert version == 2, f"unsupported pack index version {version}"
+
+        self.fanout = struct.unpack_from(">256I", self._data, self.FANOUT_OFFSET)
+        self.count = self.fanout[255]
+        self._crc_offset = self.SHA_OFFSET + 20 * self.count
+        self._offset_offset = self._crc_offset + 4 * self.count
+        self._large_offset_offset = self._offset_offset + 4 * self.count
+
+    def sha_at(self, i: int) -> bytes:
+        start = self.SHA_OFFSET + 20 * i
+        return self._data[start : start + 20]
+
+    def offset_at(self, i: int) -> int:
+        (offset,) = struct.unpack_from(">I", self._data, self._offset_offset + 4 * i)
+        if offset & 0x80000000:
+            (offset,) = struct.unpack_from(">Q", self._data, self._large_offset_offset + 8 * (offset & 0x7FFFFFFF))
+        return offset
+
+    def bucket_range(self, first_byte: int) -> tuple[int, int]:
+        """
+        返回首字节为 `first_byte` 的对象在 SHA 表中的下标范围 [lo, hi)
+        """
+        lo = self.fanout[first_byte - 1] if first_byte > 0 else 0
+        return lo, self.fanout[first_byte]
+
+    def bucket(self, first_byte: int) -> list[bytes]:
+        lo, hi = self.bucket_range(first_byte)
+        start = self.SHA_OFFSET + 20 * lo
+        data = self._data[start : self.SHA_OFFSET + 20 * hi]
+        return [data[i : i + 20] for i in range(0, len(data), 20)]
+
+    def find(self, sha: bytes) -> Optional[int]:
+        """
+        在 fanout 给出的范围内二分查找 `sha`，返回其下标；不存在则返回 None
+        """
+        lo, hi = self.bucket_range(sha[0])
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cur = self.sha_at(mid)
+            if cur < sha:
+                lo = mid + 1
+            elif cur > sha:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def sorted_offsets(self) -> list[tuple[int, bytes]]:
+        """
+        返回按在 pack 中偏移排序的 (offset, sha) 列表
+        """
+        return sorted((self.offset_at(i), self.sha_at(i)) for i in range(self.count))
+
+
+def _apply_delta(base: bytes, delta: bytes) -> bytes:
+    """
+    将 delta 应用到 base 上。delta 的开头是两个变长整数（base 的大小、结果的大小），之后是一系列指令：
+
+    - 最高位为 1：从 base 复制，低 7 位指示后面跟随了哪些 offset / size 字节
+    - 最高位为 0：将后面紧跟的若干字节（数目为该字节的值）直接插入
+    """
+
+    def read_size(pos: int) -> tuple[int, int]:
+        size = shift = 0
+        while True:
+            byte = delta[pos]
+            pos += 1
+            size |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return size, pos
+
+    base_size, pos = read_size(0)
+    assert base_size == len(base), "delta base size mismatch"
+    result_size, pos = read_size(pos)
+
+    result = bytearray()
+    while pos < len(delta):
+        op = delta[pos]
+        pos += 1
+        if op & 0x80:
+            offset = size = 0
+            for i in range(4):
+                if op & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if op & (1 << (4 + i)):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            if size == 0:
+                size = 0x10000
+            result += base[offset : offset + size]
+        elif op:
+            result += delta[pos : pos + op]
+            pos += op
+        else:
+            raise ValueError("invalid delta opcode 0")
+
+    assert len(result) == result_size, "delta result size mismatch"
+    return bytes(result)
+
+
+class DeltaBaseCache:
+    """
+    delta 基对象的 LRU 缓存，按总字节数限制大小，对应 git 的 `core.deltaBaseCacheLimit`。所有 pack 共用一个缓存。
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.size = 0
+        self._entries: OrderedDict[tuple[Path, int], tuple[bytes, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, offset: int) -> Optional[tuple[bytes, bytes]]:
+        with self._lock:
+            entry = self._entries.get((path, offset))
+            if entry is None:
+                trace.count("delta_base_cache.miss")
+                return None
+            self._entries.move_to_end((path, offset))
+        trace.count("delta_base_cache.hit")
+        return entry
+
+    def put(self, path: Path, offset: int, obj_type: bytes, data: bytes):
+        if len(data) > self.limit:
+            return
+        with self._lock:
+            if (path, offset) in self._entries:
+                return
+            self._entries[(path, offset)] = (obj_type, data)
+            self.size += len(data)
+            while self.size > self.limit:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+_delta_base_cache = DeltaBaseCache(limit=96 << 20)
+
+
+def clear_delta_base_cache():
+    _delta_base_cache.clear()
+
+
+class Pack:
+    """
+    一个 pack 文件及其索引。索引和 pack 文件的内容都在第一次用到时才会被 mmap，
+    因此通过 multi-pack-index 查找对象时，不需要打开每一个 `.idx`。
+    """
+
+    idx_path: Path
+    path: Path
+
+    def __init__(self, idx_path: Path):
+        self.idx_path = idx_path
+        self.path = idx_path.with_suffix(".pack")
+        self._index: Optional[PackIndex] = None
+        self._data: Optional[mmap.mmap] = None
+
+    @property
+    def index(self) -> PackIndex:
+        if self._index is None:
+            self._index = PackIndex(self.idx_path)
+        return self._index
+
+    @property
+    def data(self) -> mmap.mmap:
+        if self._data is None:
+            with self.path.open("rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            assert self._data[:4] == b"PACK", f"bad pack file {self.path}"
+        return self._data
+
+    def _read_entry_header(self, offset: int) -> tuple[int, int, int]:
+        """
+        解析 offset 处对象的头部，返回 (类型, 解压后大小, 头部之后的偏移)
+        """
+        data = self.data
+        byte = data[offset]
+        offset += 1
+        obj_type = (byte >> 4) & 0x07
+        size = byte & 0x0F
+        shift = 4
+        while byte & 0x80:
+            byte = data[offset]
+            offset += 1
+            size |= (byte & 0x7F) << shift
+            shift += 7
+        return obj_type, size, offset
+
+    def _inflate(self, offset: int, size: int) -> bytes:
+        decompressor = zlib.decompressobj()
+        result = bytearray()
+        chunk = max(size, 64) + 64
+        while not decompressor.eof:
+            piece = self.data[offset : offset + chunk]
+            if not piece:
+                raise ValueError(f"truncated object in {self.path}")
+            result += decompressor.decompress(piece)
+            offset += len(piece) - len(decompressor.unused_data)
+        assert len(result) == size, f"object size mismatch in {self.path}"
+        return bytes(result)
+
+    def _delta_base(self, obj_type: int, offset: int, pos: int) -> tuple[int, int]:
+        """
+        对于 delta 对象，返回 (基对象的偏移, delta 数据的起始偏移)
+        """
+        if obj_type == OBJ_OFS_DELTA:
+            # 基对象的相对偏移使用了一种特殊的变长编码：每多一个字节，都要额外加 1
+            byte = self.data[pos]
+            pos += 1
+            rel = byte & 0x7F
+            while byte & 0x80:
+                byte = self.data[pos]
+                pos += 1
+                rel = ((rel + 1) << 7) | (byte & 0x7F)
+            return offset - rel, pos
+
+        base_sha = self.data[pos : pos + 20]
+        i = self.index.find(base_sha)
+        if i is None:
+            raise ValueError(f"delta base {base_sha.hex()} not found in {self.path}")
+        return self.index.offset_at(i), pos + 20
+
+    def read_header_at(self, offset: int) -> tuple[bytes, int]:
+        """
+        只读取 offset 处对象的类型和大小。对于 delta 对象，类型来自 delta 链末端的基对象，
+        大小则记录在 delta 数据的开头，只需要解压最前面的几个字节。
+        """
+        obj_type, size, pos = self._read_entry_header(offset)
+        if obj_type not in (OBJ_OFS_DELTA, OBJ_REF_DELTA):
+            return PACK_TYPE_TO_NAME[obj_type], size
+
+        base, pos = self._delta_base(obj_type, offset, pos)
+        head = zlib.decompressobj().decompress(self.data[pos : pos + 256], 20)
+        size = i = 0
+        for _ in range(2):  # 跳过 base 的大小，读取结果的大小
+            size = shift = 0
+            while True:
+                byte = head[i]
+                i += 1
+                size |= (byte & 0x7F) << shift
+                shift += 7
+                if not byte & 0x80:
+                    break
+
+        while obj_type in (OBJ_OFS_DELTA, OBJ_REF_DELTA):
+            offset = base
+            obj_type, _, pos = self._read_entry_header(offset)
+            if obj_type in (OBJ_OFS_DELTA, OBJ_REF_DELTA):
+                base, _ = self._delta_base(obj_type, offset, pos)
+        return PACK_TYPE_TO_NAME[obj_type], size
+
+    def read_at(self, offset: int) -> tuple[bytes, bytes]:
+        """
+        读取 pack 中 offset 处的对象，返回 (类型, 内容)。会沿着 delta 链找到基对象，再依次应用 delta。
+        链上的中间结果会放入 delta base cache，这样按偏移顺序读取同一条链上的对象时不必反复从头解压。
+        """
+        chain: list[tuple[int, bytes]] = []  # (偏移, delta)
+        while True:
+            cached = _delta_base_cache.get(self.path, offset)
+            if cached is not None:
+                type_name, data = cached
+                break
+
+            obj_type, size, pos = self._read_entry_header(offset)
+            if obj_type in (OBJ_OFS_DELTA, OBJ_REF_DELTA):
+                base, pos = self._delta_base(obj_type, offset, pos)
+                chain.append((offset, self._inflate(pos, size)))
+                offset = base
+            else:
+                type_name = PACK_TYPE_TO_NAME[obj_type]
+                data = self._inflate(pos, size)
+                if chain:
+                    _delta_base_cache.put(self.path, offset, type_name, data)
+                break
+
+        for i in range(len(chain) - 1, -1, -1):
+            offset, delta = chain[i]
+            data = _apply_delta(data, delta)
+            if i > 0:
+                _delta_base_cache.put(self.path, offset, type_name, data)
+        return type_name, data
+
+    def read(self, sha: bytes) -> Optional[tuple[bytes, bytes]]:
+        i = self.index.find(sha)
+        if i is None:
+            return None
+        return self.read_at(self.index.offset_at(i))
+
+
+_pack_cache: dict[Path, tuple[int, list[Pack]]] = {}
+
+
+def clear_cache():
+    _pack_cache.clear()
+
+
+def get_packs(repo_dir: Path) -> list[Pack]:
+    """
+    返回 repo 中所有的 pack。结果在进程内缓存，并在 `objects/pack` 目录的 mtime 变化时重新加载。
+    """
+    pack_dir = repo_dir / GIT_DIR / "objects" / "pack"
+    try:
+        mtime = pack_dir.stat().st_mtime_ns
+    except FileNotFoundError:
+        return []
+
+    cached = _pack_cache.get(pack_dir)
+    if cached is not None and cached[0] == mtime:
+        trace.count("pack_cache.hit")
+        return cached[1]
+
+    trace.count("pack_cache.miss")
+    old = {pack.idx_path: pack for pack in cached[1]} if cached is not None else {}
+    packs = []
+    for idx_path in sorted(pack_dir.glob("pack-*.idx")):
+        if not idx_path.with_suffix(".pack").exists():
+            continue
+        packs.append(old.get(idx_path) or Pack(idx_path))
+    _pack_cache[pack_dir] = (mtime, packs)
+    return packs
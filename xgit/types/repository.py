@@ -0,0 +1,146 @@
+import asyncio
+from typing import Union, Optional
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from xgit.utils.sha import read_header, extract_data, do_hash_object
+from xgit.utils.utils import locate_repo
+from xgit.utils.errors import ObjectNotFoundError, AmbiguousObjectError
+from xgit.types.commit_walk import CommitReader, is_ancestor
+from xgit.utils.object_name import is_hex, resolve_object_id
+from xgit.utils.object_writer import FsyncMethod, ObjectWriter
+
+
+class Repository:
+    """
+    在进程内访问一个仓库的对象，供把 xgit 当作库使用的调用者使用。
+
+    与命令行入口不同，这里的所有方法都不会调用 `sys.exit`，而是抛出 xgit.utils.errors 中的异常：
+    仓库不存在时为 NotARepositoryError，对象不存在时为 ObjectNotFoundError，缩写有歧义时为 AmbiguousObjectError。
+    所有方法都只依赖构造时确定的仓库路径，与当前工作目录无关。
+    """
+
+    path: Path
+
+    def __init__(self, path: Union[str, Path, None] = None):
+        self.path = locate_repo(Path(path) if path is not None else None)
+
+    def resolve(self, name: str) -> str:
+        """
+        将完整或缩写的 object id 解析为完整的 object id
+        """
+        return resolve_object_id(name, repo_dir=self.path)
+
+    def read(self, name: str) -> tuple[str, bytes]:
+        """
+        返回 (类型, 内容)
+        """
+        data = extract_data(self.resolve(name), repo_dir=self.path)
+        header, content = data.split(b"\x00", maxsplit=1)
+        return header.split(b" ", maxsplit=1)[0].decode(), content
+
+    def read_header(self, name: str) -> tuple[str, int]:
+        """
+        返回 (类型, 大小)，不解压对象的内容
+        """
+        obj_type, size = read_header(self.resolve(name), repo_dir=self.path)
+        return obj_type.decode(), size
+
+    def exists(self, name: str) -> bool:
+        """
+        与 `resolve` 一样解析 name：完整的 id 直接检查是否存在，缩写只有在唯一对应一个对象时才视为存在。
+        name 不会被直接当作路径使用
+        """
+        try:
+            self.resolve(name)
+        except (ObjectNotFoundError, AmbiguousObjectError):
+            return False
+        return True
+
+    def is_ancestor(self, ancestor: str, descendant: str) -> bool:
+        """
+        ancestor 是否是 descendant 的祖先（或就是 descendant）。存在 commit-graph 时利用 generation number 剪枝
+        """
+        reader = CommitReader(self.path)
+        return is_ancestor(reader, self.resolve(ancestor), self.resolve(descendant))
+
+    def write(self, data: bytes, obj_type: str = "blob", fsync_method: Optional[FsyncMethod] = None) -> str:
+        with ObjectWriter(self.path, fsync_method=fsync_method) as writer:
+            return do_hash_object(data, obj_type, True, writer=writer)
+
+
+class ObjectStore:
+    """
+    Repository 的 asyncio 版本，用于在异步服务中读取对象。
+
+    - 文件 I/O 和 zlib 解压都是阻塞的，因此会被放到一个有界的线程池中执行，不会阻塞事件循环
+    - 对同一个对象的并发读取会被合并：只有第一个请求真正去读，其余请求等待同一个结果。
+      请求按解析后的完整 id 合并，同一个对象的缩写和完整 id 共享同一次读取
+
+    用法：
+
+        async with ObjectStore("/path/to/repo") as store:
+            obj_type, data = await store.read("e69de29")
+    """
+
+    repo: Repository
+
+    def __init__(self, repo: Union[Repository, str, Path, None] = None, max_workers: int = 8):
+        self.repo = repo if isinstance(repo, Repository) else Repository(repo)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="xgit-store")
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+
+        # 被合并、没有真正提交到线程池的请求数
+        self.coalesced = 0
+
+    async def __aenter__(self) -> "ObjectStore":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, key: tuple[str, str], func, *args):
+        """
+        在线程池中执行 func(*args)；相同 key 的并发调用共享同一个结果
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield 使某个调用者被取消时，不会取消其他调用者正在等待的同一个读取
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, func, *args)
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _resolve(self, name: str) -> str:
+        """
+        先把 name 解析为完整的 id，使同一个对象的缩写和完整 id 的请求也能被合并
+        """
+        if len(name) == 40 and is_hex(name.lower()):
+            return name.lower()
+        return await self._run(("resolve", name), self.repo.resolve, name)
+
+    async def read(self, name: str) -> tuple[str, bytes]:
+        object_id = await self._resolve(name)
+        return await self._run(("read", object_id), self.repo.read, object_id)
+
+    async def read_header(self, name: str) -> tuple[str, int]:
+        object_id = await self._resolve(name)
+        return await self._run(("read_header", object_id), self.repo.read_header, object_id)
+
+    async def exists(self, name: str) -> bool:
+        try:
+            object_id = await self._resolve(name)
+        except (ObjectNotFoundError, AmbiguousObjectError):
+            return False
+        return await self._run(("exists", object_id), self.repo.exists, object_id)
+
+    async def write(self, data: bytes, obj_type: str = "blob") -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.repo.write, data, obj_type)
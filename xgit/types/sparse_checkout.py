@@ -0,0 +1,124 @@
+"""
+cone 模式的 sparse-checkout。
+
+cone 模式下 `.git/info/sparse-checkout` 中只能出现目录：根目录下的文件总是被包含；对于每个被包含的目录 `a/b/c`，
+它的所有内容都被包含，而它的父目录 `a`、`a/b` 只包含直接位于其中的文件。因此判断一个路径是否被包含只需要逐级查表，
+而范围之外的目录可以整个折叠为 sparse index 中的一个 entry（参见 xgit.types.index）。
+"""
+
+from typing import Iterable, Optional
+from pathlib import Path
+
+from xgit.utils.constants import GIT_DIR
+
+# 每个 cone 模式的 pattern 文件都以这两行开头：包含根目录下的文件，排除根目录下的所有目录
+CONE_HEADER = ["/*", "!/*/"]
+
+
+def _normalize(directory: str) -> str:
+    return directory.strip("/")
+
+
+class ConePatterns:
+    """
+    recursive 为完整包含的目录，parents 为它们的所有上级目录（只包含直接位于其中的文件）。目录不以 `/` 结尾。
+    """
+
+    recursive: set[str]
+    parents: set[str]
+
+    def __init__(self, recursive: Iterable[str]):
+        self.recursive = {_normalize(d) for d in recursive if _normalize(d)}
+        self.parents = set()
+        for directory in self.recursive:
+            parts = directory.split("/")
+            for i in range(1, len(parts)):
+                self.parents.add("/".join(parts[:i]))
+
+    @staticmethod
+    def parse(text: str) -> "ConePatterns":
+        """
+        解析 `.git/info/sparse-checkout`。`/a/` 后面紧跟着 `!/a/*/` 时 a 只是父目录，否则 a 被完整包含。
+        """
+        positive: list[str] = []
+        negative: set[str] = set()
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#") or line in CONE_HEADER:
+                continue
+            if line.startswith("!"):
+                if line.endswith("/*/"):
+                    negative.add(_normalize(line[1:-3]))
+            else:
+                positive.append(_normalize(line))
+        return ConePatterns(d for d in positive if d not in negative)
+
+    def dirs(self) -> list[str]:
+        """
+        与 `git sparse-checkout list` 一致，按字典序返回完整包含的目录，省略已被上级目录包含的目录
+        """
+        return sorted(d for d in self.recursive if self._recursive_ancestor(d) is None)
+
+    def _recursive_ancestor(self, directory: str) -> Optional[str]:
+        parts = directory.split("/")
+        for i in range(1, len(parts)):
+            ancestor = "/".join(parts[:i])
+            if ancestor in self.recursive:
+                return ancestor
+        return None
+
+    def to_text(self) -> str:
+        """
+        与 git 写出的 pattern 文件一致：先是所有父目录，再是完整包含的目录，各自按字典序排列
+        """
+        lines = list(CONE_HEADER)
+        for directory in sorted(d for d in self.parents if self._recursive_ancestor(d) is None):
+            if directory in self.recursive:
+                continue
+            lines.append(f"/{directory}/")
+            lines.append(f"!/{directory}/*/")
+        lines.extend(f"/{directory}/" for directory in self.dirs())
+        return "".join(line + "\n" for line in lines)
+
+    def collapse_point(self, path: str) -> Optional[str]:
+        """
+        返回包含 path 的、完全在范围之外的最上层目录（以 `/` 结尾）；path 在范围内时返回 None。
+        path 以 `/` 结尾时表示一个目录。
+        """
+        parts = path.rstrip("/").split("/")
+        if not path.endswith("/"):
+            parts.pop()
+
+        prefix = ""
+        for part in parts:
+            directory = prefix + part
+            if directory in self.recursive:
+                return None
+            prefix = directory + "/"
+            if directory not in self.parents:
+                return prefix
+        return None
+
+    def includes(self, path: str) -> bool:
+        return self.collapse_point(path) is None
+
+
+def sparse_checkout_file(repo_dir: Path) -> Path:
+    return repo_dir / GIT_DIR / "info" / "sparse-checkout"
+
+
+def read_sparse_checkout(repo_dir: Path) -> Optional[ConePatterns]:
+    """
+    读取 `.git/info/sparse-checkout`，不存在时返回 None
+    """
+    try:
+        text = sparse_checkout_file(repo_dir).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    return ConePatterns.parse(text)
+
+
+def write_sparse_checkout(repo_dir: Path, cone: ConePatterns):
+    path = sparse_checkout_file(repo_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(cone.to_text(), encoding="utf-8")
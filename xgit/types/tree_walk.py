@@ -0,0 +1,196 @@
+"""
+递归遍历和比较 tree。
+
+所有遍历都是生成器，entry 在被读到时就会被产出，不会先把整棵树读入内存。
+同一次遍历中解析过的 tree 由 TreeReader 按 id 缓存；比较两棵树时，id 相同的子树会被整个跳过，
+因此只有一个文件不同的两个快照之间的比较只会读取 O(深度) 个 tree。
+"""
+
+from typing import Iterator, Optional
+from pathlib import Path
+
+from xgit.utils import trace
+from xgit.utils.sha import extract_data
+from xgit.types.types import Tag, Tree, Commit, TreeEntry
+from xgit.utils.errors import ObjectTypeError
+
+NULL_SHA = "0" * 40
+NULL_MODE = "000000"
+
+
+class TreeReader:
+    """
+    读取并缓存 tree。commit 和 tag 会被剥开，直到得到一个 tree。
+    """
+
+    repo_dir: Optional[Path]
+
+    def __init__(self, repo_dir: Optional[Path] = None):
+        self.repo_dir = repo_dir
+        self._trees: dict[str, Tree] = {}
+
+        # 实际读取并解析的 tree 数
+        self.reads = 0
+
+    def _read(self, object_id: str) -> tuple[str, bytes]:
+        header, content = extract_data(object_id, repo_dir=self.repo_dir).split(b"\x00", maxsplit=1)
+        return header.split(b" ", maxsplit=1)[0].decode(), content
+
+    def tree(self, object_id: str) -> Tree:
+        tree = self._trees.get(object_id)
+        if tree is not None:
+            trace.count("tree_cache.hit")
+            return tree
+        trace.count("tree_cache.miss")
+
+        obj_type, content = self._read(object_id)
+        if obj_type != "tree":
+            raise ObjectTypeError(object_id, "tree", obj_type)
+        tree = self._trees[object_id] = Tree(content)
+        self.reads += 1
+        return tree
+
+    def peel(self, object_id: str) -> str:
+        """
+        返回 tree-ish 对应的 tree 的 id
+        """
+        obj_type, content = self._read(object_id)
+        while obj_type in ("commit", "tag"):
+            object_id = Commit(content).tree if obj_type == "commit" else Tag(content).object
+            obj_type, content = self._read(object_id)
+
+        if obj_type != "tree":
+            raise ObjectTypeError(object_id, "tree", obj_type)
+        if object_id not in self._trees:
+            self._trees[object_id] = Tree(content)
+            self.reads += 1
+        return object_id
+
+    def find(self, tree_id: str, path: str) -> Optional[TreeEntry]:
+        """
+        返回 tree 中路径为 path（以 `/` 分隔）的 entry，不存在时返回 None
+        """
+        entry = None
+        for name in path.strip("/").split("/"):
+            if entry is not None:
+                if not entry.is_tree:
+                    return None
+                tree_id = entry.sha
+            entry = next((e for e in self.tree(tree_id).entries if e.filename == name), None)
+            if entry is None:
+                return None
+        return entry
+
+
+def walk_tree(
+    reader: TreeReader,
+    tree_id: str,
+    recursive: bool = False,
+    show_trees: bool = False,
+    trees_only: bool = False,
+    prefix: str = "",
+) -> Iterator[tuple[str, TreeEntry]]:
+    """
+    产出 (路径, entry)。recursive 时进入子树，此时子树本身只有在 show_trees 时才会被产出；
+    trees_only 时只产出子树。
+    """
+    for entry in reader.tree(tree_id).entries:
+        path = prefix + entry.filename
+        if entry.is_tree:
+            if not recursive or show_trees or trees_only:
+                yield path, entry
+            if recursive:
+                yield from walk_tree(reader, entry.sha, recursive, show_trees, trees_only, path + "/")
+        elif not trees_only:
+            yield path, entry
+
+
+class TreeChange:
+    """
+    两棵树之间的一处差异。status 为 A（新增）、D（删除）、M（修改）或 T（类型改变）。
+    """
+
+    status: str
+    path: str
+    old: Optional[TreeEntry]
+    new: Optional[TreeEntry]
+
+    def __init__(self, status: str, path: str, old: Optional[TreeEntry], new: Optional[TreeEntry]):
+        self.status = status
+        self.path = path
+        self.old = old
+        self.new = new
+
+    def __str__(self):
+        """
+        与 `git diff-tree` 的 raw 格式一致
+        """
+        old_mode, old_sha = (self.old.filemode, self.old.sha) if self.old else (NULL_MODE, NULL_SHA)
+        new_mode, new_sha = (self.new.filemode, self.new.sha) if self.new else (NULL_MODE, NULL_SHA)
+        return f":{old_mode} {new_mode} {old_sha} {new_sha} {self.status}\t{self.path}"
+
+
+def _file_kind(filemode: str) -> str:
+    # 100644 和 100755 都是普通文件，只改变可执行位不算类型改变
+    return "100" if filemode in ("100644", "100755") else filemode
+
+
+def _one_side(
+    reader: TreeReader, entry: TreeEntry, path: str, added: bool, recursive: bool, show_trees: bool
+) -> Iterator[TreeChange]:
+    status = "A" if added else "D"
+    if entry.is_tree and recursive:
+        if show_trees:
+            yield TreeChange(status, path, None if added else entry, entry if added else None)
+        old_id, new_id = (None, entry.sha) if added else (entry.sha, None)
+        yield from diff_trees(reader, old_id, new_id, recursive, show_trees, path + "/")
+    else:
+        yield TreeChange(status, path, None if added else entry, entry if added else None)
+
+
+def diff_trees(
+    reader: TreeReader,
+    old_id: Optional[str],
+    new_id: Optional[str],
+    recursive: bool = False,
+    show_trees: bool = False,
+    prefix: str = "",
+) -> Iterator[TreeChange]:
+    """
+    按路径顺序产出两棵树之间的差异；old_id 或 new_id 为 None 表示空树。
+    id 相同的子树不会被读取。
+    """
+    if old_id == new_id:
+        return
+
+    old = reader.tree(old_id).entries if old_id is not None else []
+    new = reader.tree(new_id).entries if new_id is not None else []
+    i = j = 0
+    while i < len(old) or j < len(new):
+        old_key = old[i].sort_key if i < len(old) else None
+        new_key = new[j].sort_key if j < len(new) else None
+
+        if new_key is None or (old_key is not None and old_key < new_key):
+            entry = old[i]
+            yield from _one_side(reader, entry, prefix + entry.filename, False, recursive, show_trees)
+            i += 1
+            continue
+        if old_key is None or new_key < old_key:
+            entry = new[j]
+            yield from _one_side(reader, entry, prefix + entry.filename, True, recursive, show_trees)
+            j += 1
+            continue
+
+        a, b = old[i], new[j]
+        i += 1
+        j += 1
+        if a.sha == b.sha and a.filemode == b.filemode:
+            continue
+
+        path = prefix + a.filename
+        if a.is_tree and recursive:
+            if show_trees:
+                yield TreeChange("M", path, a, b)
+            yield from diff_trees(reader, a.sha, b.sha, recursive, show_trees, path + "/")
+        else:
+            yield TreeChange("M" if _file_kind(a.filemode) == _file_kind(b.filemode) else "T", path, a, b)
@@ -1,20 +1,21 @@
 import sys
-from typing import List, Tuple
+from typing import Dict, List, Tuple, Optional
 
 import typer
 
 
 class Blob:
-    data: str
+    # blob 可以是任意的二进制内容，因此保留原始的 bytes
+    data: bytes
 
     def __init__(self, data: bytes):
-        self.data = data.decode()
+        self.data = data
 
     def __str__(self):
-        return self.data
+        return self.data.decode(errors="replace")
 
     def print(self):
-        sys.stdout.buffer.write(self.data.encode())
+        sys.stdout.buffer.write(self.data)
 
 
 class TreeEntry:
@@ -42,12 +43,30 @@ class TreeEntry:
     def __str__(self):
         return f"{self.filemode} {self.obj_type} {self.sha}\t{self.filename}"
 
+    @property
+    def is_tree(self) -> bool:
+        return self.filemode == "040000"
+
+    @property
+    def sort_key(self) -> str:
+        """
+        git 对 tree 中的 entry 排序时，会把目录名当作以 `/` 结尾来比较
+        """
+        return self.filename + "/" if self.is_tree else self.filename
+
     @staticmethod
     def parse(data: bytes) -> Tuple["TreeEntry", bytes]:
-        filemode, data = data.split(b" ", maxsplit=1)
-        filename, data = data.split(b"\x00", maxsplit=1)
-        sha, data = data[:20], data[20:]
-        return TreeEntry(filemode, filename, sha), data
+        entry, end = TreeEntry.parse_at(data, 0)
+        return entry, data[end:]
+
+    @staticmethod
+    def parse_at(data: bytes, pos: int) -> Tuple["TreeEntry", int]:
+        """
+        从 data[pos:] 中解析一个 entry，返回 (entry, 下一个 entry 的位置)，避免每次都复制剩余的数据
+        """
+        space = data.index(b" ", pos)
+        nul = data.index(b"\x00", space)
+        return TreeEntry(data[pos:space], data[space + 1 : nul], data[nul + 1 : nul + 21]), nul + 21
 
 
 class Tree:
@@ -55,8 +74,9 @@ class Tree:
 
     def __init__(self, data: bytes):
         self.entries = []
-        while data:
-            entry, data = TreeEntry.parse(data)
+        pos, end = 0, len(data)
+        while pos < end:
+            entry, pos = TreeEntry.parse_at(data, pos)
             self.entries.append(entry)
 
     def __str__(self):
@@ -66,10 +86,116 @@ class Tree:
         return typer.echo(str(self))
 
 
+def parse_headers(data: bytes) -> Tuple[Dict[bytes, List[bytes]], bytes]:
+    """
+    解析 commit 和 tag 的 header，返回 ({key: [value, ...]}, 提交信息)。以空格开头的行是上一个 header 的延续（例如 gpgsig）。
+    """
+    end = data.find(b"\n\n")
+    header, message = (data, b"") if end < 0 else (data[:end], data[end + 2 :])
+    headers: Dict[bytes, List[bytes]] = {}
+    values: List[bytes] = []
+    for line in header.split(b"\n"):
+        if line.startswith(b" ") and values:
+            values[-1] += b"\n" + line[1:]
+            continue
+        key, _, value = line.partition(b" ")
+        values = headers.setdefault(key, [])
+        values.append(value)
+    return headers, message
+
+
+def parse_ident_time(ident: bytes) -> int:
+    """
+    `Name <email> 1700000000 +0000` 中的时间戳
+    """
+    return int(ident.rsplit(b" ", 2)[1])
+
+
+class Commit:
+    """
+    commit 对象。构造时只解析遍历历史所需的 tree、parent 和提交时间：git 总是按 tree、parent、author、committer 的顺序写入，
+    因此可以按固定的偏移读取，不需要拆分整个 header。其余字段在第一次访问时才解析。
+    """
+
+    data: bytes
+    tree: str
+    parents: List[str]
+
+    def __init__(self, data: bytes):
+        self.data = data
+        if not data.startswith(b"tree ") or data[45:46] != b"\n":
+            raise ValueError("commit object does not start with a tree")
+        self.tree = data[5:45].decode()
+        self.parents = []
+        pos = 46
+        while data.startswith(b"parent ", pos):
+            self.parents.append(data[pos + 7 : pos + 47].decode())
+            pos += 48
+        self._headers: Optional[Tuple[Dict[bytes, List[bytes]], bytes]] = None
+
+        start = data.find(b"\ncommitter ", pos - 1)
+        end = data.find(b"\n", start + 1)
+        header_end = data.find(b"\n\n", pos - 1)
+        if start < 0 or end < 0 or 0 <= header_end < start:
+            raise ValueError("commit object has no committer")
+        self.commit_time = parse_ident_time(data[start + 11 : end])
+
+    def _header(self, key: bytes) -> str:
+        if self._headers is None:
+            self._headers = parse_headers(self.data)
+        return self._headers[0].get(key, [b""])[0].decode(errors="replace")
+
+    @property
+    def author(self) -> str:
+        return self._header(b"author")
+
+    @property
+    def committer(self) -> str:
+        return self._header(b"committer")
+
+    @property
+    def message(self) -> str:
+        if self._headers is None:
+            self._headers = parse_headers(self.data)
+        return self._headers[1].decode(errors="replace")
+
+    def print(self):
+        sys.stdout.buffer.write(self.data)
+
+
+class Tag:
+    """
+    annotated tag 对象
+    """
+
+    data: bytes
+    object: str
+    type: str
+    tag: str
+    tagger: str
+    message: str
+
+    def __init__(self, data: bytes):
+        self.data = data
+        headers, message = parse_headers(data)
+        if b"object" not in headers or b"type" not in headers:
+            raise ValueError("tag object has no object or type")
+        self.object = headers[b"object"][0].decode()
+        self.type = headers[b"type"][0].decode()
+        self.tag = headers.get(b"tag", [b""])[0].decode(errors="replace")
+        self.tagger = headers.get(b"tagger", [b""])[0].decode(errors="replace")
+        self.message = message.decode(errors="replace")
+
+    def print(self):
+        sys.stdout.buffer.write(self.data)
+
+
 class Factory:
     TYPE_TO_CLASS = {
         b"blob": Blob,
         b"tree": Tree,
+        b"commit": Commit,
+        b"tag": Tag,
     }
 
     @staticmethod
@@ -0,0 +1,32 @@
+class XGitError(Exception):
+    """
+    xgit 的所有异常的基类。命令行入口会把它们转换为 git 风格的报错和返回值，
+    而作为库使用时（参见 xgit.types.repository），调用者可以直接捕获它们。
+    """
+
+
+class NotARepositoryError(XGitError):
+    def __init__(self, path):
+        super().__init__(f"not a git repository (or any of the parent directories): {path}")
+        self.path = path
+
+
+class ObjectNotFoundError(XGitError):
+    def __init__(self, name: str):
+        super().__init__(f"Not a valid object name {name}")
+        self.name = name
+
+
+class AmbiguousObjectError(XGitError):
+    def __init__(self, name: str, candidates: list[str]):
+        super().__init__(f"short object ID {name} is ambiguous")
+        self.name = name
+        self.candidates = candidates
+
+
+class ObjectTypeError(XGitError):
+    def __init__(self, name: str, expected: str, actual: str):
+        super().__init__(f"object {name} is a {actual}, not a {expected}")
+        self.name = name
+        self.expected = expected
+        self.actual = actual
@@ -0,0 +1,198 @@
+import os
+import bisect
+from typing import Optional
+from pathlib import Path
+
+import typer
+
+from xgit.utils import trace
+from xgit.utils.sha import extract_data
+from xgit.utils.refs import resolve_ref
+from xgit.utils.utils import find_repo, check_exist
+from xgit.utils.errors import ObjectNotFoundError, AmbiguousObjectError
+from xgit.utils.constants import GIT_DIR
+from xgit.types.multi_pack_index import get_packed_objects
+
+# 与 git 一致，缩写的 object id 至少需要 4 位
+MIN_ABBREV = 4
+# 输出缩写时的默认长度
+DEFAULT_ABBREV = 7
+HEX_DIGITS = frozenset("0123456789abcdef")
+
+
+def is_hex(name: str) -> bool:
+    return bool(name) and set(name) <= HEX_DIGITS
+
+
+class ObjectNameIndex:
+    """
+    用于将缩写的 object id 解析为完整 id 的索引。
+
+    对每个 fanout 桶（即 id 的首字节），维护一个有序的 20 字节 SHA 数组，其中包含所有 loose object
+    (`objects/xx/` 目录下的文件）和所有 pack 中首字节为 xx 的对象。这样解析一个前缀只需要在一个桶中二分查找。
+
+    桶在第一次被访问时才建立，并在进程内缓存。由于新增对象会改变 `objects/xx` 或 `objects/pack` 目录的 mtime，
+    每次访问前会比较这两个目录的 mtime 和 inode，不一致时重新建立该桶。mtime 的精度有限，同一时刻内写入的对象
+    不会改变 mtime，因此查找不到时还会重新扫描一次该桶。
+    """
+
+    objects_dir: Path
+
+    def __init__(self, repo_dir: Path):
+        self.repo_dir = repo_dir
+        self.objects_dir = repo_dir / GIT_DIR / "objects"
+        self._buckets: dict[int, tuple[tuple[tuple[int, int], tuple[int, int]], list[bytes]]] = {}
+
+    def _stat(self, path: Path) -> tuple[int, int]:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return (0, 0)
+        return (st.st_mtime_ns, st.st_ino)
+
+    def bucket(self, first_byte: int, rescan: bool = False) -> list[bytes]:
+        """
+        返回首字节为 first_byte 的有序 SHA 数组。rescan 为 True 时忽略缓存，重新扫描该桶。
+        """
+        loose_dir = self.objects_dir / f"{first_byte:02x}"
+        key = (self._stat(loose_dir), self._stat(self.objects_dir / "pack"))
+
+        cached = self._buckets.get(first_byte)
+        if not rescan and cached is not None and cached[0] == key:
+            trace.count("name_index.hit")
+            return cached[1]
+
+        trace.count("name_index.rescan" if rescan else "name_index.miss")
+        shas = set()
+        if key[0][0]:
+            prefix = f"{first_byte:02x}"
+            for name in os.listdir(loose_dir):
+                if len(name) == 38 and is_hex(name):
+                    shas.add(bytes.fromhex(prefix + name))
+        shas.update(get_packed_objects(self.repo_dir).bucket(first_byte))
+
+        bucket = sorted(shas)
+        self._buckets[first_byte] = (key, bucket)
+        return bucket
+
+    def find(self, prefix: str, limit: Optional[int] = None) -> list[str]:
+        """
+        返回所有以 `prefix` 开头的完整 object id（至多 `limit` 个）。`prefix` 须为至少 2 位的小写十六进制串。
+        """
+        first_byte = int(prefix[:2], 16)
+        cached = self._buckets.get(first_byte)
+        bucket = self.bucket(first_byte)
+        result = self._search(bucket, prefix, limit)
+        # 桶来自缓存时才需要重新扫描，刚刚建立的桶已经是最新的
+        if not result and cached is not None and cached[1] is bucket:
+            result = self._search(self.bucket(first_byte, rescan=True), prefix, limit)
+        return result
+
+    @staticmethod
+    def _search(bucket: list[bytes], prefix: str, limit: Optional[int]) -> list[str]:
+        # 奇数长度的前缀补 0 后作为下界
+        low = bytes.fromhex(prefix + "0" * (len(prefix) % 2))
+        result = []
+        for i in range(bisect.bisect_left(bucket, low), len(bucket)):
+            object_id = bucket[i].hex()
+            if not object_id.startswith(prefix):
+                break
+            result.append(object_id)
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+    def contains(self, object_id: str) -> bool:
+        return bool(self.find(object_id, limit=1))
+
+    def shortest_unique(self, object_id: str, min_length: int = DEFAULT_ABBREV) -> str:
+        """
+        返回 object_id 至少 min_length 位、且不是其他任何对象的前缀的最短缩写。
+        只需要与有序数组中相邻的两个 SHA 比较公共前缀。
+        """
+        first_byte = int(object_id[:2], 16)
+        cached = self._buckets.get(first_byte)
+        bucket = self.bucket(first_byte)
+        sha = bytes.fromhex(object_id)
+        i = bisect.bisect_left(bucket, sha)
+        if (i == len(bucket) or bucket[i] != sha) and cached is not None and cached[1] is bucket:
+            bucket = self.bucket(first_byte, rescan=True)
+            i = bisect.bisect_left(bucket, sha)
+        common = 0
+        for j in (i - 1, i + 1 if i < len(bucket) and bucket[i] == sha else i):
+            if 0 <= j < len(bucket):
+                common = max(common, len(os.path.commonprefix([object_id, bucket[j].hex()])))
+        return object_id[: max(min_length, common + 1)]
+
+
+_name_indexes: dict[Path, ObjectNameIndex] = {}
+
+
+def clear_cache():
+    _name_indexes.clear()
+
+
+def get_name_index(repo_dir: Optional[Path] = None) -> ObjectNameIndex:
+    """
+    返回 repo 的 ObjectNameIndex，在进程内缓存
+    """
+    if repo_dir is None:
+        repo_dir = find_repo()
+    if repo_dir not in _name_indexes:
+        _name_indexes[repo_dir] = ObjectNameIndex(repo_dir)
+    return _name_indexes[repo_dir]
+
+
+def find_object_candidates(name: str, limit: Optional[int] = None, repo_dir: Optional[Path] = None) -> list[str]:
+    """
+    返回所有可能是 `name` 的完整 object id。`name` 可以是完整的 id，也可以是至少 MIN_ABBREV 位的缩写；
+    不是合法的 id 或缩写时返回空列表。
+    """
+    name = name.lower()
+    if not MIN_ABBREV <= len(name) <= 40 or not is_hex(name):
+        return []
+    return get_name_index(repo_dir).find(name, limit=limit)
+
+
+def abbreviate(object_id: str, repo_dir: Optional[Path] = None) -> str:
+    return get_name_index(repo_dir).shortest_unique(object_id)
+
+
+def resolve_object_id(name: str, repo_dir: Optional[Path] = None) -> str:
+    """
+    将 `name` 解析为唯一的完整 object id。找不到时抛出 ObjectNotFoundError，有歧义时抛出 AmbiguousObjectError。
+    `name` 也可以是引用（HEAD、分支名、tag 名等）；与 git 一致，除完整的 id 外，引用优先于缩写。
+    """
+    if len(name) == 40 and is_hex(name.lower()):
+        # 完整的 id 直接检查是否存在，不需要建立缩写索引的桶
+        if not check_exist(name, repo_dir):
+            raise ObjectNotFoundError(name)
+        return name.lower()
+
+    object_id = resolve_ref(name, repo_dir)
+    if object_id is not None:
+        return object_id
+    candidates = find_object_candidates(name, repo_dir=repo_dir)
+    if not candidates:
+        raise ObjectNotFoundError(name)
+    if len(candidates) > 1:
+        raise AmbiguousObjectError(name, candidates)
+    return candidates[0]
+
+
+def resolve_object_name(name: str) -> Optional[str]:
+    """
+    将 `name` 解析为唯一的完整 object id；找不到时返回 None。
+    有歧义时，与 git 一样在 stderr 中列出所有候选对象，然后返回 None。
+    """
+    try:
+        return resolve_object_id(name)
+    except ObjectNotFoundError:
+        return None
+    except AmbiguousObjectError as e:
+        typer.echo(f"error: {e}", err=True)
+        typer.echo("hint: The candidates are:", err=True)
+        for candidate in e.candidates:
+            obj_type = extract_data(candidate).split(b" ", maxsplit=1)[0].decode()
+            typer.echo(f"hint:   {candidate[:7]} {obj_type}", err=True)
+        return None
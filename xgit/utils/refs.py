@@ -0,0 +1,119 @@
+"""
+读取引用：.git 下的 loose ref（包括 HEAD 这样的符号引用）以及 packed-refs。
+"""
+
+import os
+from typing import Optional
+from pathlib import Path
+
+from xgit.utils.utils import find_repo
+from xgit.utils.errors import ObjectNotFoundError
+from xgit.utils.constants import GIT_DIR
+
+SYMREF_PREFIX = b"ref: "
+HEX_DIGITS = frozenset(b"0123456789abcdef")
+# 与 git 一致，符号引用最多嵌套 5 层
+MAX_SYMREF_DEPTH = 5
+
+# 短名字的查找顺序，与 git rev-parse 一致
+REF_RULES = ["{}", "refs/{}", "refs/tags/{}", "refs/heads/{}", "refs/remotes/{}", "refs/remotes/{}/HEAD"]
+
+
+def _is_valid_ref(name: str) -> bool:
+    """
+    与 git 一致，只有 refs/ 下的引用和 HEAD、ORIG_HEAD 这样全部由大写字母和 `_` 组成的伪引用可以被读取，
+    避免把 .git 下的 config、index 等文件当作引用
+    """
+    if not name or name.startswith("/") or ".." in name or "\\" in name:
+        return False
+    return name.startswith("refs/") or all("A" <= c <= "Z" or c == "_" for c in name)
+
+
+def _parse_ref_value(name: str, value: bytes) -> bytes:
+    """
+    检查引用文件的内容：必须是 40 位十六进制的 object id 或者 `ref: ` 开头的符号引用，否则抛出 ObjectNotFoundError
+    """
+    if value.startswith(SYMREF_PREFIX):
+        return value
+    if len(value) == 40 and all(c in HEX_DIGITS for c in value.lower()):
+        return value.lower()
+    raise ObjectNotFoundError(name)
+
+
+def read_packed_refs(repo_dir: Path) -> dict[str, str]:
+    refs: dict[str, str] = {}
+    try:
+        with open(repo_dir / GIT_DIR / "packed-refs", "rb") as f:
+            for line in f:
+                # `#` 开头的是文件头，`^` 开头的是上一个 tag 剥开后指向的对象
+                if line.startswith((b"#", b"^")):
+                    continue
+                sha, _, name = line.rstrip(b"\n").partition(b" ")
+                refs[name.decode()] = sha.decode()
+    except FileNotFoundError:
+        pass
+    return refs
+
+
+def read_ref(name: str, repo_dir: Optional[Path] = None) -> Optional[str]:
+    """
+    返回完整的引用名 `name`（例如 HEAD、refs/heads/main）指向的 object id，不存在时返回 None；
+    引用文件的内容不合法时抛出 ObjectNotFoundError
+    """
+    if repo_dir is None:
+        repo_dir = find_repo()
+    if not _is_valid_ref(name):
+        return None
+
+    packed: Optional[dict[str, str]] = None
+    for _ in range(MAX_SYMREF_DEPTH + 1):
+        try:
+            with open(repo_dir / GIT_DIR / name, "rb") as f:
+                value = f.read().strip()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            if packed is None:
+                packed = read_packed_refs(repo_dir)
+            return packed.get(name)
+
+        value = _parse_ref_value(name, value)
+        if not value.startswith(SYMREF_PREFIX):
+            return value.decode()
+        name = value[len(SYMREF_PREFIX) :].decode()
+        if not _is_valid_ref(name):
+            return None
+    return None
+
+
+def resolve_ref(name: str, repo_dir: Optional[Path] = None) -> Optional[str]:
+    """
+    按 REF_RULES 的顺序把短名字（main、v1.0、HEAD 等）解析为 object id
+    """
+    for rule in REF_RULES:
+        object_id = read_ref(rule.format(name), repo_dir)
+        if object_id is not None:
+            return object_id
+    return None
+
+
+def list_refs(repo_dir: Optional[Path] = None) -> dict[str, str]:
+    """
+    返回 refs/ 下的所有引用以及 HEAD，loose ref 优先于 packed-refs 中的同名引用
+    """
+    if repo_dir is None:
+        repo_dir = find_repo()
+    refs = read_packed_refs(repo_dir)
+    git_dir = repo_dir / GIT_DIR
+    for root, _, files in os.walk(git_dir / "refs"):
+        for file in files:
+            name = Path(root, file).relative_to(git_dir).as_posix()
+            try:
+                object_id = read_ref(name, repo_dir)
+            except ObjectNotFoundError:
+                # 与 git 一样忽略损坏的引用
+                continue
+            if object_id is not None:
+                refs[name] = object_id
+    head = read_ref("HEAD", repo_dir)
+    if head is not None:
+        refs["HEAD"] = head
+    return dict(sorted(refs.items()))
@@ -1,17 +1,23 @@
 import zlib
 import hashlib
+from typing import Optional
+from pathlib import Path
 
+from xgit.utils import trace
 from xgit.utils.utils import find_repo, get_object
-from xgit.utils.constants import GIT_DIR
+from xgit.utils.errors import ObjectNotFoundError
+from xgit.utils.object_writer import ObjectWriter
+from xgit.types.multi_pack_index import get_packed_objects
 
 
-def hash_file(file: str, write: bool = False) -> str:
+def hash_file(file: str, write: bool = False, writer: Optional[ObjectWriter] = None) -> str:
     with open(file, "rb") as f:
         data = f.read()
-    return do_hash_object(data, "blob", write)
+    return do_hash_object(data, "blob", write, writer=writer)
 
 
-def do_hash_object(data: bytes, obj_type: str, write: bool) -> str:
+@trace.traced("do_hash_object", aggregate=True)
+def do_hash_object(data: bytes, obj_type: str, write: bool, writer: Optional[ObjectWriter] = None) -> str:
     """
     计算对象的哈希值；如果 write 为 True，则将内容写入到对象数据库中。
 
@@ -21,21 +27,76 @@ def do_hash_object(data: bytes, obj_type: str, write: bool) -> str:
 
     在存储时，会将上述内容进行 zlib 压缩，然后计算 SHA-1 哈希值，作为文件名。
     为了避免在一个目录下存储过多的文件导致性能问题，会将文件名的前两位作为目录名。
+
+    写入多个对象时，应当传入同一个 `writer`，参见 ObjectWriter。
     """
 
     result = obj_type.encode() + b" " + str(len(data)).encode() + b"\x00" + data
     object_id = hashlib.sha1(result).hexdigest()
+    trace.count("bytes.hashed", len(result))
 
     if write:
-        repo_dir = find_repo()
-        file = repo_dir / GIT_DIR / f"objects/{object_id[:2]}/{object_id[2:]}"
-        file.parent.mkdir(exist_ok=True)
-        with open(file, "wb") as out:
-            out.write(zlib.compress(result))
+        if writer is not None:
+            written = writer.write(object_id, result)
+        else:
+            with ObjectWriter() as single_writer:
+                written = single_writer.write(object_id, result)
+        trace.count("objects.written" if written else "objects.skipped")
 
     return object_id
 
 
-def extract_data(object_id: str) -> bytes:
-    with get_object(obj=object_id).open("rb") as f:
-        return zlib.decompress(f.read())
+@trace.traced("extract_data", aggregate=True)
+def extract_data(object_id: str, repo_dir: Optional[Path] = None) -> bytes:
+    """
+    读取对象，返回 `类型 + 空格 + 长度 + \x00 + 内容`。优先查找 loose object，然后依次查找各个 pack。
+    对象不存在时抛出 ObjectNotFoundError。
+    """
+    if repo_dir is None:
+        repo_dir = find_repo()
+
+    object_file = get_object(obj=object_id, repo_dir=repo_dir)
+    if object_file.exists():
+        with object_file.open("rb") as f:
+            data = zlib.decompress(f.read())
+        trace.count("objects.loose")
+        trace.count("bytes.inflated", len(data))
+        return data
+
+    found = get_packed_objects(repo_dir).find(bytes.fromhex(object_id))
+    if found is not None:
+        pack, offset = found
+        obj_type, data = pack.read_at(offset)
+        trace.count("objects.packed")
+        trace.count("bytes.inflated", len(data))
+        return obj_type + b" " + str(len(data)).encode() + b"\x00" + data
+
+    raise ObjectNotFoundError(object_id)
+
+
+def read_header(object_id: str, repo_dir: Optional[Path] = None) -> tuple[bytes, int]:
+    """
+    只读取对象的类型和大小，不解压整个对象。对象不存在时抛出 ObjectNotFoundError。
+    """
+    if repo_dir is None:
+        repo_dir = find_repo()
+
+    object_file = get_object(obj=object_id, repo_dir=repo_dir)
+    if object_file.exists():
+        decompressor = zlib.decompressobj()
+        header = b""
+        with object_file.open("rb") as f:
+            while b"\x00" not in header:
+                chunk = f.read(64)
+                if not chunk:
+                    raise ValueError(f"corrupt loose object {object_id}")
+                header += decompressor.decompress(chunk, 64)
+        obj_type, size = header.split(b"\x00", maxsplit=1)[0].split(b" ", maxsplit=1)
+        return obj_type, int(size)
+
+    found = get_packed_objects(repo_dir).find(bytes.fromhex(object_id))
+    if found is not None:
+        pack, offset = found
+        return pack.read_header_at(offset)
+
+    raise ObjectNotFoundError(object_id)
@@ -0,0 +1,211 @@
+"""
+性能追踪，类似 git 的 trace2 perf target。
+
+设置环境变量 `XGIT_TRACE_PERF` 后启用：
+
+- 绝对路径：以 JSON lines 的格式追加写入该文件
+- `1`、`2` 或 `true`：写入 stderr
+
+每个 region 在结束时输出一行，包含名字、嵌套深度、开始时间（相对于进程启动）、耗时，以及在该 region 内累积的计数
+（字节数、对象数、缓存命中等）。子 region 的计数会累加到父 region 上。进程退出时输出一行 summary，包含全部计数
+以及由 `xxx.hit` / `xxx.miss` 计数得出的缓存命中率。
+
+对于调用非常频繁的函数（例如 `find_repo`），使用 `traced(name, aggregate=True)`，不单独输出事件，
+只把调用次数和耗时累加到所在的 region 中。
+
+未启用时，`region` 返回一个共享的空上下文，`count` 和 `traced` 包装的函数只多一次全局变量的判断。
+
+region 的嵌套关系按线程分别记录，工作线程（例如 ObjectStore 的线程池）中的计数只累加到该线程自己的 region
+和全局的 summary 中。
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import functools
+import threading
+import contextlib
+from typing import IO, Any, TypeVar, Callable, Optional
+
+ENV_TRACE_PERF = "XGIT_TRACE_PERF"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_START = time.perf_counter()
+_NULL_REGION = contextlib.nullcontext()
+
+_sink: Optional[IO[str]] = None  # pylint: disable=invalid-name
+_local = threading.local()
+_totals: dict[str, float] = {}
+# 保护 _totals 和 _sink 的写入
+_lock = threading.Lock()
+
+
+def _stack() -> list["Region"]:
+    """
+    当前线程的 region 栈
+    """
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+
+class Region:
+    name: str
+    data: dict[str, float]
+    depth: int
+    start: float
+
+    def __init__(self, name: str, data: dict[str, float]):
+        self.name = name
+        self.data = data
+        self.depth = 0
+        self.start = 0.0
+
+    def __enter__(self) -> "Region":
+        stack = _stack()
+        self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        stack = _stack()
+        stack.pop()
+        if stack:
+            parent = stack[-1].data
+            for key, value in self.data.items():
+                parent[key] = parent.get(key, 0) + value
+        _emit(
+            {
+                "event": "region",
+                "name": self.name,
+                "depth": self.depth,
+                "parent": stack[-1].name if stack else None,
+                "start": round(self.start - _START, 6),
+                "elapsed": round(elapsed, 6),
+                "error": exc_type.__name__ if exc_type is not None else None,
+                "data": self.data,
+            }
+        )
+
+
+def _emit(event: dict):
+    if _sink is None:
+        return
+    event["pid"] = os.getpid()
+    line = json.dumps(event) + "\n"
+    with _lock:
+        _sink.write(line)
+        _sink.flush()
+
+
+def _summary():
+    if _sink is None:
+        return
+    with _lock:
+        totals = dict(_totals)
+    hit_rates = {}
+    for key, hits in totals.items():
+        if key.endswith(".hit"):
+            prefix = key[: -len(".hit")]
+            total = hits + totals.get(prefix + ".miss", 0)
+            hit_rates[prefix] = round(hits / total, 4) if total else None
+    _emit(
+        {"event": "summary", "elapsed": round(time.perf_counter() - _START, 6), "data": totals, "hit_rates": hit_rates}
+    )
+
+
+def configure(target: Optional[str] = None):
+    """
+    根据 `target`（默认读取环境变量 XGIT_TRACE_PERF）启用或关闭追踪
+    """
+    global _sink  # pylint: disable=global-statement
+
+    if target is None:
+        target = os.environ.get(ENV_TRACE_PERF)
+
+    if _sink is not None and _sink is not sys.stderr:
+        _sink.close()
+    _sink = None
+    _stack().clear()
+    with _lock:
+        _totals.clear()
+
+    if not target or target.lower() in ("0", "false"):
+        return
+    if target.lower() in ("1", "2", "true"):
+        _sink = sys.stderr
+    elif os.path.isabs(target):
+        _sink = open(target, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+    else:
+        print(f"warning: {ENV_TRACE_PERF} must be an absolute path, 1, 2 or true", file=sys.stderr)
+
+
+def enabled() -> bool:
+    return _sink is not None
+
+
+def region(name: str, **data: float):
+    """
+    用法：`with trace.region("read-index"): ...`
+    """
+    if _sink is None:
+        return _NULL_REGION
+    return Region(name, dict(data))
+
+
+def count(key: str, value: float = 1):
+    """
+    在当前 region 中累加一个计数
+    """
+    if _sink is None:
+        return
+    with _lock:
+        _totals[key] = _totals.get(key, 0) + value
+    stack = _stack()
+    if stack:
+        data = stack[-1].data
+        data[key] = data.get(key, 0) + value
+
+
+def traced(name: str, aggregate: bool = False) -> Callable[[F], F]:
+    """
+    将函数的每次调用作为一个 region。aggregate 为 True 时不输出事件，只累加 `name.calls` 和 `name.time`。
+    """
+
+    def decorator(func: F) -> F:
+        if aggregate:
+
+            @functools.wraps(func)
+            def aggregated(*args, **kwargs):
+                if _sink is None:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    count(f"{name}.calls")
+                    count(f"{name}.time", time.perf_counter() - start)
+
+            return aggregated  # type: ignore
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _sink is None:
+                return func(*args, **kwargs)
+            with Region(name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+configure()
+atexit.register(_summary)
@@ -1,25 +1,43 @@
 import sys
 import datetime
+import configparser
+from typing import Optional
 from pathlib import Path
 
 import typer
 
+from xgit.utils import trace
+from xgit.utils.errors import NotARepositoryError
 from xgit.utils.constants import GIT_DIR
+from xgit.types.multi_pack_index import get_packed_objects
 
 
-def find_repo() -> Path:
+def locate_repo(start: Optional[Path] = None) -> Path:
     """
-    从当前目录开始，逐级向上查找 git 仓库。
+    从 `start`（默认为当前目录）开始，逐级向上查找 git 仓库。
 
-    如果找到，则返回仓库的目录；否则报错退出。
+    如果找到，则返回仓库的目录；否则抛出 NotARepositoryError。
     """
-    path = Path.cwd().absolute()
+    path = (start if start is not None else Path.cwd()).absolute()
     while path.parent != path:
         if (path / GIT_DIR).is_dir():
             return path
         path = path.parent
-    typer.echo("fatal: not a git repository (or any of the parent directories)", err=True)
-    sys.exit(128)
+    raise NotARepositoryError(start if start is not None else Path.cwd())
+
+
+@trace.traced("find_repo", aggregate=True)
+def find_repo() -> Path:
+    """
+    从当前目录开始，逐级向上查找 git 仓库。
+
+    如果找到，则返回仓库的目录；否则报错退出。
+    """
+    try:
+        return locate_repo()
+    except NotARepositoryError:
+        typer.echo("fatal: not a git repository (or any of the parent directories)", err=True)
+        sys.exit(128)
 
 
 def get_repo_file(f: str) -> Path:
@@ -29,17 +47,95 @@ def get_repo_file(f: str) -> Path:
     return (find_repo() / f).resolve()
 
 
-def get_object(obj: str):
+def get_object(obj: str, repo_dir: Optional[Path] = None) -> Path:
     """
     给定一个 object 的 ID (sha)，返回它在 objects 中的路径
     """
-    repo_dir = find_repo()
+    if repo_dir is None:
+        repo_dir = find_repo()
     return repo_dir / GIT_DIR / "objects" / obj[:2] / obj[2:]
 
 
-def check_exist(obj: str) -> bool:
-    object_file = get_object(obj)
-    return object_file.exists()
+def check_exist(obj: str, repo_dir: Optional[Path] = None) -> bool:
+    """
+    `obj` 是完整的 object id；检查它是否以 loose object 或者在某个 pack 中存在
+    """
+    if repo_dir is None:
+        repo_dir = find_repo()
+    obj = obj.lower()
+    if get_object(obj, repo_dir).exists():
+        return True
+    return get_packed_objects(repo_dir).find(bytes.fromhex(obj)) is not None
+
+
+def is_config_true(value: Optional[str]) -> bool:
+    return value is not None and value.lower() in ("true", "yes", "on", "1")
+
+
+def get_config(section: str, key: str, repo_dir: Optional[Path] = None) -> Optional[str]:
+    """
+    读取 repo 的 `.git/config` 中 `section.key` 的值；不存在时返回 None。
+    设置了 `extensions.worktreeConfig` 时，`.git/config.worktree` 中的值优先。
+
+    git 的配置文件格式与 ini 基本一致，这里直接借用 configparser 解析，不支持 include 等高级用法。
+    section 名不区分大小写，key 由 configparser 统一转为小写。
+    """
+    if repo_dir is None:
+        repo_dir = find_repo()
+
+    def read(file_name: str, section: str, key: str) -> Optional[str]:
+        parser = configparser.ConfigParser(strict=False, interpolation=None)
+        try:
+            parser.read(repo_dir / GIT_DIR / file_name, encoding="utf-8")
+        except configparser.Error:
+            return None
+        for name in parser.sections():
+            if name.lower() == section.lower():
+                return parser[name].get(key)
+        return None
+
+    value = read("config", section, key)
+    if is_config_true(read("config", "extensions", "worktreeConfig")):
+        worktree_value = read("config.worktree", section, key)
+        if worktree_value is not None:
+            value = worktree_value
+    return value
+
+
+def set_config(section: str, key: str, value: str, repo_dir: Optional[Path] = None, file_name: str = "config"):
+    """
+    设置 `.git/<file_name>` 中的 `section.key`，保留文件中的其他内容；section 不存在时追加到文件末尾。
+    """
+    if repo_dir is None:
+        repo_dir = find_repo()
+    path = repo_dir / GIT_DIR / file_name
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        lines = []
+
+    # 找到最后一个同名 section 的范围 [start, end)
+    start: Optional[int] = None
+    end = len(lines)
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped.startswith("["):
+            if stripped[1:].split("]", maxsplit=1)[0].strip().lower() == section.lower():
+                start, end = i + 1, len(lines)
+            elif start is not None and end == len(lines):
+                end = i
+
+    if start is None:
+        lines += [f"[{section}]", f"\t{key} = {value}"]
+    else:
+        for i in range(start, end):
+            name = lines[i].split("=", maxsplit=1)[0].strip()
+            if name.lower() == key.lower():
+                lines[i] = f"\t{key} = {value}"
+                break
+        else:
+            lines.insert(end, f"\t{key} = {value}")
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
 
 
 def timestamp_to_str(time_s, time_ns):